@@ -0,0 +1,115 @@
+# artifacts.py
+# Almacen de imagenes de arboles direccionado por contenido.
+# Cada artefacto se guarda como <raiz>/<clave><ext>, donde la clave es el hash de
+# la secuencia de tokens (tipo, valor): dos envios con el mismo codigo (aunque
+# cambien espacios o comentarios) reutilizan el mismo archivo. Las escrituras van
+# a un temporal que se renombra con os.replace, asi ninguna peticion ve un archivo
+# a medio escribir, y los artefactos viejos se eliminan por antiguedad y por
+# tamano total (LRU por mtime, que se actualiza cada vez que se reutilizan).
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+# Cambiarlo invalida todos los artefactos guardados (p.ej. si cambia el dibujo)
+RENDER_VERSION = b"1"
+
+
+# Sal del hash de los tokens: el mismo codigo da otro arbol con otra gramatica,
+# asi que la clave incluye la huella de la gramatica activa (ver grammar_watch)
+def render_salt(fingerprint: str) -> bytes:
+    return RENDER_VERSION + b"\x00" + fingerprint.encode("ascii")
+
+
+class TokenDigest:
+    # Pasa los tokens al parser calculando el hash de la secuencia al vuelo
+    def __init__(self, tokens: Iterable, salt: bytes = RENDER_VERSION):
+        self.tokens = tokens
+        self._hash = hashlib.blake2b(salt, digest_size=16)
+
+    def __iter__(self) -> Iterator:
+        update = self._hash.update
+        for tok in self.tokens:
+            update(f"{tok.type}\x00{tok.value}\x01".encode("utf-8", "surrogatepass"))
+            yield tok
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class ArtifactStore:
+    def __init__(self, root: str, url_prefix: str, max_bytes: int = 64 * 2**20, max_age: float = 7 * 86400):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key + ext)
+
+    def url(self, key: str, ext: str) -> str:
+        return f"{self.url_prefix}/{key}{ext}"
+
+    def lookup(self, key: str, ext: str) -> Optional[str]:
+        # Devuelve la ruta si el artefacto existe y lo marca como recien usado
+        path = self.path(key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, ext: str, write: Callable[[str], None]) -> str:
+        # write(ruta_temporal) genera el archivo; luego se publica atomicamente
+        fd, tmp = tempfile.mkstemp(prefix=f".{key}.", suffix=ext + ".tmp", dir=self.root)
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, self.path(key, ext))
+        except BaseException:
+            _remove(tmp)
+            raise
+        self.evict()
+        return self.path(key, ext)
+
+    def get_or_create(self, key: str, ext: str, write: Callable[[str], None]) -> str:
+        return self.lookup(key, ext) or self.put(key, ext, write)
+
+    def evict(self):
+        # Un solo hilo limpia a la vez; los demas no esperan
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            entries = []
+            for e in os.scandir(self.root):
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                if e.name.startswith("."):
+                    # Temporales abandonados (p.ej. un proceso que murio escribiendo)
+                    if now - st.st_mtime > 3600:
+                        _remove(e.path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in entries:
+                if total <= self.max_bytes and now - mtime <= self.max_age:
+                    break
+                _remove(path)
+                total -= size
+        finally:
+            self._lock.release()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,337 @@
+# ast_builder.py
+# Arbol de sintaxis abstracta construido durante el analisis (Parser.parse(tree="ast")).
+# Cada produccion que termina se reduce directamente a su valor abstracto, sin
+# pasar por el arbol de derivacion. Las listas recursivas por la derecha
+# (MemberList, StmtList, AddRest, ...) se acumulan al reves y se invierten una
+# sola vez al cerrarlas, asi los operadores quedan asociados a la izquierda.
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+@dataclass(slots=True)
+class AstNode:
+    # Program, Import, Class, Field, Method, Param, Block, VarDecl, If, While,
+    # For, ForInit, ForUpdate, Return, Break, Continue, Assign, ExprStmt,
+    # Binary, Unary, Call, FieldAccess, Name, Literal, Empty
+    symbol: str
+    value: Any = None
+    children: Sequence["AstNode"] = ()
+    line: int = -1
+    type: Optional[str] = None
+
+    # Para que print_tree y export_dot lo traten igual que a un Node
+    @property
+    def token(self):
+        return None
+
+
+EMPTY = AstNode("Empty")
+
+
+def _line(tok) -> int:
+    return tok.line if tok is not None else -1
+
+
+def _text(tok) -> Optional[str]:
+    return tok.value if tok is not None else None
+
+
+def _push(rest, item):
+    if rest is None:
+        rest = []
+    if item is not None:
+        rest.append(item)
+    return rest
+
+
+def _extend(rest, items):
+    # items puede ser un nodo o una lista de nodos (p.ej. int a, b;)
+    if rest is None:
+        rest = []
+    if isinstance(items, list):
+        rest.extend(reversed(items))
+    elif items is not None:
+        rest.append(items)
+    return rest
+
+
+def _fold(left, rest):
+    # rest guarda (operador, operando) del ultimo al primero
+    if rest:
+        for op, right in reversed(rest):
+            left = AstNode("Binary", _text(op), [left or EMPTY, right or EMPTY], _line(op))
+    return left
+
+
+def _as_stmt(v):
+    if isinstance(v, list):
+        return v[0] if len(v) == 1 else AstNode("Block", None, v, v[0].line if v else -1)
+    return v if v is not None else EMPTY
+
+
+def _reversed(v) -> List[AstNode]:
+    return list(reversed(v)) if v else []
+
+
+# Accion por no terminal: (alternativa, valores del lado derecho) -> valor
+def _prog(alt, v):
+    imports, cls = v
+    children = _reversed(imports)
+    if cls is not None:
+        children.append(cls)
+    return AstNode("Program", None, children)
+
+
+def _import_decl(alt, v):
+    return AstNode("Import", v[1], (), _line(v[0]))
+
+
+def _import_path(alt, v):
+    return f"{_text(v[0])}{v[1] or ''}"
+
+
+def _import_path_tail(alt, v):
+    return f".{v[1] or ''}" if alt == 0 else ""
+
+
+def _import_path_seg(alt, v):
+    return f"{_text(v[0])}{v[1] or ''}" if alt == 0 else "*"
+
+
+def _class_decl(alt, v):
+    _, _, name, _, members, _ = v
+    return AstNode("Class", _text(name), _reversed(members), _line(name))
+
+
+def _member(alt, v):
+    _, rettype, name, rest = v
+    if rest is None:
+        return None
+    if rest[0] == "method":
+        params, body = rest[1], rest[2]
+        children = _reversed(params)
+        children.append(body or AstNode("Block"))
+        return AstNode("Method", _text(name), children, _line(name), rettype)
+    first_init, others = rest[1]
+    fields = [AstNode("Field", _text(name), [first_init] if first_init else [], _line(name), rettype)]
+    for tok, init in _reversed(others):
+        fields.append(AstNode("Field", _text(tok), [init] if init else [], _line(tok), rettype))
+    return fields
+
+
+def _member_rest(alt, v):
+    if alt == 0:
+        return ("method", v[1], v[3])
+    return ("field", v[0] or (None, None))
+
+
+def _field_rest(alt, v):
+    if alt == 1:
+        return []
+    return _push(v[3], (v[1], v[2]))
+
+
+def _type_or_void(alt, v):
+    return v[0] if alt == 0 else "void"
+
+
+def _param(alt, v):
+    return AstNode("Param", _text(v[1]), (), _line(v[1]), v[0])
+
+
+def _block(alt, v):
+    return AstNode("Block", None, _reversed(v[1]), _line(v[0]))
+
+
+def _var_decl_stmt(alt, v):
+    vtype, decls = v[0], _reversed(v[1])
+    return [AstNode("VarDecl", _text(tok), [init] if init else [], _line(tok), vtype) for tok, init in decls]
+
+
+def _assign_or_call(alt, v):
+    target, value = v
+    if value is not None:
+        return AstNode("Assign", "=", [target or EMPTY, value], target.line if target else -1)
+    return AstNode("ExprStmt", None, [target or EMPTY], target.line if target else -1)
+
+
+def _if_stmt(alt, v):
+    children = [v[2] or EMPTY, _as_stmt(v[4])]
+    if v[5] is not None:
+        children.append(_as_stmt(v[5]))
+    return AstNode("If", None, children, _line(v[0]))
+
+
+def _while_stmt(alt, v):
+    return AstNode("While", None, [v[2] or EMPTY, _as_stmt(v[4])], _line(v[0]))
+
+
+def _for_stmt(alt, v):
+    init = AstNode("ForInit", None, _reversed(v[2]))
+    update = AstNode("ForUpdate", None, _reversed(v[6]))
+    return AstNode("For", None, [init, v[4] or EMPTY, update, _as_stmt(v[8])], _line(v[0]))
+
+
+def _return_stmt(alt, v):
+    return AstNode("Return", None, [v[1]] if v[1] is not None else [], _line(v[0]))
+
+
+def _binary_rest(alt, v):
+    # X -> op Y XRest | ε
+    if len(v) == 1:
+        return []
+    return _push(v[2], (v[0], v[1]))
+
+
+def _unary_expr(alt, v):
+    if alt == 0:
+        op = v[0]
+        return AstNode("Unary", _text(op), [v[1] or EMPTY], _line(op))
+    return v[0]
+
+
+def _primary_expr(alt, v):
+    if alt == 0:
+        return v[0]
+    if alt == 2:
+        return v[1]
+    name, tail = v
+    node = AstNode("Name", _text(name), (), _line(name))
+    for kind, x, line in _reversed(tail):
+        if kind == "call":
+            node = AstNode("Call", None, [node] + _reversed(x), line)
+        else:
+            node = AstNode("FieldAccess", _text(x), [node], line)
+    return node
+
+
+def _primary_tail(alt, v):
+    if alt == 0:
+        return _push(v[3], ("call", v[1], _line(v[0])))
+    if alt == 1:
+        return _push(v[2], ("field", v[1], _line(v[0])))
+    return []
+
+
+def _literal(alt, v):
+    tok = v[0]
+    return AstNode("Literal", _text(tok), (), _line(tok), tok.type if tok is not None else None)
+
+
+def _first(alt, v):
+    return v[0]
+
+
+def _second(alt, v):
+    return v[1] if len(v) > 1 else None
+
+
+def _token_value(alt, v):
+    return _text(v[0])
+
+
+def _list_first(alt, v):
+    # X -> Item XRest | ε
+    if len(v) == 1:
+        return []
+    return _push(v[1], v[0])
+
+
+def _list_rest(alt, v):
+    # XRest -> , Item XRest | ε
+    if len(v) == 1:
+        return []
+    return _push(v[2], v[1])
+
+
+def _binary_expr(alt, v):
+    return _fold(v[0], v[1])
+
+
+ACTIONS: Dict[str, Callable[[int, list], Any]] = {
+    "Prog": _prog,
+    "ImportList": lambda alt, v: _push(v[1], v[0]) if alt == 0 else [],
+    "ImportDecl": _import_decl,
+    "ImportPath": _import_path,
+    "ImportPathTail": _import_path_tail,
+    "ImportPathSeg": _import_path_seg,
+    "ClassDecl": _class_decl,
+    "ModifiersOpt": lambda alt, v: _push(v[1], v[0]) if alt == 0 else [],
+    "Modifier": _token_value,
+    "MemberList": lambda alt, v: _extend(v[1], v[0]) if alt == 0 else [],
+    "Member": _member,
+    "MemberRest": _member_rest,
+    "FieldTail": lambda alt, v: (v[0], v[1]),
+    "FieldRest": _field_rest,
+    "InitOpt": _second,
+    "TypeOrVoid": _type_or_void,
+    "Type": _token_value,
+    "ParamList": _list_first,
+    "ParamRest": _list_rest,
+    "Param": _param,
+    "Block": _block,
+    "StmtList": lambda alt, v: _extend(v[1], v[0]) if alt == 0 else [],
+    "Stmt": _first,
+    "VarDeclStmt": _var_decl_stmt,
+    "VarDeclList": lambda alt, v: _push(v[1], v[0]),
+    "VarDeclRest": _list_rest,
+    "VarDecl": lambda alt, v: (v[0], v[1]),
+    "SimpleStmt": _first,
+    "AssignOrCall": _assign_or_call,
+    "AssignTail": _second,
+    "IfStmt": _if_stmt,
+    "ElseOpt": _second,
+    "WhileStmt": _while_stmt,
+    "ForStmt": _for_stmt,
+    "ForInitOpt": lambda alt, v: v[0] if alt == 0 else [],
+    "ForUpdateOpt": lambda alt, v: v[0] if alt == 0 else [],
+    "AssignOrCallList": lambda alt, v: _push(v[1], v[0]),
+    "AssignOrCallListRest": _list_rest,
+    "ExprOpt": _first,
+    "ReturnStmt": _return_stmt,
+    "ReturnExprOpt": _first,
+    "BreakStmt": lambda alt, v: AstNode("Break", None, (), _line(v[0])),
+    "ContinueStmt": lambda alt, v: AstNode("Continue", None, (), _line(v[0])),
+    "Expr": _first,
+    "CondOrExpr": _binary_expr,
+    "CondOrRest": _binary_rest,
+    "CondAndExpr": _binary_expr,
+    "CondAndRest": _binary_rest,
+    "RelExpr": _binary_expr,
+    "RelRest": _binary_rest,
+    "AddExpr": _binary_expr,
+    "AddRest": _binary_rest,
+    "MulExpr": _binary_expr,
+    "MulRest": _binary_rest,
+    "UnaryExpr": _unary_expr,
+    "UnaryOp": _first,
+    "PrimaryExpr": _primary_expr,
+    "PrimaryTail": _primary_tail,
+    "ArgList": _list_first,
+    "ArgRest": _list_rest,
+    "literal": _literal,
+}
+
+
+class AstBuilder:
+    def __init__(self, it):
+        names = it.nonterm_names
+        self.alt = it.alt
+        self.actions = [ACTIONS.get(names[A]) for A in it.lhs]
+        self.eps = None
+
+    def leaf(self, t: int, token):
+        return token
+
+    def missing(self, t: int):
+        return None
+
+    def reduce(self, p: int, values: list):
+        action = self.actions[p]
+        return action(self.alt[p], values) if action is not None else None
+
+    def error(self, A: int):
+        return None
+
+    def finish(self, root) -> AstNode:
+        return root if root is not None else AstNode("Program")
@@ -0,0 +1,87 @@
+# batch.py
+# Analiza muchos archivos en paralelo con un pool de procesos.
+# Uso: python -m app.Back.batch tests/ "src/**/*.java" -o resultados.jsonl -j 8
+# Cada resultado se escribe como una linea JSON apenas termina su archivo, y al
+# final se imprime (en stderr) el rendimiento total y la latencia por archivo.
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Sequence, Tuple
+from app.Back.workers import analyze_file, init_worker, run_unordered
+
+EXTENSIONS = (".java", ".txt")
+
+
+def expand_inputs(inputs: Iterable[str], extensions: Sequence[str] = EXTENSIONS) -> Iterator[str]:
+    # Directorios (recursivo, filtrando por extension), patrones glob o archivos
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths = []
+            for base, dirs, files in os.walk(item):
+                dirs.sort()
+                paths += [os.path.join(base, f) for f in sorted(files) if f.endswith(tuple(extensions))]
+        elif glob.has_magic(item):
+            paths = sorted(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+        else:
+            paths = [item]
+        for p in paths:
+            if p not in seen:
+                seen.add(p)
+                yield p
+
+
+def run_batch(paths: Iterable[str], out, workers: int = 0, tree: str = None) -> Tuple[List[float], int]:
+    # Mantiene a lo sumo 4 archivos por proceso en vuelo para no acumular
+    # resultados en memoria; devuelve la latencia (ms) de cada archivo y el
+    # total de tokens
+    workers = workers or os.cpu_count() or 1
+    latencies = []
+    tokens = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        for path, result in run_unordered(pool, analyze_file, ((p, (p, tree)) for p in paths), workers * 4):
+            if isinstance(result, Exception):
+                result = {"file": path, "error": str(result), "elapsed_ms": 0.0}
+            latencies.append(result["elapsed_ms"])
+            tokens += result.get("tokens", 0)
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    return latencies, tokens
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m app.Back.batch")
+    ap.add_argument("entradas", nargs="+", help="archivos, directorios o patrones glob")
+    ap.add_argument("-o", "--salida", default="-", help="archivo JSON Lines (por defecto stdout)")
+    ap.add_argument("-j", "--workers", type=int, default=0, help="procesos (por defecto, uno por CPU)")
+    ap.add_argument("--tree", choices=["node", "flat", "ast"], help="incluir el arbol en cada resultado")
+    ap.add_argument("--ext", nargs="+", default=list(EXTENSIONS), help="extensiones a buscar en directorios")
+    args = ap.parse_args()
+
+    out = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        lat, tokens = run_batch(expand_inputs(args.entradas, args.ext), out, args.workers, args.tree)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    total = time.perf_counter() - t0
+
+    n = len(lat)
+    rate = 1 / total if total else 0
+    print(f"{n} archivos, {tokens} tokens en {total:.2f} s "
+          f"({n * rate:.1f} archivos/s, {tokens * rate:.0f} tokens/s)", file=sys.stderr)
+    if n:
+        print(f"latencia por archivo: p50 {percentile(lat, 0.5):.2f} ms, p95 {percentile(lat, 0.95):.2f} ms, "
+              f"max {max(lat):.2f} ms", file=sys.stderr)
@@ -0,0 +1,527 @@
+# bench.py
+# Mediciones de rendimiento del analizador.
+# Uso: python -m app.Back.bench [seccion ...] [--profile SALIDA]
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+from app.Back import metrics
+from app.Back.grammar import EPS, GRAMMAR, START_SYMBOL
+from app.Back.lexer import Lexer, Token
+from app.Back.parser import ENGINES, Parser
+from app.Back.parser_generator import ParserGenerator, get_compiled, grammar_fingerprint, load_artifact
+
+TESTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tests")
+
+
+def load_programs() -> Dict[str, str]:
+    progs = {}
+    for name in sorted(os.listdir(TESTS_DIR)):
+        if name.startswith("prog") and name.endswith(".txt"):
+            with open(os.path.join(TESTS_DIR, name), "r", encoding="utf-8") as f:
+                progs[name] = f.read()
+    return progs
+
+
+def scale_program(src: str, k: int) -> str:
+    # Repite k veces el cuerpo de la clase para obtener entradas grandes
+    start = src.index("{", src.index("class")) + 1
+    end = src.rindex("}")
+    return src[:start] + src[start:end] * k + src[end:]
+
+
+def synthetic_corpus(members: int) -> str:
+    # Clase grande con comentarios, literales y expresiones variadas
+    body = []
+    for i in range(members):
+        body.append(f"""
+    // metodo {i}
+    /* comentario de
+       bloque */
+    public int m{i}(int a, double b) {{
+        String s = "texto {i} con \\"escape\\"";
+        char c = 'x';
+        int r = a * {i} + (b - 3.5) / 2;
+        if (r >= 10 && s != null || !activo) {{ r = r - 1; }} else {{ r = helper(r, {i}); }}
+        for (i = 0; i < r; i = i + 1) {{ total = total + i; }}
+        return r;
+    }}""")
+    return "import java.util.*;\n\npublic class Corpus {\n" + "".join(body) + "\n}\n"
+
+
+def timeit(fn: Callable[[], object], repeat: int) -> float:
+    # Devuelve el mejor tiempo medio por llamada en segundos
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / repeat)
+    return best
+
+
+def bench_table(repeat: int = 50):
+    print("== Latencia por peticion (lexer + parser) ==")
+    shared = get_compiled()
+    for name, src in load_programs().items():
+        def fresh():
+            Parser(Lexer(src).lex(), compiled=ParserGenerator().compile()).parse()
+
+        def cached():
+            Parser(Lexer(src).lex(), compiled=shared).parse()
+
+        t_fresh = timeit(fresh, repeat)
+        t_cached = timeit(cached, repeat)
+        print(f"  {name:12s} sin tabla compartida: {t_fresh * 1e3:8.3f} ms"
+              f"   con tabla compartida: {t_cached * 1e3:8.3f} ms"
+              f"   x{t_fresh / t_cached:.1f}")
+
+
+def bench_startup(repeat: int = 20):
+    print("== Arranque en frio: tabla LL(1) ==")
+    fp = grammar_fingerprint()
+    t_gen = timeit(lambda: ParserGenerator().compile(), repeat)
+    t_load = timeit(lambda: load_artifact(fingerprint=fp), repeat)
+    print(f"  recalcular FIRST/FOLLOW/tabla: {t_gen * 1e3:8.3f} ms")
+    print(f"  cargar tabla_ll1.bin:          {t_load * 1e3:8.3f} ms   x{t_gen / t_load:.1f}")
+
+
+def bench_engines(scale: int = 100, repeat: int = 3):
+    print(f"== Motores del parser (programas x{scale}) ==")
+    # Los motores recursivos necesitan mas pila en entradas grandes
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 200000))
+    try:
+        for name, src in load_programs().items():
+            tokens = Lexer(scale_program(src, scale)).lex()
+            line = f"  {name:12s} {len(tokens):7d} tokens"
+            for engine in ENGINES:
+                t = timeit(lambda: Parser(tokens, engine=engine).parse(), repeat)
+                line += f"   {engine}: {t * 1e3:8.2f} ms ({len(tokens) / t / 1e3:6.0f} ktok/s)"
+            print(line)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def deep_program(stmts: int, terms: int) -> str:
+    # Un metodo con muchas sentencias y una cadena a + a + ... muy larga
+    chain = " + ".join(["a"] * terms)
+    return "class Deep { void m() { " + "x = 1; " * stmts + f"y = {chain}; }} }}"
+
+
+def bench_deep():
+    print("== Anidamiento profundo (StmtList / AddRest) ==")
+    for stmts, terms in ((1000, 1000), (5000, 20000)):
+        tokens = Lexer(deep_program(stmts, terms)).lex()
+        line = f"  {stmts:6d} sentencias, {terms:6d} sumandos:"
+        for engine in ENGINES:
+            try:
+                t = timeit(lambda: Parser(tokens, engine=engine).parse(), 1)
+                line += f"   {engine}: {t * 1e3:8.2f} ms"
+            except RecursionError:
+                line += f"   {engine}: RecursionError"
+        print(line)
+
+
+def bench_memory(scale: int = 1000):
+    print(f"== Memoria del arbol (bytes por token, programas x{scale}) ==")
+    for name, src in load_programs().items():
+        tokens = Lexer(scale_program(src, scale)).lex()
+        line = f"  {name:12s} {len(tokens):7d} tokens"
+        for mode in ("node", "flat", "ast"):
+            tracemalloc.start()
+            tree, _ = Parser(tokens).parse(mode)
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del tree
+            line += f"   {mode}: {size / len(tokens):6.1f} B/token"
+        print(line)
+
+
+def _peak_rss_kb(mode: str, scale: int) -> tuple:
+    # Corre en un proceso aparte para que ru_maxrss refleje solo este modo
+    import resource
+    src = scale_program(load_programs()["prog1.txt"], scale)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    lex = Lexer(src)
+    if mode == "lista":
+        tokens = lex.lex()
+        copy = [{"lexeme": t.value, "category": t.type, "line": t.line} for t in tokens]
+        Parser(tokens).parse()
+        del copy
+    elif mode == "stream":
+        Parser(lex.stream()).parse()
+    else:
+        Parser(lex.stream()).parse("none")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return len(src), peak - base
+
+
+def bench_stream():
+    import multiprocessing
+    print("== Pico de memoria (RSS) lexer + parser ==")
+    ctx = multiprocessing.get_context("spawn")
+    for scale in (2000, 8000):
+        line = ""
+        for mode in ("lista", "stream", "validar"):
+            with ctx.Pool(1) as pool:
+                size, kb = pool.apply(_peak_rss_kb, (mode, scale))
+            line += f"   {mode}: {kb / 1024:7.1f} MB"
+        print(f"  fuente de {size / 1e6:5.1f} MB:{line}")
+    print("  (lista = lex() + copia a dicts + arbol; stream = Lexer.stream() + arbol;"
+          " validar = Lexer.stream() sin arbol)")
+
+
+def bench_lexer(members: int = 5000):
+    from app.Back.tokenizer import tokenize_chars
+    src = synthetic_corpus(members)
+    print(f"== Lexer sobre corpus sintetico ({len(src) / 1e6:.1f} MB) ==")
+    n = sum(1 for _ in Lexer(src).stream())
+    t_raw = timeit(lambda: sum(1 for _ in tokenize_chars(src)), 1)
+    t_lex = timeit(lambda: sum(1 for _ in Lexer(src).stream()), 1)
+    print(f"  tokenize_chars (solo RawToken): {n / t_raw / 1e6:6.2f} Mtok/s")
+    print(f"  Lexer.stream (Token final):     {n / t_lex / 1e6:6.2f} Mtok/s   ({n} tokens, {t_lex * 1e3:.0f} ms)")
+
+
+def _mmap_run(mode: str, path: str) -> tuple:
+    import resource
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if mode == "str":
+        with open(path, "r", encoding="utf-8") as f:
+            _, errors = Parser(Lexer(f.read()).stream()).parse("none")
+    else:
+        from app.Back.mmap_lexer import MappedSource
+        with MappedSource(path) as src:
+            _, errors = Parser(src.stream()).parse("none")
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return elapsed, peak - base, len(errors)
+
+
+def bench_mmap(megabytes: int = 20):
+    import multiprocessing
+    import tempfile
+    print(f"== Validar un archivo de ~{megabytes} MB: read() vs mmap ==")
+    chunk = synthetic_corpus(200)
+    head, body = chunk[:chunk.index("{") + 1], chunk[chunk.index("{") + 1:chunk.rindex("}")]
+    with tempfile.NamedTemporaryFile("w", suffix=".java", delete=False, encoding="utf-8") as f:
+        f.write(head)
+        for _ in range(megabytes * 1_000_000 // len(body) + 1):
+            f.write(body)
+        f.write("}\n")
+        path = f.name
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        for mode in ("str", "mmap"):
+            with ctx.Pool(1) as pool:
+                elapsed, kb, nerr = pool.apply(_mmap_run, (mode, path))
+            print(f"  {mode:5s} {elapsed:7.2f} s   pico RSS +{kb / 1024:7.1f} MB   errores: {nerr}")
+        print("  (con mmap el RSS incluye paginas del archivo en cache, compartidas y descartables)")
+    finally:
+        os.unlink(path)
+
+
+def bench_layout():
+    import io
+    from app.Back.tree import walk
+    from app.Back.tree_layout import build_layout, write_svg
+    print("== Dibujo SVG nativo (Walker, sin Graphviz) ==")
+    src = load_programs()["prog1.txt"]
+    for scale in (10, 100, 400):
+        tree, _ = Parser(Lexer(scale_program(src, scale)).stream()).parse()
+        n = sum(1 for _ in walk(tree))
+        t_lay = timeit(lambda: build_layout(tree), 1)
+        t_svg = timeit(lambda: write_svg(tree, io.StringIO()), 1)
+        print(f"  {n:7d} nodos: layout {t_lay * 1e3:8.1f} ms   layout + SVG {t_svg * 1e3:8.1f} ms"
+              f"   ({t_svg / n * 1e6:5.2f} us/nodo)")
+
+
+def bench_incremental():
+    import re
+    from app.Back.incremental import Document
+    print("== Reanalisis incremental (editar un numero dentro de un metodo) ==")
+    src = load_programs()["prog1.txt"]
+    for scale in (100, 500, 2000):
+        doc = Document(scale_program(src, scale))
+        t_full = timeit(lambda: Document(doc.text), 1)
+        # Siempre el mismo literal en la mitad del archivo, alternando su largo
+        m = list(re.finditer(r"\b10\b", doc.text))[scale // 2]
+        edits = [(m.start(), m.start() + 2, "1000"), (m.start(), m.start() + 4, "10")]
+        t0 = time.perf_counter()
+        modes = set()
+        for i in range(20):
+            modes.add(doc.edit(*edits[i % 2]))
+        t_edit = (time.perf_counter() - t0) / 20
+        print(f"  {len(doc.tokens):7d} tokens: completo {t_full * 1e3:8.1f} ms   edicion {t_edit * 1e3:7.2f} ms"
+              f"   ({', '.join(sorted(modes))})")
+
+
+def bench_semantic():
+    from app.Back.semantic import SemanticHooks, run_semantic_on_tree
+    print("== Analisis semantico (tabla de simbolos) junto al parser ==")
+    src = load_programs()["prog1.txt"]
+    for scale in (10, 100, 1000):
+        code = scale_program(src, scale)
+        tokens = Lexer(code).lex()
+        line = f"  {len(tokens):7d} tokens:"
+        for mode in ("node", "ast"):
+            t_parse = timeit(lambda: Parser(tokens).parse(mode), 3)
+            tree, _ = Parser(tokens).parse(mode)
+            t_sem = timeit(lambda: run_semantic_on_tree(tree), 3)
+            line += (f"   {mode} parser {t_parse * 1e3:7.1f} ms + semantico {t_sem * 1e3:6.2f} ms"
+                     f" ({t_sem / t_parse * 100:4.1f} %)")
+        print(line)
+        # Tabla de simbolos durante el analisis (hooks), sin construir el arbol
+        t_none = timeit(lambda: Parser(tokens).parse("none"), 3)
+        t_hooks = timeit(lambda: Parser(tokens, hooks=SemanticHooks().hooks).parse("none"), 3)
+        print(f"  {'':13s}  sin arbol: solo parser {t_none * 1e3:7.1f} ms   parser + hooks {t_hooks * 1e3:7.1f} ms"
+              f" (+{(t_hooks / t_none - 1) * 100:4.1f} %)")
+
+
+class _NaiveGenerator(ParserGenerator):
+    # Punto fijo ingenuo (pasadas completas hasta que nada cambia), como
+    # referencia para bench_first_follow
+    def compute_first(self):
+        changed = True
+        while changed:
+            changed = False
+            for A, prods in self.grammar.items():
+                for prod in prods:
+                    before = len(self.first[A])
+                    self.first[A].update(self._naive_seq(prod))
+                    changed |= len(self.first[A]) != before
+
+    def _naive_seq(self, seq: List[str]) -> set:
+        res = set()
+        for X in seq:
+            if X == EPS:
+                continue
+            if X not in self.grammar:
+                res.add(X)
+                return res
+            res.update(self.first[X] - {EPS})
+            if EPS not in self.first[X]:
+                return res
+        res.add(EPS)
+        return res
+
+    def compute_follow(self):
+        self.follow[self.start].add("$")
+        changed = True
+        while changed:
+            changed = False
+            for A, prods in self.grammar.items():
+                for prod in prods:
+                    for i, B in enumerate(prod):
+                        if B in self.grammar:
+                            rest = self._naive_seq(prod[i + 1:])
+                            before = len(self.follow[B])
+                            self.follow[B].update(rest - {EPS})
+                            if EPS in rest:
+                                self.follow[B].update(self.follow[A])
+                            changed |= len(self.follow[B]) != before
+
+
+# La gramatica repetida k veces (X -> X_i) y encadenada: cada Stmt_i puede
+# abrir un Block de la copia siguiente y cada Type_i acepta los tipos de la
+# siguiente, donde la ultima agrega "var". FIRST(Type_0) depende asi de toda la
+# cadena, en el orden contrario al de la gramatica (el peor caso del punto fijo)
+def synthetic_grammar(k: int) -> Dict[str, List[List[str]]]:
+    out: Dict[str, List[List[str]]] = {}
+    for i in range(k):
+        for A, prods in GRAMMAR.items():
+            out[f"{A}_{i}"] = [[f"{X}_{i}" if X in GRAMMAR else X for X in prod] for prod in prods]
+        if i + 1 < k:
+            out[f"Stmt_{i}"].append(["goto", f"Block_{i + 1}"])
+            out[f"Type_{i}"].append([f"Type_{i + 1}"])
+    out[f"Type_{k - 1}"].append(["var"])
+    return out
+
+
+def bench_first_follow(repeat: int = 3):
+    print("== FIRST/FOLLOW: punto fijo ingenuo vs grafo de dependencias ==")
+    for k in (1, 5, 20, 50, 100):
+        grammar = synthetic_grammar(k)
+        start = f"{START_SYMBOL}_0"
+
+        def run(cls):
+            gen = cls(grammar, start)
+            gen.compute_first()
+            gen.compute_follow()
+            return gen
+
+        naive, fast = run(_NaiveGenerator), run(ParserGenerator)
+        assert naive.first == fast.first and naive.follow == fast.follow
+        t_naive = timeit(lambda: run(_NaiveGenerator), repeat)
+        t_fast = timeit(lambda: run(ParserGenerator), repeat)
+        print(f"  {len(grammar):5d} no terminales: ingenuo {t_naive * 1e3:8.2f} ms"
+              f"   grafo {t_fast * 1e3:7.2f} ms   x{t_naive / t_fast:.1f}")
+
+
+def bench_bitset(repeat: int = 5):
+    print("== Compilar la gramatica: FIRST/FOLLOW/tabla con set vs bitset ==")
+    cases = [("gramatica", GRAMMAR, START_SYMBOL)]
+    cases += [(f"sintetica x{k}", synthetic_grammar(k), f"{START_SYMBOL}_0") for k in (5, 20, 50)]
+    for name, grammar, start in cases:
+        t_sets = timeit(lambda: ParserGenerator(grammar, start).compile(), repeat)
+        t_bits = timeit(lambda: ParserGenerator(grammar, start, mode="bitset").compile(), repeat)
+        print(f"  {name:15s} {len(grammar):5d} no terminales: sets {t_sets * 1e3:8.2f} ms"
+              f"   bitset {t_bits * 1e3:8.2f} ms   x{t_sets / t_bits:.1f}")
+
+
+def bench_reload(repeat: int = 5):
+    print("== Recarga de la gramatica: compilacion completa vs incremental ==")
+    edits = [
+        ("Modifier + native", lambda g, s: {**g, f"Modifier{s}": g[f"Modifier{s}"] + [["native"]]}),
+        ("Type + float", lambda g, s: {**g, f"Type{s}": g[f"Type{s}"] + [["float"]]}),
+        ("Expr + lambda", lambda g, s: {**g, f"Expr{s}": g[f"Expr{s}"] + [["lambda", "id"]]}),
+    ]
+    cases = [("gramatica", GRAMMAR, START_SYMBOL, "")]
+    cases += [(f"sintetica x{k}", synthetic_grammar(k), f"{START_SYMBOL}_0", f"_{k - 1}") for k in (20, 50)]
+    for name, grammar, start, suffix in cases:
+        prev = ParserGenerator(grammar, start).compile()
+        for label, edit in edits:
+            new = edit(grammar, suffix)
+            t_full = timeit(lambda: ParserGenerator(new, start).compile(), repeat)
+            t_inc = timeit(lambda: ParserGenerator(new, start).update(prev), repeat)
+            gen = ParserGenerator(new, start)
+            gen.update(prev)
+            r = gen.recomputed
+            print(f"  {name:15s} {label:18s} completa {t_full * 1e3:8.2f} ms   incremental {t_inc * 1e3:7.2f} ms"
+                  f"   x{t_full / t_inc:4.1f}   (FIRST {r['first']}, FOLLOW {r['follow']}, filas {r['rows']}"
+                  f" de {len(new)})")
+
+
+# Corpus con errores: a cada token, con probabilidad `rate`, se lo borra, se
+# inserta antes otro token cualquiera del programa o se lo reemplaza
+def malformed_tokens(tokens: list, rate: float, seed: int = 0) -> tuple:
+    import random
+    rnd = random.Random(seed)
+    body, out, faults = tokens[:-1], [], 0
+    for tok in body:
+        r = rnd.random()
+        if r >= rate:
+            out.append(tok)
+            continue
+        faults += 1
+        if r < rate / 3:
+            continue
+        out.append(rnd.choice(body))
+        if r < 2 * rate / 3:
+            out.append(tok)
+    return out + tokens[-1:], faults
+
+
+def bench_recovery(copies: int = 200, repeat: int = 3):
+    print(f"== Recuperacion de errores: sync vs panic ({copies} variantes de cada programa) ==")
+    programs = [Lexer(src).lex() for src in load_programs().values()]
+
+    def run(corpus, mode):
+        errors = reached = 0
+        for toks in corpus:
+            p = Parser(toks, recovery=mode)
+            _, errs = p.parse("none")
+            errors += len(errs)
+            # Hasta donde llego el analisis (la pila puede vaciarse antes de "$")
+            reached += next(i for i, t in enumerate(toks) if t is p.curr) + 1
+        return errors, reached
+
+    for rate in (0.0, 0.005, 0.02, 0.1):
+        corpus, faults = [], 0
+        for i in range(copies):
+            for toks in programs:
+                bad, f = malformed_tokens(toks, rate, seed=i)
+                corpus.append(bad)
+                faults += f
+        total = sum(map(len, corpus))
+        line = f"  {rate * 100:4.1f} % tokens alterados ({faults:5d} fallas):"
+        for mode in ("sync", "panic"):
+            t = timeit(lambda: [Parser(toks, recovery=mode).parse("none") for toks in corpus], repeat)
+            errors, reached = run(corpus, mode)
+            line += (f"   {mode} {total / t / 1e3:5.0f} ktok/s {errors:6d} errores"
+                     f" ({reached / total * 100:5.1f} % de los tokens)")
+        print(line)
+    # Entradas hostiles: mucha basura seguida
+    end = programs[0][-1:]
+    for name, junk in (("')' x 50000", [")"] * 50000), ("'class {' x 25000", ["class", "{"] * 25000)):
+        bad = [Token(t, t, 1, 0) for t in junk] + end
+        line = f"  {name:34s}"
+        for mode in ("sync", "panic"):
+            t = timeit(lambda: Parser(bad, recovery=mode).parse("none"), repeat)
+            errors, _ = run([bad], mode)
+            line += f"   {mode} {len(bad) / t / 1e3:5.0f} ktok/s {errors:6d} errores"
+        print(line)
+    # Programas con errores de tests/ (errorN.txt): lo que informa cada modo
+    for name in sorted(os.listdir(TESTS_DIR)):
+        if name.startswith("error") and name.endswith(".txt"):
+            with open(os.path.join(TESTS_DIR, name), "r", encoding="utf-8") as f:
+                toks = Lexer(f.read()).lex()
+            for mode in ("sync", "panic"):
+                p = Parser(toks, recovery=mode)
+                _, errs = p.parse("none")
+                print(f"  {name:11s} {mode:5s} {' | '.join(errs)}  (+{p.suppressed} sin informar)")
+
+
+# Costo de las metricas: apagadas, con el registro del proceso y con los
+# tiempos de una peticion (collect)
+def bench_metrics(scale: int = 100, repeat: int = 5):
+    print(f"== Metricas: analisis completo de cada programa x{scale} ==")
+    was = metrics.enabled()
+    try:
+        for name, src in load_programs().items():
+            src = scale_program(src, scale)
+
+            def run():
+                Parser(Lexer(src).lex()).parse()
+
+            metrics.enable(False)
+            t_off = timeit(run, repeat)
+            metrics.enable(True)
+            t_on = timeit(run, repeat)
+            metrics.enable(False)
+            with metrics.collect() as rec:
+                t_rec = timeit(run, repeat)
+            counts = {k: v // (3 * repeat) for k, v in rec.counts.items()}
+            print(f"  {name:12s} apagadas {t_off * 1e3:7.2f} ms   registro {t_on * 1e3:7.2f} ms"
+                  f" ({(t_on / t_off - 1) * 100:+5.1f} %)   collect {t_rec * 1e3:7.2f} ms"
+                  f" ({(t_rec / t_off - 1) * 100:+5.1f} %)   {counts}")
+    finally:
+        metrics.enable(was)
+
+
+SECTIONS = {
+    "table": bench_table,
+    "startup": bench_startup,
+    "engines": bench_engines,
+    "deep": bench_deep,
+    "memory": bench_memory,
+    "stream": bench_stream,
+    "lexer": bench_lexer,
+    "mmap": bench_mmap,
+    "layout": bench_layout,
+    "incremental": bench_incremental,
+    "semantic": bench_semantic,
+    "first_follow": bench_first_follow,
+    "bitset": bench_bitset,
+    "reload": bench_reload,
+    "recovery": bench_recovery,
+    "metrics": bench_metrics,
+}
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m app.Back.bench")
+    ap.add_argument("secciones", nargs="*", help="secciones a correr (por defecto todas)")
+    ap.add_argument("--profile", metavar="SALIDA", help="perfilar las secciones con cProfile y guardar las estadisticas (pstats)")
+    args = ap.parse_args()
+    names: List[str] = args.secciones or list(SECTIONS)
+    for n in names:
+        if n not in SECTIONS:
+            print(f"Seccion desconocida: {n}. Opciones: {', '.join(SECTIONS)}")
+            sys.exit(1)
+    with metrics.profiled(args.profile), metrics.gc_paused():
+        for n in names:
+            SECTIONS[n]()
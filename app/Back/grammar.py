@@ -151,10 +151,11 @@ def get_nonterminals():
     return list(GRAMMAR.keys())
 
 
-def get_terminals():
-    nonterms = set(GRAMMAR.keys())
+def get_terminals(grammar=None):
+    grammar = grammar if grammar is not None else GRAMMAR
+    nonterms = set(grammar.keys())
     terms = set()
-    for prods in GRAMMAR.values():
+    for prods in grammar.values():
         for prod in prods:
             for sym in prod:
                 if sym != EPS and sym not in nonterms:
@@ -0,0 +1,213 @@
+# grammar_watch.py
+# Recarga en caliente de la gramatica.
+# GrammarWatcher revisa cada `interval` segundos un archivo de gramatica; si
+# cambio, lo compila a partir de la tabla actual (ParserGenerator.update: solo
+# se recalculan FIRST, FOLLOW y filas de los no terminales afectados) y la
+# instala con install_grammar. Los analisis que ya estaban corriendo terminan
+# con la tabla anterior; los siguientes usan la nueva.
+#
+# Formatos del archivo:
+#   .py    define GRAMMAR (como grammar.py) y opcionalmente START_SYMBOL
+#   .json  {"start": "Prog", "grammar": {"Prog": [["ImportList", "ClassDecl"]], ...}}
+#          o solo el objeto de la gramatica; [] equivale a ["ε"]
+#   otro   BNF simple, una regla por linea:
+#            # comentario
+#            Prog -> ImportList ClassDecl
+#            ImportList -> ImportDecl ImportList | ε
+#                       | otra alternativa en la linea siguiente
+#          los simbolos van separados por espacios y "|" suelto separa
+#          alternativas (un terminal "|" se escribe '|'); el simbolo inicial
+#          es el primero definido; "ε" o una alternativa vacia es epsilon
+# Solo cambia la tabla LL(1): el arbol "ast", el analisis semantico y las
+# sesiones de edicion dependen de las producciones de grammar.py y, con otra
+# gramatica instalada, se rechazan con un error (ver check_builtin_grammar).
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+from app.Back.grammar import EPS
+from app.Back.parser_generator import ParserGenerator, get_compiled, install_grammar
+
+Grammar = Dict[str, List[List[str]]]
+
+
+def load_grammar_file(path: str) -> Tuple[Grammar, str]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".py":
+        ns = runpy.run_path(path)
+        if "GRAMMAR" not in ns:
+            raise ValueError(f"{path} no define GRAMMAR")
+        grammar = ns["GRAMMAR"]
+        start = ns.get("START_SYMBOL")
+    elif ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and "grammar" in data:
+            grammar, start = data["grammar"], data.get("start")
+        else:
+            grammar, start = data, None
+    else:
+        with open(path, encoding="utf-8") as f:
+            grammar = parse_bnf(f.read())
+        start = None
+    return _check(grammar, start)
+
+
+def parse_bnf(text: str) -> Grammar:
+    grammar: Grammar = {}
+    current = None
+    for n, line in enumerate(text.splitlines(), 1):
+        words = line.split("#", 1)[0].split()
+        if not words:
+            continue
+        if words[0] == "|":
+            if current is None:
+                raise ValueError(f"Linea {n}: alternativa sin regla")
+            words = words[1:]
+        else:
+            if len(words) < 2 or words[1] not in ("->", "::="):
+                raise ValueError(f"Linea {n}: se esperaba 'A -> ...'")
+            current = words[0]
+            grammar.setdefault(current, [])
+            words = words[2:]
+        alt: List[str] = []
+        for w in words + ["|"]:
+            if w == "|":
+                grammar[current].append(alt or [EPS])
+                alt = []
+            else:
+                alt.append(w[1:-1] if len(w) > 2 and w[0] == w[-1] == "'" else w)
+    return grammar
+
+
+def _check(grammar, start) -> Tuple[Grammar, str]:
+    if not isinstance(grammar, dict) or not grammar:
+        raise ValueError("La gramatica esta vacia o no es un diccionario")
+    out: Grammar = {}
+    for A, prods in grammar.items():
+        if not isinstance(prods, list) or not prods:
+            raise ValueError(f"{A}: se esperaba una lista de producciones")
+        out[A] = []
+        for prod in prods:
+            if not isinstance(prod, list) or not all(isinstance(X, str) for X in prod):
+                raise ValueError(f"{A}: cada produccion es una lista de simbolos")
+            out[A].append(list(prod) or [EPS])
+    start = start if start is not None else next(iter(out))
+    if start not in out:
+        raise ValueError(f"Simbolo inicial desconocido: {start!r}")
+    return out, start
+
+
+@dataclass
+class Reload:
+    fingerprint: str
+    ms: float
+    nonterms: int
+    first: int
+    follow: int
+    rows: int
+    at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class GrammarWatcher:
+    def __init__(self, path: str, interval: float = 1.0, verbose: bool = True, history: int = 20):
+        self.path = path
+        self.interval = interval
+        self.verbose = verbose
+        self.reloads: "deque[Reload]" = deque(maxlen=history)
+        self.last_error: Optional[str] = None
+        self._seen = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # Carga el archivo ahora (si cambio desde la ultima vez) y devuelve la
+    # recarga, o None si no hubo cambios o el archivo tiene errores
+    def check(self) -> Optional[Reload]:
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError as e:
+                return self._error(f"No se puede leer {self.path}: {e}")
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp == self._seen:
+                return None
+            self._seen = stamp
+            try:
+                grammar, start = load_grammar_file(self.path)
+                prev = get_compiled()
+                t0 = time.perf_counter()
+                gen = ParserGenerator(grammar, start)
+                compiled = gen.update(prev)
+                ms = (time.perf_counter() - t0) * 1e3
+            except Exception as e:
+                return self._error(f"Gramatica invalida en {self.path}: {e}")
+            self.last_error = None
+            if compiled.fingerprint == prev.fingerprint:
+                return None
+            install_grammar(compiled)
+            reload = Reload(compiled.fingerprint, ms, len(compiled.nonterms), **gen.recomputed)
+            self.reloads.append(reload)
+        if self.verbose:
+            print(f"Gramatica recargada en {ms:.2f} ms: recalculados FIRST {reload.first}, "
+                  f"FOLLOW {reload.follow}, filas {reload.rows} de {reload.nonterms} no terminales"
+                  f" ({len(compiled.conflicts)} conflictos)", file=sys.stderr)
+        return reload
+
+    def _error(self, msg: str) -> None:
+        if msg != self.last_error and self.verbose:
+            print(msg, file=sys.stderr)
+        self.last_error = msg
+        return None
+
+    # Primera carga en el momento y despues revisa en un hilo
+    def start(self) -> "GrammarWatcher":
+        self.check()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="grammar-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def status(self) -> dict:
+        compiled = get_compiled()
+        return {
+            "path": self.path,
+            "fingerprint": compiled.fingerprint,
+            "start": compiled.start,
+            "nonterms": len(compiled.nonterms),
+            "terminals": len(compiled.terminals),
+            "conflicts": len(compiled.conflicts),
+            "error": self.last_error,
+            "reloads": [r.to_dict() for r in self.reloads],
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m app.Back.grammar_watch",
+                                 description="Vigila un archivo de gramatica y recompila la tabla al cambiar")
+    ap.add_argument("path", help="archivo .py, .json o BNF")
+    ap.add_argument("--interval", type=float, default=1.0, help="segundos entre revisiones")
+    args = ap.parse_args()
+    watcher = GrammarWatcher(args.path, args.interval).start()
+    print(f"Vigilando {args.path} (Ctrl+C para salir)", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,466 @@
+# incremental.py
+# Reanalisis incremental para sesiones de edicion (un editor que manda cambios).
+# Un Document guarda el texto, sus tokens y el arbol de derivacion. Los tokens
+# se parten en piezas: la cabecera (imports y "class X {"), cada Member sano de
+# la clase (sin errores ni tokens borrados) y los tramos con errores entre ellos.
+# Cuando llega una edicion (inicio, fin, texto nuevo) que cae dentro de un
+# Member sano:
+#   1. se busca el Stmt mas interno de un StmtList que contiene la edicion;
+#   2. se vuelve a leer solo ese Stmt, desde su primer token, hasta volver a
+#      encontrar el token que lo seguia (mismo tipo y valor, desplazado);
+#   3. se analiza solo ese Stmt (tabla LL(1) con simbolo inicial Stmt) y se
+#      reemplaza en su StmtList; el resto se reutiliza.
+# Si no queda un solo Stmt sin errores se prueba con el Stmt que lo contiene,
+# despues con el Member entero (tabla de Member) y si no, se analiza todo.
+# Un Member termina siempre en ';' o '}', y un Stmt de un StmtList va seguido de
+# otro Stmt o de '}' (nunca de "else"), asi que ninguna decision depende de lo
+# que venga despues y el subarbol es el mismo que daria el analisis completo.
+# Los errores de otros miembros tampoco cambian (solo se corren sus lineas): la
+# recuperacion mira hacia adelante a lo sumo TRIAL_TOKENS tokens, asi que basta
+# con que antes del Member haya TRIAL_TOKENS tokens sanos seguidos o el
+# principio del archivo. Si la edicion cruza miembros o cae en la cabecera o en
+# un tramo con errores, se analiza todo de nuevo.
+# Las posiciones de lo que sigue a la edicion no se corren en cada cambio: cada
+# pieza acumula un desplazamiento (pos, linea) pendiente y se aplican todos al
+# pedir doc.tokens, asi una edicion cuesta lo que mide el Stmt o el Member y no
+# el archivo. Hasta entonces las hojas del arbol pueden tener posiciones viejas.
+# Del mismo modo la cadena de MemberList se cambia en el lugar, salvo que el
+# arbol se haya entregado con shared_tree(): ahi se copia el camino que cambia.
+# Solo con la gramatica de grammar.py (ver check_builtin_grammar): con otra
+# instalada, crear o editar una sesion da ValueError.
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from app.Back.grammar import EPS
+from app.Back.lexer import Lexer, Token
+from app.Back.parser import TRIAL_TOKENS, Parser
+from app.Back.parser_generator import check_builtin_grammar, get_compiled
+from app.Back.tree import Node, walk
+
+_PARSE_LINE = re.compile(r"^\[Línea (\d+)\]")
+_LEX_AT = re.compile(r" at (\d+):(\d+)$")
+
+
+@dataclass(slots=True)
+class _Piece:
+    tokens: List[Token]
+    # Indice del Member en la cadena de MemberList, -1 si no es un Member sano
+    member: int = -1
+    # Sin errores ni tokens borrados
+    clean: bool = False
+
+
+# Desplazamientos (pos, linea) pendientes por pieza: add(i, ...) corre la pieza i
+# y todas las que siguen, at(i) da el total de la pieza i (arbol de Fenwick)
+class _Shifts:
+    def __init__(self, n: int):
+        self.pos = [0] * (n + 1)
+        self.line = [0] * (n + 1)
+        self.pending = False
+
+    def add(self, i: int, dpos: int, dline: int):
+        pos, line = self.pos, self.line
+        i += 1
+        while i < len(pos):
+            pos[i] += dpos
+            line[i] += dline
+            i += i & -i
+        self.pending = True
+
+    def at(self, i: int) -> Tuple[int, int]:
+        pos, line = self.pos, self.line
+        dpos = dline = 0
+        i += 1
+        while i:
+            dpos += pos[i]
+            dline += line[i]
+            i -= i & -i
+        return dpos, dline
+
+
+class Document:
+    def __init__(self, text: str):
+        self.text = text
+        self.lock = threading.Lock()
+        self.tree: Optional[Node] = None
+        self.errors: List[str] = []
+        self.lex_errors: List[str] = []
+        # Piezas de tokens (ver arriba), los MemberList de la cadena de la clase,
+        # las piezas que son un Member sano (en orden) y sus desplazamientos
+        self.pieces: List[_Piece] = []
+        self.holders: List[Node] = []
+        self.members: List[int] = []
+        self._shifts = _Shifts(0)
+        self._tokens: Optional[List[Token]] = None
+        self._owned = 0
+        self._unclosed = False
+        self.full_parse()
+
+    @property
+    def tokens(self) -> List[Token]:
+        if self._tokens is None:
+            shifts = self._shifts
+            if shifts.pending:
+                for i, piece in enumerate(self.pieces):
+                    dpos, dline = shifts.at(i)
+                    if dpos or dline:
+                        for t in piece.tokens:
+                            if t.pos >= 0:
+                                t.pos += dpos
+                                t.line += dline
+                self._shifts = _Shifts(len(self.pieces))
+            self._tokens = [t for piece in self.pieces for t in piece.tokens]
+        return self._tokens
+
+    def full_parse(self):
+        lex = Lexer(self.text)
+        tokens = lex.lex()
+        self.lex_errors = lex.errors
+        compiled = get_compiled()
+        check_builtin_grammar(compiled, "Una sesion de edicion")
+        self.tree, self.errors = Parser(tokens, compiled).parse("node")
+        self._tokens = tokens
+        self._index_members(tokens)
+        self._shifts = _Shifts(len(self.pieces))
+        self._owned = len(self.holders)
+        # Un "/*" sin cerrar (se lee como '/' '*') o una comilla sin pareja: un
+        # "*/" o '"' que aparezca despues cambia como se lee todo lo del medio
+        self._unclosed = any(a.type == "/" and b.type == "*" and b.pos == a.pos + 1
+                             for a, b in zip(tokens, tokens[1:])) or any("'\"'" in e for e in self.lex_errors)
+
+    def _index_members(self, tokens: List[Token]):
+        pieces = self.pieces = []
+        self.holders, self.members = [], []
+        prog = self.tree
+        if len(prog.children) != 2 or len(prog.children[1].children) != 6:
+            pieces.append(_Piece(tokens))
+            return
+        index = {id(t): i for i, t in enumerate(tokens)}
+        class_decl = prog.children[1]
+        head = [n for c in (prog.children[0], *class_decl.children[:4]) for n, _ in walk(c)]
+        cut = _sound(head, index, 0)
+        dirty = cut < 0
+        if dirty:
+            cut = 0
+        else:
+            pieces.append(_Piece(tokens[:cut], clean=True))
+        holder = class_decl.children[4]
+        while len(holder.children) == 2:
+            nodes = [n for n, _ in walk(holder.children[0])]
+            first = next((index[id(n.token)] for n in nodes if n.token is not None), -1)
+            size = _sound(nodes, index, first) if first >= 0 else -1
+            if size > 0:
+                if dirty or first > cut:
+                    pieces.append(_Piece(tokens[cut:first]))
+                pieces.append(_Piece(tokens[first:first + size], len(self.holders), True))
+                self.members.append(len(pieces) - 1)
+                cut, dirty = first + size, False
+            else:
+                dirty = True
+            self.holders.append(holder)
+            holder = holder.children[1]
+        pieces.append(_Piece(tokens[cut:]))
+
+    # Aplica la edicion y devuelve "incremental" o "full" segun como se resolvio
+    def edit(self, start: int, end: int, replacement: str) -> str:
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError(f"Rango fuera del texto: {start}..{end} (largo {len(self.text)})")
+        # Antes de tocar el texto, asi el documento queda como estaba
+        check_builtin_grammar(get_compiled(), "Una sesion de edicion")
+        text = self.text[:start] + replacement + self.text[end:]
+        closes = self._unclosed and ('"' in replacement
+                                     or "*/" in text[max(start - 1, 0):start + len(replacement) + 1])
+        if self.members and not closes and self._reparse(text, start, end, len(replacement) - (end - start)):
+            self.text = text
+            return "incremental"
+        self.text = text
+        self.full_parse()
+        return "full"
+
+    # Pieza del ultimo Member sano que empieza antes de pos, -1 si no hay
+    def _find(self, pos: int) -> int:
+        members, pieces, at = self.members, self.pieces, self._shifts.at
+        lo, hi = 0, len(members)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = members[mid]
+            if pieces[i].tokens[0].pos + at(i)[0] <= pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        return members[lo - 1] if lo else -1
+
+    # Antes de la pieza i hay TRIAL_TOKENS tokens sanos seguidos o el principio
+    # del archivo: ningun error anterior llego a mirar sus tokens
+    def _sealed(self, i: int) -> bool:
+        need = TRIAL_TOKENS
+        for j in range(i - 1, -1, -1):
+            piece = self.pieces[j]
+            if not piece.clean:
+                return False
+            need -= len(piece.tokens)
+            if need <= 0:
+                break
+        return True
+
+    def _reparse(self, text: str, start: int, end: int, delta: int) -> bool:
+        i = self._find(start)
+        if i < 0 or not self._sealed(i):
+            return False
+        pieces, shifts = self.pieces, self._shifts
+        piece = pieces[i]
+        toks = piece.tokens
+        dpos, dline = shifts.at(i)
+        if end > toks[-1].pos + dpos + len(toks[-1].value):
+            return False
+        # Token que sigue al Member (siempre hay una pieza mas, con "$" al final)
+        j = i + 1
+        while not pieces[j].tokens:
+            j += 1
+        follow = pieces[j].tokens[0]
+        if follow.pos < 0:
+            return False
+        fpos, fline = shifts.at(j)
+
+        # 1-2. El Stmt mas interno que se pueda releer y analizar solo, o el Member
+        member = self.holders[piece.member].children[0]
+        spans = _stmt_spans(member, toks, dpos, start, end) + [(0, len(toks) - 1, None)]
+        for lo, hi, holder in spans:
+            if hi + 1 < len(toks):
+                after, apos, aline = toks[hi + 1], toks[hi + 1].pos + dpos, toks[hi + 1].line + dline
+            else:
+                after, apos, aline = follow, follow.pos + fpos, follow.line + fline
+            last = toks[hi]
+            got = _reparse_span(text, toks[lo].pos + dpos, toks[lo].line + dline,
+                                last.pos + dpos + len(last.value), after, apos, delta,
+                                "Member" if holder is None else "Stmt")
+            if got is not None:
+                break
+        else:
+            return False
+        new_tokens, node, tok = got
+        ddl = tok.line - aline
+        dcol = tok.col - after.col
+        # Los errores despues del Member se corren de linea; si el Member ocupa
+        # una sola linea y hay un error en ella no se sabe de que lado esta
+        m_first, m_last = toks[0].line + dline, toks[-1].line + dline
+        if ddl and m_first == m_last and any(_error_line(e) == m_last for e in self.errors):
+            return False
+        region = (toks[lo].line + dline, toks[lo].col, last.line + dline, last.col + len(last.value))
+
+        # 3. Reemplazar el subarbol (el Stmt dentro de su Member) y los tokens
+        if holder is not None:
+            node = _replace_stmt(member, holder, node)
+        self._replace_member(piece.member, node)
+        for t in new_tokens:
+            t.pos -= dpos
+            t.line -= dline
+        toks[lo:hi + 1] = new_tokens
+        k = lo + len(new_tokens)
+        if dcol:
+            self._shift_cols(i, k, aline, dcol)
+        if delta or ddl:
+            for t in toks[k:]:
+                t.pos += delta
+                t.line += ddl
+            shifts.add(i + 1, delta, ddl)
+            if ddl:
+                self.errors = [_shift_error(e, m_last, ddl) for e in self.errors]
+        self.lex_errors = _shift_lex_errors(self.lex_errors, region, aline, ddl, dcol)
+        self._tokens = None
+        return True
+
+    # Corre la columna de los tokens que seguian en la linea line, desde el
+    # token k de la pieza i (pueden seguir en las piezas siguientes)
+    def _shift_cols(self, i: int, k: int, line: int, dcol: int):
+        for j in range(i, len(self.pieces)):
+            dline = self._shifts.at(j)[1]
+            for t in self.pieces[j].tokens[k if j == i else 0:]:
+                if t.pos < 0 or t.line + dline != line:
+                    return
+                t.col += dcol
+
+    # Arbol para guardar fuera del lock (p.ej. la cola de imagenes): desde aca
+    # las ediciones copian el camino que cambian en vez de tocarlo
+    def shared_tree(self) -> Node:
+        self._owned = 0
+        return self.tree
+
+    # Pone member en el MemberList k. Los primeros _owned MemberList (y la raiz,
+    # si hay alguno) se crearon despues del ultimo shared_tree y se cambian en
+    # el lugar; de los demas se copia solo el camino hasta k
+    def _replace_member(self, k: int, member: Node):
+        holders, owned = self.holders, self._owned
+        if k < owned:
+            holders[k].children[0] = member
+            return
+        holders[k] = Node("MemberList", None, [member, holders[k].children[1]])
+        for i in range(k - 1, owned - 1, -1):
+            holders[i] = Node("MemberList", None, [holders[i].children[0], holders[i + 1]])
+        if owned:
+            holders[owned - 1].children[1] = holders[owned]
+        else:
+            prog = self.tree
+            class_decl = prog.children[1]
+            children = list(class_decl.children)
+            children[4] = holders[0]
+            self.tree = Node(prog.symbol, None, [prog.children[0], Node(class_decl.symbol, None, children)])
+        self._owned = k + 1
+
+
+# Cantidad de tokens de nodes (un subarbol en preorden) si no tiene terminales
+# que faltaban ni nodos de error y sus tokens van seguidos desde first; si no, -1
+def _sound(nodes: List[Node], index: dict, first: int) -> int:
+    n = 0
+    for node in nodes:
+        if node.token is not None:
+            if index[id(node.token)] != first + n:
+                return -1
+            n += 1
+        elif not node.children and node.symbol != EPS:
+            return -1
+    return n
+
+
+# Los Stmt de un StmtList del Member que contienen la edicion, del mas interno al
+# mas externo: (primer token, ultimo token, StmtList que lo contiene)
+def _stmt_spans(member: Node, toks: List[Token], dpos: int, start: int, end: int) -> list:
+    found = []
+    # (profundidad, primer token, StmtList) de los Stmt abiertos en el recorrido
+    opened = []
+    holder = None
+    n = 0
+    for node, depth in walk(member):
+        while opened and opened[-1][0] >= depth:
+            _, first, h = opened.pop()
+            _contains(found, toks, first, n - 1, h, dpos, start, end)
+        if holder is not None:
+            opened.append((depth, n, holder))
+            holder = None
+        if node.token is not None:
+            n += 1
+        elif node.symbol == "StmtList" and len(node.children) == 2:
+            holder = node
+    while opened:
+        _, first, h = opened.pop()
+        _contains(found, toks, first, n - 1, h, dpos, start, end)
+    return found
+
+
+def _contains(found: list, toks: List[Token], first: int, last: int, holder: Node,
+              dpos: int, start: int, end: int):
+    tok = toks[last]
+    if toks[first].pos + dpos <= start and end <= tok.pos + dpos + len(tok.value):
+        found.append((first, last, holder))
+
+
+# Copia el camino Member -> holder (un StmtList) con stmt como primer hijo de holder
+def _replace_stmt(member: Node, holder: Node, stmt: Node) -> Node:
+    path = []
+    stack = [(member, 0)]
+    while stack:
+        node, depth = stack.pop()
+        del path[depth:]
+        path.append(node)
+        if node is holder:
+            break
+        if node.children:
+            stack.extend((c, depth + 1) for c in reversed(node.children))
+    new = Node(holder.symbol, None, [stmt, holder.children[1]])
+    for parent, child in zip(reversed(path[:-1]), reversed(path[1:])):
+        new = Node(parent.symbol, parent.token, [new if c is child else c for c in parent.children])
+    return new
+
+
+# Relee desde pos (con su linea) hasta resincronizar con el token after (que
+# estaba en apos) y analiza lo leido con simbolo inicial symbol. Devuelve
+# (tokens nuevos, subarbol, token con que se resincronizo) o None
+def _reparse_span(text: str, pos: int, line: int, end: int, after: Token, apos: int,
+                  delta: int, symbol: str) -> Optional[Tuple[List[Token], Node, Token]]:
+    new_end = end + delta
+    lex = Lexer(text)
+    new_tokens = []
+    for tok in lex.stream(start=pos, line=line):
+        if tok.pos < 0 or tok.pos >= new_end:
+            break
+        new_tokens.append(tok)
+    if (lex.errors or not new_tokens or tok.pos != apos + delta
+            or tok.type != after.type or tok.value != after.value
+            or new_tokens[-1].pos + len(new_tokens[-1].value) > new_end):
+        return None
+    # El driver termina al vaciar la pila: si sobran tokens, no es un solo symbol
+    parser = Parser(new_tokens + [Token("$", "$", -1, -1)], get_compiled(start=symbol))
+    node, errors = parser.parse("node")
+    if errors or parser.curr.type != "$":
+        return None
+    return new_tokens, node, tok
+
+
+def _error_line(error: str) -> int:
+    m = _PARSE_LINE.match(error)
+    return int(m.group(1)) if m else -1
+
+
+# Los errores del analisis desde la linea line (la ultima del Member) en adelante
+def _shift_error(error: str, line: int, dline: int) -> str:
+    n = _error_line(error)
+    if n < line:
+        return error
+    return f"[Línea {n + dline}]{error[_PARSE_LINE.match(error).end():]}"
+
+
+# Errores del lexer: los del tramo releido se van (el tramo nuevo no tiene), los
+# que siguen se corren de linea y, en la linea del token que lo seguia, de columna
+def _shift_lex_errors(errors: List[str], region: Tuple[int, int, int, int],
+                      line: int, dline: int, dcol: int) -> List[str]:
+    out = []
+    for error in errors:
+        m = _LEX_AT.search(error)
+        at = (int(m.group(1)), int(m.group(2)))
+        if at < region[:2]:
+            out.append(error)
+        elif at >= region[2:]:
+            col = at[1] + dcol if at[0] == line else at[1]
+            out.append(f"{error[:m.start()]} at {at[0] + dline}:{col}")
+    return out
+
+
+class SessionStore:
+    # Documentos por id de sesion; se descartan los menos usados al pasar de
+    # max_sessions y los que llevan mas de ttl segundos sin usarse
+    def __init__(self, max_sessions: int = 256, ttl: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._docs: "OrderedDict[str, Tuple[Document, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Las tablas con simbolo inicial Member y Stmt se compilan una sola vez
+        get_compiled(start="Member")
+        get_compiled(start="Stmt")
+
+    def create(self, text: str) -> Tuple[str, Document]:
+        doc = Document(text)
+        sid = uuid.uuid4().hex
+        with self._lock:
+            self._docs[sid] = (doc, time.monotonic())
+            self._expire()
+        return sid, doc
+
+    def get(self, sid: str) -> Optional[Document]:
+        with self._lock:
+            self._expire()
+            entry = self._docs.get(sid)
+            if entry is None:
+                return None
+            self._docs[sid] = (entry[0], time.monotonic())
+            self._docs.move_to_end(sid)
+            return entry[0]
+
+    def _expire(self):
+        docs = self._docs
+        limit = time.monotonic() - self.ttl
+        while docs and (len(docs) > self.max_sessions or next(iter(docs.values()))[1] < limit):
+            docs.popitem(last=False)
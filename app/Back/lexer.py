@@ -1,6 +1,8 @@
+import re
+import sys
 from dataclasses import dataclass
-from typing import List
-from .tokenizer import tokenize_chars, RawToken
+from typing import Iterator, List
+from app.Back import metrics
 
 KEYWORDS = {
     "import","class","public","private",
@@ -12,12 +14,14 @@ KEYWORDS = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     type: str
     value: str
     line: int
     col: int
+    # Posicion (indice de caracter) del token en la fuente; -1 para "$"
+    pos: int = -1
 
 class Lexer:
     def __init__(self, text: str):
@@ -26,53 +30,100 @@ class Lexer:
         self.errors: List[str] = []
 
     def lex(self) -> List[Token]:
-        for rt in tokenize_chars(self.src):
-            if rt.typ == "ILLEGAL":
-                self.errors.append(f"Illegal character {rt.val!r} at {rt.line}:{rt.col}")
-                continue
+        with metrics.span("lex"):
+            self.tokens = list(self.stream())
+        metrics.count("tokens", len(self.tokens) - 1)
+        return self.tokens
 
-            if rt.typ == "ID":
-                if rt.val in KEYWORDS:
-                    self.tokens.append(Token(rt.val, rt.val, rt.line, rt.col))
+    # Genera los tokens a medida que se leen, terminando en "$", sin guardar la
+    # lista completa. Con record=True ademas se van agregando a self.tokens.
+    # start: posicion desde la que se empieza a leer (debe ser un limite entre
+    # tokens; lo usa el reanalisis incremental), con su numero de linea.
+    def stream(self, record: bool = False, start: int = 0, line: int = 1) -> Iterator[Token]:
+        text = self.src
+        keep = self.tokens.append if record else None
+        errors = self.errors
+        intern = _INTERN.get
+        line_start = text.rfind("\n", 0, start) + 1
+        for m in _scan_regex.finditer(text, start):
+            k = m.lastindex
+            if k is None:
+                # Solo espacios/comentarios hasta el final del archivo
+                break
+            start = m.start(k)
+            skipped = m.start()
+            if start != skipped:
+                # Los espacios y comentarios previos vienen en el mismo match
+                nl = text.count("\n", skipped, start)
+                if nl:
+                    line += nl
+                    line_start = text.rfind("\n", skipped, start) + 1
+
+            val = m.group(k)
+            if k == _WORD:
+                typ = intern(val)
+                if typ is None:
+                    tok = Token("id", val, line, start - line_start + 1, start)
                 else:
-                    self.tokens.append(Token("id", rt.val, rt.line, rt.col))
-
-            elif rt.typ == "NUMBER":
-                self.tokens.append(Token("number", rt.val, rt.line, rt.col))
-
-            elif rt.typ == "STRING":
-                
-                self.tokens.append(Token("string_literal", rt.val, rt.line, rt.col))
-
-            elif rt.typ == "CHAR":
-                self.tokens.append(Token("char_literal", rt.val, rt.line, rt.col))
-
-            elif rt.typ == "OP":
-                
-                self.tokens.append(Token(rt.val, rt.val, rt.line, rt.col))
-
-            elif rt.typ == "SYMBOL":
-                
-                self.tokens.append(Token(rt.val, rt.val, rt.line, rt.col))
-
+                    tok = Token(typ, typ, line, start - line_start + 1, start)
+            elif k == _PUNCT:
+                typ = intern(val)
+                tok = Token(typ, typ, line, start - line_start + 1, start)
+            elif k == _ILLEGAL:
+                errors.append(f"Illegal character {val!r} at {line}:{start - line_start + 1}")
+                continue
             else:
-                
-                pass
+                tok = Token(_GROUP_TYPE[k], val, line, start - line_start + 1, start)
+
+            if keep:
+                keep(tok)
+            yield tok
+
+        tok = Token("$", "$", -1, -1)
+        if keep:
+            keep(tok)
+        yield tok
+
+
+# Un solo regex para todo el lexer. Cada match salta primero todos los espacios
+# y comentarios y luego toma un token; el tipo sale del indice del grupo
+# (m.lastindex) y las palabras clave / operadores son cadenas internadas.
+_skip = r"(?:[ \t\r\n]++|//[^\n]*+|/\*.*?\*/)*+"
+_scan_spec = [
+    ("NUMBER",  r"\d+(?:\.\d+)?"),
+    ("WORD",    r"[A-Za-z_][A-Za-z0-9_]*"),
+    ("STRING",  r"\"(?:\\.|[^\"\\])*\""),
+    ("CHAR",    r"\'(?:\\.|[^\'\\])\'"),
+    ("PUNCT",   r"==|!=|<=|>=|&&|\|\||[+\-*/=<>]|[(){}\[\],;.]"),
+    ("ILLEGAL", r"."),
+]
+_scan_regex = re.compile(_skip + "(?:" + "|".join(f"({p})" for _, p in _scan_spec) + r"|\Z)", re.DOTALL)
+_NUMBER, _WORD, _STRING, _CHAR, _PUNCT, _ILLEGAL = range(1, len(_scan_spec) + 1)
+_GROUP_TYPE = {_NUMBER: "number", _STRING: "string_literal", _CHAR: "char_literal"}
+
+_PUNCTUATION = ["==", "!=", "<=", ">=", "&&", "||", "+", "-", "*", "/", "=", "<", ">",
+                "(", ")", "{", "}", "[", "]", ",", ";", "."]
+_INTERN = {sys.intern(w): sys.intern(w) for w in list(KEYWORDS) + _PUNCTUATION}
 
-        self.tokens.append(Token("$", "$", -1, -1))
-        return self.tokens
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Uso: python -m app.Back.lexer programa.txt")
-        sys.exit(1)
-
-    with open(sys.argv[1], "r", encoding="utf-8") as f:
-        src = f.read()
-
-    lexer = Lexer(src)
-    tokens = lexer.lex()
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m app.Back.lexer")
+    ap.add_argument("archivo")
+    ap.add_argument("--mmap", action="store_true", help="leer el archivo con mmap sin cargarlo en memoria")
+    ap.add_argument("--profile", metavar="SALIDA", help="perfilar el lexer con cProfile y guardar las estadisticas (pstats)")
+    args = ap.parse_args()
+
+    with metrics.profiled(args.profile):
+        if args.mmap:
+            from app.Back.mmap_lexer import MappedSource
+            lexer = MappedSource(args.archivo)
+            tokens = list(lexer.stream()) if args.profile else lexer.stream()
+        else:
+            with open(args.archivo, "r", encoding="utf-8") as f:
+                src = f.read()
+            lexer = Lexer(src)
+            tokens = lexer.lex()
 
     print("TOKENS:")
     for t in tokens:
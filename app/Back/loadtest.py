@@ -0,0 +1,105 @@
+# loadtest.py
+# Prueba de carga de /api/analyze contra uno o mas servidores ya levantados,
+# p.ej. el sincronico (python -m app.run, puerto 5000) y el ASGI
+# (uvicorn app.asgi:app, puerto 8000):
+#   python -m app.Back.loadtest http://127.0.0.1:5000 http://127.0.0.1:8000 -c 32 -d 10
+# Cada cliente (un hilo con su conexion) manda peticiones una tras otra durante
+# la duracion indicada. Por defecto cada peticion agrega un comentario distinto
+# al programa, asi la cache de resultados no responde por el servidor (la
+# imagen del arbol si se reutiliza, porque los tokens son los mismos).
+import http.client
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+from urllib.parse import urlsplit
+from app.Back.batch import percentile
+
+
+def run_load(url: str, code: str, clients: int = 16, duration: float = 10.0, unique: bool = True,
+             semantic: bool = False) -> Dict:
+    parts = urlsplit(url)
+    path = (parts.path.rstrip("/") or "") + "/api/analyze"
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    counter = iter(range(sys.maxsize))
+    deadline = time.perf_counter() + duration
+
+    def client():
+        conn = None
+        lat, st = [], Counter()
+        while time.perf_counter() < deadline:
+            n = next(counter)
+            source = f"{code}\n// carga {n}\n" if unique else code
+            body = json.dumps({"code": source, "semantic": semantic}).encode("utf-8")
+            t0 = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                conn.request("POST", path, body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+                if resp.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                status = "conexion"
+                if conn is not None:
+                    conn.close()
+                conn = None
+            st[status] += 1
+            if status == 200:
+                lat.append((time.perf_counter() - t0) * 1e3)
+        if conn is not None:
+            conn.close()
+        with lock:
+            latencies.extend(lat)
+            statuses.update(st)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - t0
+    return {
+        "url": url,
+        "requests": sum(statuses.values()),
+        "ok": len(latencies),
+        "statuses": dict(statuses),
+        "rps": len(latencies) / total,
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies, default=0.0),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m app.Back.loadtest")
+    ap.add_argument("urls", nargs="+", help="servidores a comparar (p.ej. http://127.0.0.1:5000)")
+    ap.add_argument("-c", "--clients", type=int, default=16, help="clientes concurrentes")
+    ap.add_argument("-d", "--duration", type=float, default=10.0, help="segundos por servidor")
+    ap.add_argument("--program", default="tests/prog1.txt", help="programa a enviar")
+    ap.add_argument("--scale", type=int, default=1, help="repetir los miembros de la clase k veces")
+    ap.add_argument("--same", action="store_true", help="mismo codigo en cada peticion (mide la cache)")
+    ap.add_argument("--semantic", action="store_true", help="pedir tambien el analisis semantico")
+    args = ap.parse_args()
+
+    with open(args.program, encoding="utf-8") as f:
+        code = f.read()
+    if args.scale > 1:
+        from app.Back.bench import scale_program
+        code = scale_program(code, args.scale)
+
+    print(f"{args.clients} clientes, {args.duration:g} s por servidor, {len(code)} caracteres por programa")
+    print(f"{'servidor':<28} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}  respuestas")
+    for url in args.urls:
+        r = run_load(url, code, args.clients, args.duration, not args.same, args.semantic)
+        codes = ", ".join(f"{k}: {v}" for k, v in sorted(r["statuses"].items(), key=str))
+        print(f"{url:<28} {r['rps']:>8.1f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['max_ms']:>9.2f}  {codes}")
@@ -0,0 +1,232 @@
+# metrics.py
+# Tiempos y contadores de las etapas del analisis.
+#   with metrics.span("parse"): ...    suma la duracion a la etapa "parse"
+#   metrics.count("tokens", n)         suma n al contador "tokens"
+# Etapas: lex, parse, analyze (lexer + parser de una peticion), generate y
+# update (tabla LL(1)), export_dot, dot (proceso Graphviz) y svg (dibujo nativo).
+# Contadores: tokens, nodes, table_lookups, recovery_skips, bytes_written.
+#
+# Hay dos destinos y cada uno se enciende por separado:
+#   - el registro del proceso (enable()), que se exporta en el formato de texto
+#     de Prometheus (exposition(), /api/metrics)
+#   - los tiempos de un solo analisis (with collect() as rec), solo en el hilo
+#     que lo abre: el bloque "timings" de /api/analyze
+# Con los dos apagados no cuesta nada: span() devuelve un contexto vacio
+# compartido y count() no registra. Los bucles internos del lexer y del parser
+# nunca llaman aqui; sus conteos se calculan al terminar cada etapa y solo si
+# active() (ver Parser.parse).
+import gc
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+PREFIX = "analyzer"
+
+# Limites (segundos) de los histogramas de las etapas
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTERS = {
+    "tokens": "Tokens leidos por el lexer",
+    "nodes": "Nodos de los arboles de derivacion",
+    "table_lookups": "Consultas a la tabla LL(1)",
+    "recovery_skips": "Tokens descartados por la recuperacion de errores",
+    "bytes_written": "Bytes escritos en archivos DOT, PNG y SVG",
+}
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_NULL = nullcontext()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def add(self, seconds: float):
+        for i, le in enumerate(BUCKETS):
+            if seconds <= le:
+                self.buckets[i] += 1
+                break
+        self.sum += seconds
+        self.count += 1
+
+
+_stages: Dict[str, _Histogram] = {}
+_counters: Dict[str, int] = {}
+
+
+class Recorder:
+    # Tiempos (segundos, sumados por etapa) y conteos de un analisis
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def to_dict(self) -> dict:
+        return {"ms": {k: round(v * 1e3, 3) for k, v in self.stages.items()}, "counts": dict(self.counts)}
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+# True si algo se esta registrando en este hilo: para decidir si vale la pena
+# calcular conteos que cuestan (p.ej. contar las producciones reducidas)
+def active() -> bool:
+    return _enabled or getattr(_local, "rec", None) is not None
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0)
+
+
+def span(name: str):
+    if _enabled or getattr(_local, "rec", None) is not None:
+        return _Span(name)
+    return _NULL
+
+
+def observe(name: str, seconds: float):
+    rec = getattr(_local, "rec", None)
+    if rec is not None:
+        rec.stages[name] = rec.stages.get(name, 0.0) + seconds
+    if _enabled:
+        _observe(name, seconds)
+
+
+def count(name: str, n: int = 1):
+    rec = getattr(_local, "rec", None)
+    if rec is not None:
+        rec.counts[name] = rec.counts.get(name, 0) + n
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def _observe(name: str, seconds: float):
+    with _lock:
+        h = _stages.get(name)
+        if h is None:
+            h = _stages[name] = _Histogram()
+        h.add(seconds)
+
+
+# Tiempos de lo que se ejecute en este hilo dentro del bloque, aunque el
+# registro del proceso este apagado
+@contextmanager
+def collect() -> Iterator[Recorder]:
+    prev = getattr(_local, "rec", None)
+    rec = _local.rec = Recorder()
+    try:
+        yield rec
+    finally:
+        _local.rec = prev
+
+
+# collect() si `on`, si no un contexto que da None
+def maybe_collect(on: bool):
+    return collect() if on else nullcontext()
+
+
+# Suma al registro los tiempos de un analisis hecho en otro proceso
+# (Recorder.to_dict, p.ej. el de workers.analyze_request)
+def merge(timings: dict):
+    if not _enabled:
+        return
+    for name, ms in timings.get("ms", {}).items():
+        _observe(name, ms / 1e3)
+    with _lock:
+        for name, n in timings.get("counts", {}).items():
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+# Formato de texto de Prometheus (version 0.0.4)
+def exposition() -> str:
+    with _lock:
+        stages = {k: (list(h.buckets), h.sum, h.count) for k, h in _stages.items()}
+        counters = dict(_counters)
+    lines: List[str] = [
+        f"# HELP {PREFIX}_metrics_enabled 1 si el proceso esta registrando metricas",
+        f"# TYPE {PREFIX}_metrics_enabled gauge",
+        f"{PREFIX}_metrics_enabled {int(_enabled)}",
+        f"# HELP {PREFIX}_stage_seconds Duracion de cada etapa del analisis",
+        f"# TYPE {PREFIX}_stage_seconds histogram",
+    ]
+    for name in sorted(stages):
+        buckets, total, n = stages[name]
+        acc = 0
+        for le, k in zip(BUCKETS, buckets):
+            acc += k
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="{le:g}"}} {acc}')
+        lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {n}')
+        lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+        lines.append(f'{PREFIX}_stage_seconds_count{{stage="{name}"}} {n}')
+    for name in sorted(set(COUNTERS) | set(counters)):
+        metric = f"{PREFIX}_{name}_total"
+        lines.append(f"# HELP {metric} {COUNTERS.get(name, name)}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {counters.get(name, 0)}")
+    return "\n".join(lines) + "\n"
+
+
+# --profile de las lineas de comandos: corre el bloque con cProfile, guarda
+# las estadisticas en path (se leen con pstats.Stats(path) o snakeviz) y
+# muestra en stderr las `top` funciones con mas tiempo acumulado
+@contextmanager
+def profiled(path: Optional[str], top: int = 25):
+    if not path:
+        yield None
+        return
+    import cProfile
+    import pstats
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield prof
+    finally:
+        prof.disable()
+        prof.dump_stats(path)
+        pstats.Stats(prof, stream=sys.stderr).sort_stats("cumulative").print_stats(top)
+        print(f"Perfil guardado en {path}", file=sys.stderr)
+
+
+# Sin el GC ciclico mientras dura el bloque: los arboles y los layouts no
+# tienen ciclos, y en arboles grandes el GC los recorre una y otra vez mientras
+# crecen (mas de la mitad del tiempo). Es estado global del interprete, asi que
+# solo lo usan las lineas de comandos y bench, nunca el servidor.
+@contextmanager
+def gc_paused():
+    was = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was:
+            gc.enable()
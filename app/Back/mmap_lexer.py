@@ -0,0 +1,137 @@
+# mmap_lexer.py
+# Lexer sobre un mmap del archivo (regex de bytes) para fuentes muy grandes.
+# Los tokens guardan solo (inicio, largo) dentro del buffer: el texto se
+# decodifica cuando alguien pide .value, y la linea/columna se calculan con un
+# indice de saltos de linea y de bytes de continuacion UTF-8 que se construye
+# la primera vez que se necesita.
+import mmap
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Optional, Tuple
+from app.Back.lexer import _PUNCTUATION, KEYWORDS
+
+# Cada operador tiene su propio grupo: su tipo sale directo de m.lastindex.
+# Las palabras comparten un grupo y solo ahi se mira si son palabras clave.
+_skip = rb"(?:[ \t\r\n]++|//[^\n]*+|/\*.*?\*/)*+"
+_groups: List[Tuple[Optional[str], bytes]] = [
+    ("number", rb"\d+(?:\.\d+)?"),
+    ("string_literal", rb"\"(?:\\.|[^\"\\])*\""),
+    ("char_literal", rb"\'(?:\\.|[^\'\\])\'"),
+]
+_groups.append(("id", rb"[A-Za-z_][A-Za-z0-9_]*"))
+_groups += [(p, re.escape(p.encode())) for p in _PUNCTUATION]
+# Un caracter UTF-8 completo que no pertenece al lenguaje
+_groups.append((None, rb"[\xc0-\xff][\x80-\xbf]*|."))
+
+_scan_regex = re.compile(_skip + b"(?:" + b"|".join(b"(" + p + b")" for _, p in _groups) + rb"|\Z)", re.DOTALL)
+# _GROUP_TYPE[k] = tipo del token del grupo k (None = caracter ilegal)
+_GROUP_TYPE = [""] + [t for t, _ in _groups]
+_WORD = _GROUP_TYPE.index("id")
+_KEYWORD_TYPE = {kw.encode(): kw for kw in KEYWORDS}
+# Tokens cuyo valor es igual a su tipo (no hace falta decodificar)
+_FIXED = set(KEYWORDS) | set(_PUNCTUATION)
+
+
+class SpanToken:
+    __slots__ = ("type", "start", "length", "src")
+
+    def __init__(self, type: str, start: int, length: int, src: "MappedSource"):
+        self.type = type
+        self.start = start
+        self.length = length
+        self.src = src
+
+    @property
+    def value(self) -> str:
+        if self.type in _FIXED or self.start < 0:
+            return self.type
+        return self.src.text(self.start, self.length)
+
+    @property
+    def line(self) -> int:
+        return self.src.line_col(self.start)[0]
+
+    @property
+    def col(self) -> int:
+        return self.src.line_col(self.start)[1]
+
+    def __repr__(self) -> str:
+        return f"SpanToken({self.type!r}, {self.start}, {self.length})"
+
+
+class MappedSource:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                self.buf.madvise(mmap.MADV_SEQUENTIAL)
+        except ValueError:
+            # mmap no acepta archivos vacios
+            self.buf = b""
+        self._newlines: Optional[array] = None
+        # Tramos de bytes de continuacion UTF-8 (10xxxxxx): donde empieza cada
+        # uno y cuantos hay antes de el, para pasar de bytes a caracteres
+        self._cont_at: Optional[array] = None
+        self._cont_before: Optional[array] = None
+        self.errors: List[str] = []
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        self._file.close()
+
+    def __enter__(self) -> "MappedSource":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def text(self, start: int, length: int) -> str:
+        return self.buf[start:start + length].decode("utf-8", errors="replace")
+
+    def line_col(self, offset: int) -> Tuple[int, int]:
+        if offset < 0:
+            return -1, -1
+        if self._newlines is None:
+            self._index()
+        i = bisect_right(self._newlines, offset - 1)
+        line_start = self._newlines[i - 1] + 1 if i else 0
+        # Columna en caracteres, no en bytes (exacta si el archivo es UTF-8 valido)
+        before = self._cont_before
+        cont = before[bisect_left(self._cont_at, offset)] - before[bisect_left(self._cont_at, line_start)]
+        return i + 1, offset - line_start - cont + 1
+
+    def _index(self):
+        newlines, cont_at, before = array("q"), array("q"), array("q", [0])
+        for m in re.finditer(rb"(\n)|[\x80-\xbf]+", self.buf):
+            if m.lastindex:
+                newlines.append(m.start())
+            else:
+                cont_at.append(m.start())
+                before.append(before[-1] + m.end() - m.start())
+        self._cont_at, self._cont_before = cont_at, before
+        self._newlines = newlines
+
+    # Igual que Lexer.stream() pero con SpanToken; termina en "$"
+    def stream(self) -> Iterator[SpanToken]:
+        types = _GROUP_TYPE
+        keyword = _KEYWORD_TYPE.get
+        errors = self.errors
+        for m in _scan_regex.finditer(self.buf):
+            k = m.lastindex
+            if k is None:
+                break
+            typ = types[k]
+            start = m.start(k)
+            if k == _WORD:
+                # Solo palabras cortas se copian a bytes para buscarlas
+                typ = keyword(m.group(k), "id")
+            elif typ is None:
+                line, col = self.line_col(start)
+                errors.append(f"Illegal character {self.text(start, m.end() - start)!r} at {line}:{col}")
+                continue
+            yield SpanToken(typ, start, m.end() - start, self)
+        yield SpanToken("$", -1, 0, self)
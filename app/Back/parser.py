@@ -1,38 +1,347 @@
-from dataclasses import dataclass
-from typing import Any, List, Optional, Tuple
+from itertools import islice, tee
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from app.Back import metrics
 from app.Back.lexer import Lexer, Token
-from app.Back.parser_generator import ParserGenerator
-from app.Back.grammar import GRAMMAR, START_SYMBOL, EPS
-
-@dataclass
-class Node:
-    symbol: str
-    token: Optional[Token] = None
-    children: List[Any] = None
-    def __post_init__(self):
-        if self.children is None:
-            self.children = []
+from app.Back.parser_generator import CompiledGrammar, check_builtin_grammar, get_compiled
+from app.Back.grammar import EPS
+from app.Back.tree import EPS_LEAF, CountBuilder, FlatBuilder, HookBuilder, Node, NodeBuilder, NullBuilder, walk
+from app.Back.ast_builder import AstBuilder
+
+# Tipos de arbol que puede construir el motor "stack" ("none" solo valida)
+BUILDERS = {"node": NodeBuilder, "flat": FlatBuilder, "ast": AstBuilder, "none": NullBuilder}
+
+# Carga la tabla al importar (desde tabla_ll1.bin si coincide con la gramatica)
+get_compiled()
+
+# "stack" es el motor iterativo; "dict" e "int" son las versiones recursivas originales
+ENGINES = ("stack", "dict", "int")
+
+# Recuperacion de errores:
+#   "sync"  (motor "stack") retoma con los FOLLOW de todo lo que queda en la pila:
+#           inserta el terminal que falta si el token actual le sirve a lo que
+#           sigue, y si no lo borra (saltando hasta un token que sirva). Se
+#           informan como mucho REGION_MAX_ERRORS errores hasta aceptar
+#           REGION_TOKENS tokens seguidos, asi un error no arrastra a otros.
+#   "panic" la original: saltar hasta FOLLOW(A) y avanzar ante un terminal que falta
+RECOVERY = ("sync", "panic")
+REGION_TOKENS = 3
+REGION_MAX_ERRORS = 1
+
+# Acciones de recuperacion "sync" seguidas sobre el mismo token, sin
+# consumirlo: como mucho STALL_FACTOR * (profundidad de la pila + 4). Hasta ahi
+# se puede insertar un terminal o completar un no terminal con su produccion
+# mas corta en cada nivel, que es lo que hace falta cuando el token sirve recien
+# varios niveles abajo. Pasado el limite ya no se inserta ni se completa: un no
+# terminal borra el token (o, al final de la entrada, deja un nodo de error) y
+# un terminal tambien lo borra (o, al final, se inserta y sale de la pila). Cada
+# paso entonces consume entrada o achica la pila, asi que el analisis termina.
+STALL_FACTOR = 4
+
+# Cuando un no terminal puede repararse de dos formas (insertar el terminal con
+# que empieza una de sus producciones, o completarlo y seguir con lo de abajo),
+# se prueban las dos sobre los proximos TRIAL_TOKENS tokens y gana la que
+# acepta mas (o, si empatan, la que inserta menos): "int x int y;" es un ';'
+# que falta, "void m int a)" un '('
+TRIAL_TOKENS = 4
 
 class Parser:
-    def __init__(self, tokens: List[Token]):
+    # tokens puede ser una lista o un iterador (p.ej. Lexer.stream()); el motor
+    # "stack" lo consume de a uno con un solo token de anticipacion.
+    # hooks: {no terminal: fn(alt, valores)} que se llaman al terminar cada
+    # produccion (ver tree.HookBuilder); solo con el motor "stack"
+    # recovery: ver RECOVERY; por defecto "sync" en el motor "stack" y "panic"
+    # en los recursivos (que solo tienen esa)
+    def __init__(self, tokens: Iterable[Token], compiled: Optional[CompiledGrammar] = None, engine: str = "stack",
+                 hooks: Optional[Dict[str, Callable[[int, list], Any]]] = None, recovery: Optional[str] = None):
+        if engine not in ENGINES:
+            raise ValueError(f"Motor desconocido: {engine!r}. Opciones: {', '.join(ENGINES)}")
+        if hooks and engine != "stack":
+            raise ValueError(f"El motor {engine!r} no admite hooks; usar el motor 'stack'")
+        if recovery is None:
+            recovery = "sync" if engine == "stack" else "panic"
+        if recovery not in RECOVERY:
+            raise ValueError(f"Recuperacion desconocida: {recovery!r}. Opciones: {', '.join(RECOVERY)}")
+        if recovery != "panic" and engine != "stack":
+            raise ValueError(f"El motor {engine!r} solo tiene la recuperacion 'panic'")
+        if engine != "stack" and not isinstance(tokens, list):
+            tokens = list(tokens)
         self.tokens = tokens
         self.pos = 0
-        self.curr = tokens[0]
-        gen = ParserGenerator().generate()
-        self.table = gen["table"]
-        self.follow = gen["follow"]
+        self.curr = tokens[0] if isinstance(tokens, list) else None
+        self.engine = engine
+        # La tabla se construye una sola vez por proceso (ver get_compiled)
+        self.compiled = compiled if compiled is not None else get_compiled()
+        self.grammar = self.compiled.grammar
+        self.table = self.compiled.table
+        self.follow = self.compiled.follow
+        self.hooks = hooks
+        self.recovery = recovery
         self.errors: List[str] = []
+        # Errores que la recuperacion "sync" no informo por estar en la misma region
+        self.suppressed = 0
+        # Tokens descartados por la recuperacion, consultas a la tabla que
+        # fallaron y no terminales completados con su produccion mas corta
+        # (motor "stack"; los cuenta solo en los caminos de error)
+        self.skipped = self.misses = self.repairs = 0
+        self._last_error = -REGION_TOKENS
+        self._region_errors = 0
 
     def advance(self):
         if self.pos < len(self.tokens) - 1:
             self.pos += 1
             self.curr = self.tokens[self.pos]
 
-    def parse(self) -> Tuple[Node, List[str]]:
-        root = Node(START_SYMBOL)
-        self._parse_nonterm(START_SYMBOL, root)
+    # tree: "node" (arbol de derivacion), "flat" (arrays paralelos), "ast"
+    # (arbol abstracto armado durante el analisis) o "none" (solo validar, devuelve
+    # None); todos salvo "node" requieren el motor "stack"
+    def parse(self, tree: str = "node") -> Tuple[Any, List[str]]:
+        if tree not in BUILDERS:
+            raise ValueError(f"Tipo de arbol desconocido: {tree!r}. Opciones: {', '.join(BUILDERS)}")
+        if tree == "ast":
+            check_builtin_grammar(self.compiled, "El arbol 'ast'")
+        with metrics.span("parse"):
+            return self._parse(tree)
+
+    def _parse(self, tree: str) -> Tuple[Any, List[str]]:
+        if self.engine == "stack":
+            builder = BUILDERS[tree](self.compiled.int_table)
+            if self.hooks:
+                builder = HookBuilder(builder, self.hooks, self.compiled.int_table)
+            counter = None
+            if metrics.active():
+                builder = counter = CountBuilder(builder, self.compiled.int_table)
+            result = self._parse_stack(builder)
+            if counter is not None:
+                self._count(counter.counts)
+            return result, self.errors
+        if tree != "node":
+            raise ValueError(f"El motor {self.engine!r} solo construye arboles de tipo 'node'")
+        root = Node(self.compiled.start, None, [])
+        if self.engine == "int":
+            self.it = self.compiled.int_table
+            self.ids = self.it.token_ids(self.tokens)
+            self._parse_nonterm_int(self.it.start, root)
+        else:
+            self._parse_nonterm(self.compiled.start, root)
         return root, self.errors
 
+    # Conteos para metrics a partir de las reducciones (counts[p]): cada nodo
+    # salvo la raiz es hijo de una reduccion, y cada reduccion que no fue una
+    # reparacion salio de una consulta a la tabla
+    def _count(self, counts: List[int]):
+        prods = self.compiled.int_table.prods
+        metrics.count("nodes", 1 + sum(n * len(prods[p]) for p, n in enumerate(counts) if n))
+        metrics.count("table_lookups", sum(counts) - self.repairs + self.misses)
+        metrics.count("recovery_skips", self.skipped)
+
+    # Driver predictivo con pila explicita: la profundidad del arbol solo esta
+    # limitada por la memoria. Los nodos se arman de abajo hacia arriba: cada
+    # expansion deja una marca de reduccion (N + p) en la pila y, al sacarla,
+    # los hijos ya terminados en `vals` pasan a ser los children del nodo.
+    def _parse_stack(self, builder):
+        it = self.compiled.int_table
+        table, follow, rev_prods = it.table, it.follow, it.rev_prods
+        term_names, eps = it.term_names, it.eps
+        N = len(it.nonterm_names)
+        get, unknown = it.term_id.get, it.unknown
+        end = it.term_id["$"]
+        errors = self.errors
+        sync = self.recovery == "sync"
+        sync_masks, repair, repair_cost = it.sync_masks, it.repair, it.repair_cost
+        first_mask, nullable, insert_prod = it.first_mask, it.nullable, it.insert_prod
+        report = self._report
+
+        leaf, missing, reduce, eps_leaf = builder.leaf, builder.missing, builder.reduce, builder.eps
+
+        # Al llegar a "$" (o al agotar la entrada) ya no se avanza mas
+        src = iter(self.tokens)
+        curr = next(src)
+        a = get(curr.type, unknown)
+        stack = [it.start]
+        vals: List[Any] = []
+        marks: List[int] = []
+        # Tokens aceptados, para las regiones de errores; y acciones de
+        # recuperacion seguidas sobre el mismo token, para no ciclar
+        shifted = 0
+        stall_tok, stalls = None, 0
+        skipped = misses = repairs = 0
+        # Recuperacion "sync": union de sync_masks de la pila, ver _sync_reach
+        cum: List[int] = []
+        cmarks: List[Tuple[int, int]] = []
+        mlow, vtop = 0, -1
+        base = 1 << end
+
+        while stack:
+            x = stack.pop()
+            if x >= N:
+                start = marks.pop()
+                if start <= vtop and len(marks) < mlow:
+                    mlow = len(marks)
+                node = reduce(x - N, vals[start:])
+                del vals[start:]
+                vals.append(node)
+
+            elif x >= 0:
+                p = table[x][a]
+                if p >= 0:
+                    marks.append(len(vals))
+                    stack.append(N + p)
+                    stack.extend(rev_prods[p])
+                    continue
+                misses += 1
+                if not sync:
+                    errors.append(f"[Línea {curr.line}] Error sintáctico: token inesperado '{curr.value}'.")
+                    vals.append(builder.error(x))
+                    # Modo panico: saltar hasta un token en FOLLOW(A)
+                    follow_set = follow[x]
+                    while a != end and a not in follow_set:
+                        nxt = next(src, None)
+                        if nxt is None:
+                            break
+                        skipped += 1
+                        curr = nxt
+                        a = get(curr.type, unknown)
+                    continue
+
+                # Terminales con los que se puede seguir: FOLLOW de x y de todo
+                # lo pendiente en la pila
+                below, vtop = _sync_reach(stack, marks, mlow, cum, cmarks, N, sync_masks, base)
+                mlow = len(cmarks)
+                mask = sync_masks[x] | below
+                if curr is not stall_tok:
+                    stall_tok, stalls = curr, 0
+                stalls += 1
+                stalled = stalls > STALL_FACTOR * (len(stack) + 4)
+                p = insert_prod[x].get(a)
+                if p is not None and not stalled and mask >> a & 1:
+                    src, look = tee(src)
+                    ahead = [a] + [get(t.type, unknown) for t in islice(look, TRIAL_TOKENS - 1)]
+                    took = _trial(stack, [N + p] + list(rev_prods[p][:-1]), ahead, table, rev_prods, N, eps)
+                    rest = _trial(stack, [], ahead, table, rev_prods, N, eps)
+                    # Empate: la que inserta menos terminales
+                    if took < rest or took == rest and repair_cost[x] <= 1:
+                        p = None
+                if p is not None and not stalled:
+                    # Falta solo el terminal con que empieza p: se expande p y el
+                    # terminal se inserta al llegar a el ("Falta '{'")
+                    marks.append(len(vals))
+                    stack.append(N + p)
+                    stack.extend(rev_prods[p])
+                    continue
+                reported = False
+                if not mask >> a & 1 or stalled:
+                    # El token no le sirve a nadie: borrarlo (y los siguientes)
+                    # hasta uno con el que x o algo de la pila pueda seguir
+                    report(f"[Línea {curr.line}] Error sintáctico: token inesperado '{curr.value}'.", shifted)
+                    reported = True
+                    while a != end:
+                        curr = next(src, curr)
+                        a = get(curr.type, unknown)
+                        skipped += 1
+                        if mask >> a & 1 or table[x][a] >= 0:
+                            break
+                    if table[x][a] >= 0:
+                        stack.append(x)
+                        continue
+                if not reported and not stalled:
+                    # El token le sirve a lo que sigue: completar x con su
+                    # produccion mas corta. Si falta un solo terminal se informa
+                    # al insertarlo ("Falta ';'"); si falta mas, el token se
+                    # informa aqui como inesperado
+                    if repair_cost[x] > 1:
+                        report(f"[Línea {curr.line}] Error sintáctico: token inesperado '{curr.value}'.", shifted)
+                    p = repair[x]
+                    repairs += 1
+                    marks.append(len(vals))
+                    stack.append(N + p)
+                    stack.extend(rev_prods[p])
+                    continue
+                vals.append(builder.error(x))
+
+            else:
+                t = ~x
+                if t == a:
+                    vals.append(leaf(t, curr))
+                    shifted += 1
+                    if a != end:
+                        curr = next(src, curr)
+                        a = get(curr.type, unknown)
+                elif t == eps:
+                    vals.append(eps_leaf)
+                elif sync:
+                    mask, vtop = _sync_reach(stack, marks, mlow, cum, cmarks, N, sync_masks, base)
+                    mlow = len(cmarks)
+                    # Insertar t solo sirve si el token puede ir justo despues: FIRST
+                    # de lo que sigue en este lado derecho, mientras derive ε (una
+                    # marca o un terminal ya aportan lo suyo en mask)
+                    i = len(stack)
+                    while i:
+                        v = stack[i - 1]
+                        if v < 0 or v >= N:
+                            break
+                        mask |= first_mask[v]
+                        if not nullable[v]:
+                            break
+                        i -= 1
+                    if curr is not stall_tok:
+                        stall_tok, stalls = curr, 0
+                    stalls += 1
+                    if mask >> a & 1 and stalls <= STALL_FACTOR * (len(stack) + 4) or a == end:
+                        # Insercion: falta t y el token actual sirve para lo que sigue
+                        report(f"[Línea {curr.line}] Falta '{term_names[t]}' antes de '{curr.value}'.", shifted)
+                        vals.append(missing(t))
+                        continue
+                    # Borrado: el token sobra; se salta hasta t o uno que sirva
+                    report(f"[Línea {curr.line}] Error sintáctico: token inesperado '{curr.value}'.", shifted)
+                    while a != end:
+                        curr = next(src, curr)
+                        a = get(curr.type, unknown)
+                        skipped += 1
+                        if a == t or mask >> a & 1:
+                            break
+                    if t == a:
+                        vals.append(leaf(t, curr))
+                        shifted += 1
+                        if a != end:
+                            curr = next(src, curr)
+                            a = get(curr.type, unknown)
+                    else:
+                        vals.append(missing(t))
+                else:
+                    errors.append(f"[Línea {curr.line}] Falta '{term_names[t]}' antes de '{curr.value}'.")
+                    if a == end:
+                        vals.append(missing(t))
+                        continue
+                    curr = next(src, curr)
+                    a = get(curr.type, unknown)
+                    skipped += 1
+                    if t == a:
+                        vals.append(leaf(t, curr))
+                        if a != end:
+                            curr = next(src, curr)
+                            a = get(curr.type, unknown)
+                    else:
+                        vals.append(missing(t))
+
+        if sync and a != end:
+            # La pila se vacio antes del final: lo que queda no se analiza
+            report(f"[Línea {curr.line}] Error sintáctico: token inesperado '{curr.value}'.", shifted)
+        self.curr = curr
+        self.skipped, self.misses, self.repairs = skipped, misses, repairs
+        return builder.finish(vals[0])
+
+    # Recuperacion "sync": una region termina al aceptar REGION_TOKENS tokens
+    # desde el ultimo error; dentro de ella solo se informan REGION_MAX_ERRORS
+    def _report(self, msg: str, shifted: int):
+        if shifted - self._last_error >= REGION_TOKENS:
+            self._region_errors = 0
+        self._last_error = shifted
+        if self._region_errors < REGION_MAX_ERRORS:
+            self.errors.append(msg)
+        else:
+            self.suppressed += 1
+        self._region_errors += 1
+
     def _parse_nonterm(self, A: str, parent: Node):
         a = self.curr.type
         prod = self.table.get((A, a))
@@ -49,17 +358,17 @@ class Parser:
                     return
             return
         
-        if prod == [EPS]:
-            parent.children.append(Node(EPS))
+        if prod == (EPS,):
+            parent.children.append(EPS_LEAF)
             return
 
         for sym in prod:
             if sym in EPS:
-                parent.children.append(Node(EPS))
+                parent.children.append(EPS_LEAF)
                 continue
 
-            if sym in GRAMMAR:
-                node = Node(sym)
+            if sym in self.grammar:
+                node = Node(sym, None, [])
                 parent.children.append(node)
                 self._parse_nonterm(sym, node)
             else:
@@ -80,36 +389,181 @@ class Parser:
                         else:
                             parent.children.append(Node(sym))
 
+    # Igual que _parse_nonterm pero con la tabla densa de enteros (IntTable)
+    def _parse_nonterm_int(self, A: int, parent: Node):
+        it, ids = self.it, self.ids
+        p = it.table[A][ids[self.pos]]
+        if p < 0:
+            self.errors.append(f"[Línea {self.curr.line}] Error sintáctico: token inesperado '{self.curr.value}'.")
+            follow_set = it.follow[A]
+            if self.curr.type == "$":
+                return
+            while ids[self.pos] not in follow_set:
+                self.advance()
+                if self.curr.type == "$":
+                    return
+            return
+
+        children = parent.children
+        for x in it.prods[p]:
+            if x >= 0:
+                node = Node(it.nonterm_names[x], None, [])
+                children.append(node)
+                self._parse_nonterm_int(x, node)
+                continue
+
+            t = ~x
+            if t == it.eps:
+                children.append(EPS_LEAF)
+            elif ids[self.pos] == t:
+                children.append(Node(it.term_names[t], token=self.curr))
+                self.advance()
+            else:
+                sym = it.term_names[t]
+                self.errors.append(f"[Línea {self.curr.line}] Falta '{sym}' antes de '{self.curr.value}'.")
+                if self.curr.type == "$":
+                    children.append(Node(sym))
+                else:
+                    self.advance()
+                    if ids[self.pos] == t:
+                        children.append(Node(sym, token=self.curr))
+                        self.advance()
+                    else:
+                        children.append(Node(sym))
+
+# Terminales con los que la recuperacion "sync" puede retomar: la union de
+# sync_masks de toda la pila, mas base ("$"). Sin recorrer la pila en cada
+# error: cum[i] guarda la union de stack[0..i] y cmarks, por cada marca de
+# reduccion dentro de cum, (posicion en la pila, valor en marks). Las marcas de
+# la pila son, en orden, las entradas de marks, y lo que esta debajo de una
+# marca no cambia hasta reducirla: cum sirve hasta la marca mas alta de cmarks
+# que sigue en la pila. El driver anota en mlow el menor len(marks) despues de
+# una reduccion, pero solo si la marca reducida podia estar en cmarks (su valor
+# no pasa de vtop, el de la ultima): sin errores vtop es -1 y no anota nada.
+# Cada llamada extiende cum sobre lo que cambio desde la anterior y recorre a lo
+# sumo el lado derecho que queda arriba de la ultima marca, asi que cada error
+# cuesta O(1) amortizado aunque la pila sea muy profunda. Devuelve la union y
+# el nuevo vtop.
+def _sync_reach(stack: List[int], marks: List[int], mlow: int, cum: List[int], cmarks: List[Tuple[int, int]],
+                N: int, sync_masks: Dict[int, int], base: int) -> Tuple[int, int]:
+    del cmarks[mlow:]
+    valid = cmarks[-1][0] + 1 if cmarks else 0
+    top = i = len(stack)
+    while i > valid and stack[i - 1] < N:
+        i -= 1
+    del cum[valid:]
+    acc = cum[-1] if cum else base
+    for k in range(valid, i):
+        v = stack[k]
+        if v >= N:
+            cmarks.append((k, marks[len(cmarks)]))
+        acc |= sync_masks[v]
+        cum.append(acc)
+    for v in stack[i:top]:
+        acc |= sync_masks[v]
+    return acc, cmarks[-1][1] if cmarks else -1
+
+# Cuantos de los tokens `ahead` (ids) se aceptan, sin recuperar errores, con
+# la pila stack + top; no modifica stack
+def _trial(stack: List[int], top: List[int], ahead: List[int], table, rev_prods, N: int, eps: int) -> int:
+    depth = len(stack)
+    n = 0
+    while n < len(ahead):
+        if top:
+            v = top.pop()
+        elif depth:
+            depth -= 1
+            v = stack[depth]
+        else:
+            break
+        if v >= N:
+            continue
+        if v >= 0:
+            p = table[v][ahead[n]]
+            if p < 0:
+                break
+            top.extend(rev_prods[p])
+        elif ~v == ahead[n]:
+            n += 1
+        elif ~v != eps:
+            break
+    return n
+
+
 def print_tree(node: Node, indent=0):
-    pad = "  " * indent
-    if node.token:
-        print(f"{pad}{node.symbol} -> {node.token.value}")
-    elif not node.children:
-        print(f"{pad}{node.symbol}")
-    else:
-        print(f"{pad}{node.symbol}")
-        for c in node.children:
-            print_tree(c, indent + 1)
+    for n, depth in walk(node):
+        pad = "  " * (indent + depth)
+        if n.token:
+            print(f"{pad}{n.symbol} -> {n.token.value}")
+        elif getattr(n, "value", None) is not None:
+            print(f"{pad}{n.symbol} -> {n.value}")
+        else:
+            print(f"{pad}{n.symbol}")
 
 
 #Esto es para hacer pruebas con el parser en vez de andar levantando el servidor
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Uso: python -m app.Back.parser programa.txt")
-        sys.exit(1)
-    with open(sys.argv[1], "r", encoding="utf-8") as f:
-        text = f.read()
-    lex = Lexer(text)
-    tokens = lex.lex()
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m app.Back.parser")
+    ap.add_argument("archivo")
+    ap.add_argument("--tree", choices=list(BUILDERS), default="node", help="tipo de arbol a imprimir")
+    ap.add_argument("--mmap", action="store_true", help="leer el archivo con mmap sin cargarlo en memoria")
+    ap.add_argument("--svg", metavar="SALIDA", help="dibujar el arbol en un SVG (sin Graphviz)")
+    ap.add_argument("--dot", metavar="SALIDA", help="exportar el arbol en formato DOT (Graphviz)")
+    ap.add_argument("--collapse", action="store_true", help="DOT: quitar hojas ε y juntar cadenas de un solo hijo")
+    ap.add_argument("--max-depth", type=int, help="DOT: profundidad maxima")
+    ap.add_argument("--max-nodes", type=int, help="DOT: cantidad maxima de nodos")
+    ap.add_argument("--semantic", action="store_true", help="armar la tabla de simbolos durante el analisis")
+    ap.add_argument("--recovery", choices=RECOVERY, default="sync", help="recuperacion de errores sintacticos")
+    ap.add_argument("--profile", metavar="SALIDA", help="perfilar el analisis con cProfile y guardar las estadisticas (pstats)")
+    args = ap.parse_args()
+    sem = None
+    if args.semantic:
+        from app.Back.semantic import SemanticHooks
+        sem = SemanticHooks()
+    hooks = sem.hooks if sem else None
+    with metrics.profiled(args.profile), metrics.gc_paused():
+        if args.mmap:
+            from app.Back.mmap_lexer import MappedSource
+            lex = MappedSource(args.archivo)
+            tree, errs = Parser(lex.stream(), hooks=hooks, recovery=args.recovery).parse(args.tree)
+        else:
+            with open(args.archivo, "r", encoding="utf-8") as f:
+                text = f.read()
+            lex = Lexer(text)
+            tokens = lex.lex()
+            tree, errs = Parser(tokens, hooks=hooks, recovery=args.recovery).parse(args.tree)
+        if tree is not None and args.svg:
+            from app.Back.tree_layout import write_svg
+            with open(args.svg, "w", encoding="utf-8") as f:
+                write_svg(tree, f)
+        elif tree is not None and args.dot:
+            from app.Back.tree_viz import export_dot
+            export_dot(tree, args.dot, drop_eps=args.collapse, collapse=args.collapse,
+                       max_depth=args.max_depth, max_nodes=args.max_nodes)
     if lex.errors:
         print("Lexer errors:")
         for e in lex.errors:
             print("-", e)
-    p = Parser(tokens)
-    tree, errs = p.parse()
-    print_tree(tree)
+    if tree is not None and (args.svg or args.dot):
+        print(f"Arbol guardado en {args.svg or args.dot}")
+    elif tree is not None:
+        print_tree(tree)
     if errs:
         print("\nSyntax errors:")
         for e in errs:
             print("-", e)
+    if sem is not None:
+        print("\nSymbol table:")
+        for cname, cls in sem.classes.items():
+            print(f"- class {cname}")
+            for name, t in cls["fields"].items():
+                print(f"    field {t} {name}")
+            for name, m in cls["methods"].items():
+                params = ", ".join(f"{t} {n}" for t, n in m["params"])
+                local = ", ".join(f"{t} {n}" for n, t in m["locals"].items())
+                print(f"    method {m['ret']} {name}({params})" + (f"  locals: {local}" if local else ""))
+        if sem.errors:
+            print("\nSemantic errors:")
+            for e in sem.errors:
+                print("-", e)
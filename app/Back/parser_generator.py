@@ -1,69 +1,135 @@
-from typing import Dict, List, Set, Tuple
+import hashlib
+import json
+import marshal
+import os
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+from app.Back import metrics
 from app.Back.grammar import GRAMMAR, START_SYMBOL, EPS, get_terminals
 
+ARTIFACT_PATH = os.path.join(os.path.dirname(__file__), "tabla_ll1.bin")
+ARTIFACT_VERSION = 1
+# "sets": FIRST/FOLLOW como conjuntos de str; "bitset": cada terminal es un bit
+# y los conjuntos son int (uniones con |, conflictos con &). Mismo resultado.
+MODES = ("sets", "bitset")
+
 class ParserGenerator:
-    def __init__(self, grammar=None):
+    def __init__(self, grammar=None, start: str = START_SYMBOL, mode: str = "sets"):
+        if mode not in MODES:
+            raise ValueError(f"Modo desconocido: {mode!r}. Opciones: {', '.join(MODES)}")
         self.grammar = grammar if grammar is not None else GRAMMAR
+        self.start = start
+        self.mode = mode
         self.nonterms = list(self.grammar.keys())
-        self.terminals = sorted(set(get_terminals() + ["$"]))
+        self.terminals = sorted(set(get_terminals(self.grammar) + ["$"]))
         self.first: Dict[str, Set[str]] = {nt: set() for nt in self.nonterms}
         self.follow: Dict[str, Set[str]] = {nt: set() for nt in self.nonterms}
+        self.nullable: Set[str] = set()
         self.table: Dict[Tuple[str, str], List[str]] = {}
         self.conflicts: List[Tuple[str, str, List[str], List[str]]] = []
+        self._suffixes: Dict[Tuple[str, int], List[Set[str]]] = {}
+        self.recomputed: Dict[str, int] = {}
 
+    # FIRST y FOLLOW son sistemas de inclusiones S(A) ⊇ semillas(A) ∪ S(B) por
+    # cada dependencia A -> B. En vez de repetir pasadas sobre toda la gramatica
+    # hasta que nada cambie, se arma el grafo de dependencias y se resuelve en
+    # un solo recorrido por componentes fuertemente conexas (_solve).
     def compute_first(self):
-        changed = True
-        while changed:
-            changed = False
-            for A, prods in self.grammar.items():
-                for prod in prods:
-                    if prod == [EPS]:
-                        if EPS not in self.first[A]:
-                            self.first[A].add(EPS)
-                            changed = True
-                        continue
+        if self.mode == "bitset":
+            return self._compute_first_bits()
+        self.nullable = nullable = self._compute_nullable()
+        seeds, deps = self._first_graph()
+        self.first = _solve(self.nonterms, seeds, deps)
+        for A in nullable:
+            self.first[A].add(EPS)
+        self._suffixes = {}
 
-                    add_eps = True
-                    for X in prod:
-                        if X in self.grammar:
-                            before = len(self.first[A])
-                            self.first[A].update(self.first[X] - {EPS})
-                            if EPS not in self.first[X]:
-                                add_eps = False
-                                break
-                            if len(self.first[A]) != before:
-                                changed = True
-                        else:
-                            if X not in self.first[A]:
-                                self.first[A].add(X)
-                                changed = True
-                            add_eps = False
+    def _first_graph(self) -> Tuple[Dict[str, Set[str]], Dict[str, List[str]]]:
+        grammar, nullable = self.grammar, self.nullable
+        seeds: Dict[str, Set[str]] = {A: set() for A in self.nonterms}
+        deps: Dict[str, List[str]] = {A: [] for A in self.nonterms}
+        for A, prods in grammar.items():
+            for prod in prods:
+                # FIRST(A) incluye FIRST de cada simbolo hasta el primero no anulable
+                for X in prod:
+                    if X == EPS:
+                        continue
+                    if X in grammar:
+                        deps[A].append(X)
+                        if X not in nullable:
                             break
+                    else:
+                        seeds[A].add(X)
+                        break
+        return seeds, deps
+
+    def _compute_nullable(self) -> Set[str]:
+        # Por cada produccion sin terminales se cuentan los simbolos que faltan
+        # ver como anulables; cuando llega a cero, su lado izquierdo es anulable
+        grammar = self.grammar
+        lhs: List[str] = []
+        missing: List[int] = []
+        users: Dict[str, List[int]] = {A: [] for A in self.nonterms}
+        work: List[str] = []
+        for A, prods in grammar.items():
+            for prod in prods:
+                syms = [X for X in prod if X != EPS]
+                if any(X not in grammar for X in syms):
+                    continue
+                if not syms:
+                    work.append(A)
+                    continue
+                i = len(lhs)
+                lhs.append(A)
+                missing.append(len(syms))
+                for X in syms:
+                    users[X].append(i)
+        nullable: Set[str] = set()
+        while work:
+            A = work.pop()
+            if A in nullable:
+                continue
+            nullable.add(A)
+            for i in users[A]:
+                missing[i] -= 1
+                if missing[i] == 0:
+                    work.append(lhs[i])
+        return nullable
 
-                    if add_eps and EPS not in self.first[A]:
-                        self.first[A].add(EPS)
-                        changed = True
-
-        stable = False
-        while not stable:
-            stable = True
-            for A, prods in self.grammar.items():
-                before = len(self.first[A])
-                for prod in prods:
-                    if prod and prod[0] in self.grammar:
-                        self.first[A].update(self.first[prod[0]] - {EPS})
-                if len(self.first[A]) != before:
-                    stable = False
+    # FIRST de cada sufijo de la produccion k de A (el ultimo es {ε}); se
+    # calcula una sola vez, de derecha a izquierda
+    def suffix_first(self, A: str, k: int) -> List[Set[str]]:
+        key = (A, k)
+        cached = self._suffixes.get(key)
+        if cached is not None:
+            return cached
+        prod = self.grammar[A][k]
+        out: List[Set[str]] = [set()] * len(prod) + [{EPS}]
+        for i in range(len(prod) - 1, -1, -1):
+            X = prod[i]
+            if X == EPS:
+                out[i] = out[i + 1]
+            elif X in self.grammar:
+                s = self.first[X] - {EPS}
+                if X in self.nullable:
+                    s |= out[i + 1]
+                out[i] = s
+            else:
+                out[i] = {X}
+        self._suffixes[key] = out
+        return out
 
     def first_of_sequence(self, seq: List[str]) -> Set[str]:
         res: Set[str] = set()
-        if not seq:
-            res.add(EPS)
-            return res
         for X in seq:
+            if X == EPS:
+                continue
             if X in self.grammar:
                 res.update(self.first[X] - {EPS})
-                if EPS not in self.first[X]:
+                if X not in self.nullable:
                     return res
             else:
                 res.add(X)
@@ -72,28 +138,73 @@ class ParserGenerator:
         return res
 
     def compute_follow(self):
-        self.follow[START_SYMBOL].add("$")
-        changed = True
-        while changed:
-            changed = False
-            for A, prods in self.grammar.items():
-                for prod in prods:
-                    for i, B in enumerate(prod):
-                        if B in self.grammar:
-                            beta = prod[i + 1 :]
-                            first_beta = self.first_of_sequence(beta)
-                            before = len(self.follow[B])
-                            self.follow[B].update(first_beta - {EPS})
-                            if EPS in first_beta or not beta:
-                                self.follow[B].update(self.follow[A])
-                            if len(self.follow[B]) != before:
-                                changed = True
+        if self.mode == "bitset":
+            return self._compute_follow_bits()
+        seeds, deps = self._follow_graph()
+        self.follow = _solve(self.nonterms, seeds, deps)
+
+    def _follow_graph(self) -> Tuple[Dict[str, Set[str]], Dict[str, List[str]]]:
+        seeds: Dict[str, Set[str]] = {A: set() for A in self.nonterms}
+        deps: Dict[str, List[str]] = {A: [] for A in self.nonterms}
+        seeds[self.start].add("$")
+        for A, prods in self.grammar.items():
+            for k, prod in enumerate(prods):
+                suffixes = self.suffix_first(A, k)
+                for i, B in enumerate(prod):
+                    if B in self.grammar:
+                        # A -> α B β: FIRST(β) y, si β es anulable, FOLLOW(A)
+                        rest = suffixes[i + 1]
+                        seeds[B].update(rest)
+                        if EPS in rest and B != A:
+                            deps[B].append(A)
+        for s in seeds.values():
+            s.discard(EPS)
+        return seeds, deps
+
+    # Para update: las aristas de FOLLOW (B hereda FOLLOW(A) si lo que sigue a
+    # B en A -> α B β es anulable) y donde aparece cada no terminal, sin
+    # calcular conjuntos; las semillas se piden despues solo para los afectados
+    def _follow_edges(self) -> Tuple[Dict[str, List[str]], Dict[str, List[Tuple[str, int, int]]]]:
+        grammar, nullable = self.grammar, self.nullable
+        deps: Dict[str, List[str]] = {A: [] for A in self.nonterms}
+        where: Dict[str, List[Tuple[str, int, int]]] = {A: [] for A in self.nonterms}
+        for A, prods in grammar.items():
+            for k, prod in enumerate(prods):
+                rest_nullable = True
+                for i in range(len(prod) - 1, -1, -1):
+                    B = prod[i]
+                    if B in grammar:
+                        where[B].append((A, k, i))
+                        if rest_nullable and B != A:
+                            deps[B].append(A)
+                        rest_nullable = rest_nullable and B in nullable
+                    elif B != EPS:
+                        rest_nullable = False
+        return deps, where
+
+    def _follow_seeds(self, B: str, where) -> Set[str]:
+        s = {"$"} if B == self.start else set()
+        for A, k, i in where[B]:
+            s |= self.suffix_first(A, k)[i + 1]
+        s.discard(EPS)
+        return s
 
     # Aqui se construye la tabla LL
+    # Los conflictos quedan ordenados por (no terminal, terminal) y, dentro de
+    # cada celda, por produccion: el mismo orden que deja update()
     def build_table(self):
-        for A, prods in self.grammar.items():
-            for prod in prods:
-                firsts = self.first_of_sequence(prod)
+        if self.mode == "bitset":
+            self._build_table_bits()
+        else:
+            self._build_rows(self.grammar)
+            if "ElseOpt" in self.grammar:
+                self.table[("ElseOpt", "else")] = ["else", "Stmt"]
+        self.conflicts.sort(key=_cell)
+
+    def _build_rows(self, rows):
+        for A in rows:
+            for k, prod in enumerate(self.grammar[A]):
+                firsts = self.suffix_first(A, k)[0]
                 for a in (firsts - {EPS}):
                     key = (A, a)
                     if key in self.table:
@@ -105,16 +216,610 @@ class ParserGenerator:
                         if key in self.table:
                             self.conflicts.append((A, b, self.table[key], prod))
                         self.table[key] = prod
-        self.table[("ElseOpt", "else")] = ["else", "Stmt"]
+
+    # --- Modo "bitset" ---
+    # El terminal terminals[i] es el bit i y ε el bit len(terminals). Se calcula
+    # todo con enteros y al final se traducen FIRST/FOLLOW a conjuntos, asi
+    # generate()/compile() devuelven lo mismo que en el modo "sets".
+    def _init_bits(self):
+        names = self.terminals + [EPS]
+        self._bit_names = names
+        self._bit = {t: 1 << i for i, t in enumerate(names)}
+        self._eps_bit = self._bit[EPS]
+        self._first_bits: Dict[str, int] = {}
+        self._follow_bits: Dict[str, int] = {}
+        self._suffix_bits: Dict[Tuple[str, int], List[int]] = {}
+        self._decoded: Dict[int, Tuple[str, ...]] = {}
+
+    # Terminales de un bitset en orden de bit; muchos conjuntos se repiten,
+    # asi que cada valor se traduce una sola vez
+    def _decode(self, bits: int) -> Tuple[str, ...]:
+        out = self._decoded.get(bits)
+        if out is None:
+            names, rest, acc = self._bit_names, bits, []
+            while rest:
+                low = rest & -rest
+                acc.append(names[low.bit_length() - 1])
+                rest ^= low
+            out = self._decoded[bits] = tuple(acc)
+        return out
+
+    def _compute_first_bits(self):
+        self._init_bits()
+        grammar, bit = self.grammar, self._bit
+        self.nullable = nullable = self._compute_nullable()
+        seeds: Dict[str, int] = {A: 0 for A in self.nonterms}
+        deps: Dict[str, List[str]] = {A: [] for A in self.nonterms}
+        for A, prods in grammar.items():
+            for prod in prods:
+                for X in prod:
+                    if X == EPS:
+                        continue
+                    if X in grammar:
+                        deps[A].append(X)
+                        if X not in nullable:
+                            break
+                    else:
+                        seeds[A] |= bit[X]
+                        break
+        first = _solve(self.nonterms, seeds, deps, int)
+        for A in nullable:
+            first[A] |= self._eps_bit
+        self._first_bits = first
+        self.first = {A: set(self._decode(b)) for A, b in first.items()}
+        self._suffixes = {}
+
+    def _suffix_first_bits(self, A: str, k: int) -> List[int]:
+        key = (A, k)
+        cached = self._suffix_bits.get(key)
+        if cached is not None:
+            return cached
+        prod = self.grammar[A][k]
+        first, nullable, bit = self._first_bits, self.nullable, self._bit
+        no_eps = ~self._eps_bit
+        out = [0] * len(prod) + [self._eps_bit]
+        for i in range(len(prod) - 1, -1, -1):
+            X = prod[i]
+            if X == EPS:
+                out[i] = out[i + 1]
+            elif X in first:
+                out[i] = first[X] & no_eps | (out[i + 1] if X in nullable else 0)
+            else:
+                out[i] = bit[X]
+        self._suffix_bits[key] = out
+        return out
+
+    def _compute_follow_bits(self):
+        seeds: Dict[str, int] = {A: 0 for A in self.nonterms}
+        deps: Dict[str, List[str]] = {A: [] for A in self.nonterms}
+        seeds[self.start] = self._bit["$"]
+        eps = self._eps_bit
+        for A, prods in self.grammar.items():
+            for k, prod in enumerate(prods):
+                suffixes = self._suffix_first_bits(A, k)
+                for i, B in enumerate(prod):
+                    if B in seeds:
+                        rest = suffixes[i + 1]
+                        seeds[B] |= rest & ~eps
+                        if rest & eps and B != A:
+                            deps[B].append(A)
+        self._follow_bits = _solve(self.nonterms, seeds, deps, int)
+        self.follow = {A: set(self._decode(b)) for A, b in self._follow_bits.items()}
+
+    # Conjunto de prediccion de cada produccion: FIRST, y FOLLOW(A) si es
+    # anulable. Dos alternativas chocan donde sus conjuntos se cruzan (&).
+    def _build_table_bits(self):
+        table, conflicts = self.table, self.conflicts
+        eps = self._eps_bit
+        for A, prods in self.grammar.items():
+            follow = self._follow_bits[A]
+            taken = 0
+            for k, prod in enumerate(prods):
+                firsts = self._suffix_first_bits(A, k)[0]
+                predict = firsts & ~eps
+                clash = predict & taken
+                if firsts & eps:
+                    # Tambien la propia produccion si FIRST y FOLLOW se cruzan
+                    clash |= follow & taken
+                    self_clash = follow & predict
+                    predict |= follow
+                else:
+                    self_clash = 0
+                for a in self._decode(clash):
+                    conflicts.append((A, a, table[(A, a)], prod))
+                for a in self._decode(predict):
+                    table[(A, a)] = prod
+                for a in self._decode(self_clash):
+                    conflicts.append((A, a, prod, prod))
+                taken |= predict
+        if "ElseOpt" in self.grammar:
+            table[("ElseOpt", "else")] = ["else", "Stmt"]
 
     # Aqui se genera la tabla
     def generate(self):
-        self.compute_first()
-        self.compute_follow()
-        self.build_table()
+        with metrics.span("generate"):
+            self.compute_first()
+            self.compute_follow()
+            self.build_table()
         return {
             "first": self.first,
             "follow": self.follow,
             "table": self.table,
             "conflicts": self.conflicts,
-        }
\ No newline at end of file
+        }
+
+    # Version inmutable de la tabla, para compartir entre Parsers
+    def compile(self) -> "CompiledGrammar":
+        self.generate()
+        return self._freeze()
+
+    # Compila esta gramatica a partir de la tabla de una version anterior
+    # (prev): solo se recalculan FIRST, FOLLOW y filas de la tabla de los no
+    # terminales afectados por el cambio; el resto se copia de prev. Deja en
+    # self.recomputed cuantos se recalcularon de cada cosa.
+    def update(self, prev: "CompiledGrammar") -> "CompiledGrammar":
+        with metrics.span("update"):
+            return self._update(prev)
+
+    def _update(self, prev: "CompiledGrammar") -> "CompiledGrammar":
+        grammar, old = self.grammar, prev.grammar
+        # Simbolos que pasan de terminal a no terminal o al reves
+        flipped = set(grammar).symmetric_difference(old)
+        changed = {A for A, prods in grammar.items()
+                   if A not in old or old[A] != tuple(map(tuple, prods))
+                   or flipped and any(X in flipped for p in prods for X in p)}
+        removed = [A for A in old if A not in grammar]
+
+        # FIRST: lo cambiado, lo que cambio de anulable y todo lo que depende de eso
+        self.nullable = nullable = self._compute_nullable()
+        seeds, first_deps = self._first_graph()
+        dirty_first = _closure(changed | {A for A in grammar if A not in changed and
+                                          (A in nullable) != (EPS in prev.first[A])}, first_deps)
+        first = _solve_part(dirty_first, seeds, first_deps, prev.first)
+        for A in dirty_first & nullable:
+            first[A].add(EPS)
+        # Los que no cambian se quedan con el frozenset de prev
+        self.first = {A: first[A] if A in first else prev.first[A] for A in self.nonterms}
+        self._suffixes = {}
+        # Recalculados que de verdad quedaron distintos
+        new_first = {A for A in first if A not in old or first[A] != prev.first[A]}
+
+        # FOLLOW: simbolos de producciones cambiadas o seguidos de algo con
+        # FIRST nuevo, y todo lo que hereda FOLLOW de ellos
+        deps, where = self._follow_edges()
+        roots = set(grammar) - set(old)
+        if self.start != prev.start:
+            roots |= {self.start, prev.start}
+        for A in list(changed) + removed:
+            for prod in list(grammar.get(A, ())) + list(old.get(A, ())):
+                roots.update(B for B in prod if B in grammar)
+        for X in new_first:
+            for A, k, i in where[X]:
+                roots.update(B for B in grammar[A][k][:i] if B in grammar)
+        dirty_follow = _closure(roots & set(grammar), deps)
+        seeds = {B: self._follow_seeds(B, where) for B in dirty_follow}
+        follow = _solve_part(dirty_follow, seeds, deps, prev.follow)
+        self.follow = {A: follow[A] if A in follow else prev.follow[A] for A in self.nonterms}
+        new_follow = {A for A in follow if A not in old or follow[A] != prev.follow[A]}
+
+        # Tabla: filas nuevas donde cambio la produccion, el FIRST de alguna
+        # alternativa o el FOLLOW
+        rows = changed | new_follow | {A for A, ds in first_deps.items() if any(X in new_first for X in ds)}
+        self.table = {key: p for key, p in prev.table.items() if key[0] in grammar and key[0] not in rows}
+        self.conflicts = [c for c in prev.conflicts if c[0] in grammar and c[0] not in rows]
+        self._build_rows([A for A in grammar if A in rows])
+        self.conflicts.sort(key=_cell)
+        if "ElseOpt" in rows:
+            self.table[("ElseOpt", "else")] = ["else", "Stmt"]
+        self.recomputed = {"first": len(dirty_first), "follow": len(dirty_follow), "rows": len(rows)}
+        return self._freeze()
+
+    def _freeze(self) -> "CompiledGrammar":
+        return CompiledGrammar(
+            fingerprint=grammar_fingerprint(self.grammar, self.start),
+            start=self.start,
+            nonterms=tuple(self.nonterms),
+            terminals=tuple(self.terminals),
+            grammar=MappingProxyType({A: tuple(tuple(p) for p in prods) for A, prods in self.grammar.items()}),
+            first=MappingProxyType({A: frozenset(s) for A, s in self.first.items()}),
+            follow=MappingProxyType({A: frozenset(s) for A, s in self.follow.items()}),
+            table=MappingProxyType({k: tuple(p) for k, p in self.table.items()}),
+            conflicts=tuple((A, a, tuple(old), tuple(new)) for A, a, old, new in self.conflicts),
+        )
+
+    # Guarda la tabla compilada para que los workers no tengan que recalcularla
+    def write_artifact(self, path: str = ARTIFACT_PATH) -> str:
+        data = marshal.dumps(self.compile().to_artifact())
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
+
+
+def _solve(nodes: List[str], seeds: Dict, deps: Dict[str, List[str]], new=set) -> Dict:
+    # S(A) = semillas(A) ∪ S(B) para cada B en deps[A], con conjuntos (new=set)
+    # o bitsets (new=int): solo se usan new(), new(s) y |=. Tarjan (iterativo)
+    # cierra cada componente fuertemente conexa despues de todas las que
+    # alcanza: sus dependencias de afuera ya estan resueltas y todos sus
+    # miembros terminan con el mismo conjunto. Lineal en nodos + aristas, mas
+    # el costo de las uniones.
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    result: Dict[str, Set[str]] = {}
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(deps[root]))]
+        while work:
+            v, it = work[-1]
+            for w in it:
+                if w not in index:
+                    index[w] = low[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(deps[w])))
+                    break
+                if w in on_stack and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        members.append(w)
+                        if w == v:
+                            break
+                    s = new()
+                    for m in members:
+                        s |= seeds[m]
+                        for d in deps[m]:
+                            done = result.get(d)
+                            if done is not None:
+                                s |= done
+                    for m in members:
+                        result[m] = new(s)
+    return result
+
+
+# Celda (no terminal, terminal) de un conflicto, para ordenarlos
+def _cell(conflict) -> Tuple[str, str]:
+    return conflict[0], conflict[1]
+
+
+# Nodos que alcanzan a alguno de roots siguiendo deps (A -> deps[A])
+def _closure(roots: Set[str], deps: Dict[str, List[str]]) -> Set[str]:
+    users: Dict[str, List[str]] = {}
+    for A, ds in deps.items():
+        for B in ds:
+            users.setdefault(B, []).append(A)
+    out = set(roots)
+    work = list(roots)
+    while work:
+        for A in users.get(work.pop(), ()):
+            if A not in out:
+                out.add(A)
+                work.append(A)
+    return out
+
+
+# _solve solo sobre nodes: las dependencias de afuera ya estan resueltas en known
+def _solve_part(nodes: Set[str], seeds: Dict[str, Set[str]], deps: Dict[str, List[str]],
+                known: Mapping[str, FrozenSet[str]]) -> Dict[str, Set[str]]:
+    part_seeds: Dict[str, Set[str]] = {}
+    part_deps: Dict[str, List[str]] = {}
+    for A in nodes:
+        s = set(seeds[A])
+        inner = []
+        for B in deps[A]:
+            if B in nodes:
+                inner.append(B)
+            else:
+                s.update(known[B])
+        s.discard(EPS)
+        part_seeds[A] = s
+        part_deps[A] = inner
+    return _solve(list(nodes), part_seeds, part_deps)
+
+
+@dataclass(frozen=True)
+class CompiledGrammar:
+    fingerprint: str
+    start: str
+    nonterms: Tuple[str, ...]
+    terminals: Tuple[str, ...]
+    grammar: Mapping[str, Tuple[Tuple[str, ...], ...]]
+    first: Mapping[str, FrozenSet[str]]
+    follow: Mapping[str, FrozenSet[str]]
+    table: Mapping[Tuple[str, str], Tuple[str, ...]]
+    conflicts: Tuple[Tuple[str, str, Tuple[str, ...], Tuple[str, ...]], ...]
+
+    @cached_property
+    def int_table(self) -> "IntTable":
+        return IntTable(self)
+
+    # True si las producciones son las de grammar.py (con cualquier simbolo inicial)
+    @cached_property
+    def builtin(self) -> bool:
+        return grammar_fingerprint(self.grammar) == BUILTIN_FINGERPRINT
+
+    # Formato del artefacto: simbolos codificados como enteros
+    #   0..N-1 no terminales, N..N+T-1 terminales, -1 = epsilon
+    # las producciones se numeran en orden y la tabla guarda el indice (-1 = vacio)
+    def to_artifact(self) -> dict:
+        symbols = self.nonterms + self.terminals
+        code = {sym: i for i, sym in enumerate(symbols)}
+        code[EPS] = -1
+        term = {t: i for i, t in enumerate(self.terminals)}
+        term[EPS] = -1
+
+        prods = []
+        prod_index = {}
+        for A in self.nonterms:
+            for p in self.grammar[A]:
+                prod_index[(A, p)] = len(prods)
+                prods.append((code[A],) + tuple(code[x] for x in p))
+
+        rows = []
+        for A in self.nonterms:
+            row = []
+            for t in self.terminals:
+                p = self.table.get((A, t))
+                row.append(prod_index[(A, p)] if p is not None else -1)
+            rows.append(tuple(row))
+
+        return {
+            "version": ARTIFACT_VERSION,
+            "fingerprint": self.fingerprint,
+            "start": code[self.start],
+            "nonterms": self.nonterms,
+            "terminals": self.terminals,
+            "prods": tuple(prods),
+            "table": tuple(rows),
+            "first": tuple(tuple(sorted(term[x] for x in self.first[A])) for A in self.nonterms),
+            "follow": tuple(tuple(sorted(term[x] for x in self.follow[A])) for A in self.nonterms),
+            "conflicts": tuple((code[A], term[a], tuple(code[x] for x in old), tuple(code[x] for x in new))
+                               for A, a, old, new in self.conflicts),
+        }
+
+    @classmethod
+    def from_artifact(cls, data: dict) -> "CompiledGrammar":
+        nonterms = tuple(data["nonterms"])
+        terminals = tuple(data["terminals"])
+        symbols = nonterms + terminals
+
+        def sym(i):
+            return EPS if i < 0 else symbols[i]
+
+        def terms(ids):
+            return frozenset(EPS if i < 0 else terminals[i] for i in ids)
+
+        prods = [tuple(sym(i) for i in p[1:]) for p in data["prods"]]
+        grammar: Dict[str, List[Tuple[str, ...]]] = {A: [] for A in nonterms}
+        for p, rhs in zip(data["prods"], prods):
+            grammar[nonterms[p[0]]].append(rhs)
+
+        table = {}
+        for A, row in zip(nonterms, data["table"]):
+            for t, i in zip(terminals, row):
+                if i >= 0:
+                    table[(A, t)] = prods[i]
+
+        return cls(
+            fingerprint=data["fingerprint"],
+            start=nonterms[data["start"]],
+            nonterms=nonterms,
+            terminals=terminals,
+            grammar=MappingProxyType({A: tuple(ps) for A, ps in grammar.items()}),
+            first=MappingProxyType({A: terms(ids) for A, ids in zip(nonterms, data["first"])}),
+            follow=MappingProxyType({A: terms(ids) for A, ids in zip(nonterms, data["follow"])}),
+            table=MappingProxyType(table),
+            conflicts=tuple((nonterms[A], terminals[a], tuple(sym(i) for i in old), tuple(sym(i) for i in new))
+                            for A, a, old, new in data["conflicts"]),
+        )
+
+
+def grammar_fingerprint(grammar=None, start: str = START_SYMBOL) -> str:
+    grammar = grammar if grammar is not None else GRAMMAR
+    # El orden de las producciones importa (en conflictos gana la ultima)
+    data = json.dumps([start, [[A, prods] for A, prods in grammar.items()]], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+# Las acciones del AST (ast_builder.ACTIONS), la tabla de simbolos (semantic) y
+# las sesiones (incremental) buscan los hijos por posicion en las producciones
+# de grammar.py. Con otra gramatica instalada (ver grammar_watch) se rechazan
+# en vez de devolver resultados sin sentido. Cualquier simbolo inicial sirve
+# (las sesiones usan "Member"); solo importan las producciones.
+BUILTIN_FINGERPRINT = grammar_fingerprint()
+
+
+def check_builtin_grammar(compiled: CompiledGrammar, what: str):
+    if not compiled.builtin:
+        raise ValueError(f"{what} requiere la gramatica de grammar.py; la gramatica activa "
+                         f"({compiled.fingerprint[:12]}) es otra")
+
+
+# Tabla LL(1) densa con simbolos enteros, para el motor "int" del Parser.
+#   terminales 0..T-1, T = tipo de token desconocido, T+1 = epsilon
+#   no terminales 0..N-1
+#   en las producciones: no terminal A -> A (>= 0), terminal t -> ~t (< 0)
+class IntTable:
+    def __init__(self, compiled: CompiledGrammar):
+        self.nonterm_names = compiled.nonterms
+        self.term_names = compiled.terminals
+        self.nonterm_id = {A: i for i, A in enumerate(compiled.nonterms)}
+        self.term_id = {t: i for i, t in enumerate(compiled.terminals)}
+        self.unknown = len(compiled.terminals)
+        self.eps = self.unknown + 1
+        self.start = self.nonterm_id[compiled.start]
+
+        def code(x):
+            if x == EPS:
+                return ~self.eps
+            if x in self.nonterm_id:
+                return self.nonterm_id[x]
+            return ~self.term_id[x]
+
+        self.prods: List[Tuple[int, ...]] = []
+        self.lhs: List[int] = []
+        # alt[p] = posicion de la produccion p entre las alternativas de su no terminal
+        self.alt: List[int] = []
+        prod_index = {}
+        for A in compiled.nonterms:
+            for i, p in enumerate(compiled.grammar[A]):
+                prod_index[(A, p)] = len(self.prods)
+                self.prods.append(tuple(code(x) for x in p))
+                self.lhs.append(self.nonterm_id[A])
+                self.alt.append(i)
+        # Para el motor de pila: simbolos en orden inverso, listos para extend()
+        self.rev_prods = [tuple(reversed(p)) for p in self.prods]
+
+        # Una columna extra (unknown) siempre vacia
+        self.table: List[List[int]] = []
+        for A in compiled.nonterms:
+            row = [-1] * (self.unknown + 1)
+            for t, i in self.term_id.items():
+                p = compiled.table.get((A, t))
+                if p is not None:
+                    row[i] = prod_index[(A, p)]
+            self.table.append(row)
+
+        self.follow: List[FrozenSet[int]] = [
+            frozenset(self.term_id[t] for t in compiled.follow[A] if t in self.term_id)
+            for A in compiled.nonterms
+        ]
+
+        # Para la recuperacion "sync" del motor de pila: por cada valor que puede
+        # estar en la pila, los terminales con los que se puede retomar el
+        # analisis, como bitset (no terminal A: FOLLOW(A); marca de reduccion de
+        # p: FOLLOW del lado izquierdo de p; terminal t: t)
+        follow_mask = [sum(1 << t for t in f) for f in self.follow]
+        N = len(compiled.nonterms)
+        self.sync_masks: Dict[int, int] = {A: m for A, m in enumerate(follow_mask)}
+        self.sync_masks.update((N + p, follow_mask[A]) for p, A in enumerate(self.lhs))
+        self.sync_masks.update((~t, 1 << t) for t in range(self.unknown))
+        self.sync_masks[~self.eps] = 0
+        # first_mask[A] = FIRST(A) sin ε, como bitset; nullable[A] si A deriva ε.
+        # Al insertar un terminal que falta, el token actual tiene que poder
+        # empezar lo que viene justo despues (no alcanza con los FOLLOW de la pila)
+        self.first_mask = [sum(1 << self.term_id[t] for t in compiled.first[A] if t in self.term_id)
+                           for A in compiled.nonterms]
+        self.nullable = [EPS in compiled.first[A] for A in compiled.nonterms]
+        # insert_prod[A] = {a: p}: A no puede empezar con a, pero su produccion
+        # p empieza con un terminal y lo que le sigue si puede; la recuperacion
+        # expande p y solo falta ese terminal (p.ej. Block sin su "{")
+        self.insert_prod: List[Dict[int, int]] = [{} for _ in range(N)]
+        for p, (A, rhs) in enumerate(zip(self.lhs, self.prods)):
+            if len(rhs) < 2 or rhs[0] >= 0 or ~rhs[0] == self.eps:
+                continue
+            bits = 0
+            for x in rhs[1:]:
+                if x < 0:
+                    bits |= 0 if ~x == self.eps else 1 << ~x
+                    break
+                bits |= self.first_mask[x]
+                if not self.nullable[x]:
+                    break
+            row = self.table[A]
+            for a in range(self.unknown):
+                if bits >> a & 1 and row[a] < 0:
+                    self.insert_prod[A].setdefault(a, p)
+        # repair[A] = la produccion de A que se completa insertando menos
+        # terminales (la derivacion mas corta); la recuperacion la usa cuando A
+        # no puede empezar con el token actual pero lo que sigue si
+        # (repair_cost[A] terminales)
+        cost = self.repair_cost = [float("inf")] * N
+        self.repair = [-1] * N
+        changed = True
+        while changed:
+            changed = False
+            for p, (A, rhs) in enumerate(zip(self.lhs, self.prods)):
+                c = sum(cost[x] if x >= 0 else (0 if ~x == self.eps else 1) for x in rhs)
+                if c < cost[A]:
+                    cost[A] = c
+                    self.repair[A] = p
+                    changed = True
+
+    def token_ids(self, tokens) -> List[int]:
+        get, unknown = self.term_id.get, self.unknown
+        return [get(t.type, unknown) for t in tokens]
+
+
+# Devuelve None si el artefacto no existe, esta corrupto o es de otra gramatica
+def load_artifact(path: str = ARTIFACT_PATH, fingerprint: Optional[str] = None) -> Optional[CompiledGrammar]:
+    try:
+        # marshal.load sobre el archivo lee por partes; loads del buffer es ~20x mas rapido
+        with open(path, "rb") as f:
+            data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != ARTIFACT_VERSION:
+        return None
+    if fingerprint is not None and data.get("fingerprint") != fingerprint:
+        return None
+    return CompiledGrammar.from_artifact(data)
+
+
+_compiled_cache: Dict[str, CompiledGrammar] = {}
+_compiled_lock = threading.Lock()
+_default_compiled = None
+# Gramatica por defecto del proceso (None = GRAMMAR de grammar.py); la cambia install_grammar
+_active_grammar = None
+
+# Una tabla por gramatica y por proceso; las siguientes llamadas la reutilizan
+def get_compiled(grammar=None, start: str = START_SYMBOL) -> CompiledGrammar:
+    global _default_compiled
+    default = grammar is None and start == START_SYMBOL
+    compiled = _default_compiled
+    if default and compiled is not None:
+        return compiled
+    active = _active_grammar
+    implicit = grammar is None
+    if implicit:
+        grammar = active
+    key = grammar_fingerprint(grammar, start)
+    compiled = _compiled_cache.get(key)
+    if compiled is not None:
+        return compiled
+    with _compiled_lock:
+        compiled = _compiled_cache.get(key)
+        if compiled is None and default and grammar is None:
+            compiled = load_artifact(fingerprint=key)
+        if compiled is None:
+            compiled = ParserGenerator(grammar, start).compile()
+            # Si mientras tanto se instalo otra gramatica, esta ya no se guarda
+            if not implicit or _active_grammar is active:
+                _compiled_cache[key] = compiled
+        if default and _active_grammar is active:
+            _default_compiled = compiled
+    return compiled
+
+
+# Cambia la tabla por defecto del proceso de una sola vez: los Parser ya
+# creados siguen con la que tomaron y los siguientes get_compiled() (tambien
+# con otro start, p.ej. "Member") usan la gramatica nueva. Las tablas de la
+# gramatica reemplazada (con cualquier start) salen del cache, asi recargar
+# muchas veces no acumula tablas.
+def install_grammar(compiled: CompiledGrammar):
+    global _default_compiled, _active_grammar
+    with _compiled_lock:
+        old = grammar_fingerprint(_active_grammar)
+        if grammar_fingerprint(compiled.grammar) != old:
+            for key, c in list(_compiled_cache.items()):
+                if grammar_fingerprint(c.grammar) == old:
+                    del _compiled_cache[key]
+        _compiled_cache[compiled.fingerprint] = compiled
+        _active_grammar = compiled.grammar
+        _default_compiled = compiled
@@ -0,0 +1,143 @@
+# render_queue.py
+# Cola de renderizado de arboles en segundo plano.
+# /api/analyze encola la imagen y responde enseguida con el id del trabajo; un
+# pool acotado de hilos ejecuta los procesos `dot` (como mucho `workers` a la
+# vez, cada uno con su timeout) y publica el resultado en el ArtifactStore.
+# El id es el nombre del artefacto (<hash>.<formato>), asi que el mismo arbol
+# enviado otra vez se une al trabajo que ya esta en cola en lugar de repetirlo.
+# Con el backend "native" el SVG se dibuja en el mismo proceso, sin `dot`.
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from app.Back.artifacts import ArtifactStore
+from app.Back.tree_viz import render_tree, resolve_backend
+
+FORMATS = ("png", "svg")
+
+# queued -> running -> done | error;  queued -> cancelled
+ACTIVE = ("queued", "running")
+
+
+@dataclass
+class RenderJob:
+    id: str
+    status: str = "queued"
+    url: Optional[str] = None
+    error: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {"id": self.id, "status": self.status}
+        if self.url is not None:
+            d["url"] = self.url
+        if self.error is not None:
+            d["error"] = self.error
+        return d
+
+
+class RenderQueue:
+    def __init__(self, store: ArtifactStore, workers: int = 2, timeout: float = 30.0,
+                 max_queued: int = 64, max_jobs: int = 1024, backend: str = "auto",
+                 dot_options: Optional[dict] = None):
+        self.store = store
+        self.backend = resolve_backend(backend)
+        self.dot_options = dot_options
+        self.timeout = timeout
+        self.max_queued = max_queued
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._jobs: "OrderedDict[str, RenderJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # replaces: id de un trabajo anterior del mismo cliente; si sigue en cola
+    # se cancela, porque su imagen ya no se va a mostrar
+    def submit(self, tree, key: str, fmt: str = "png", replaces: Optional[str] = None) -> RenderJob:
+        ext = self.artifact_ext(fmt)
+        fmt = ext[1:]
+        job_id = key + ext
+        with self._lock:
+            if replaces and replaces != job_id:
+                self._cancel(replaces)
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in ACTIVE:
+                return job
+            job = RenderJob(job_id)
+            if self.store.lookup(key, ext):
+                job.status, job.url, job.finished = "done", self.store.url(key, ext), time.time()
+            elif self._queued() >= self.max_queued:
+                job.status, job.error, job.finished = "error", "Cola de renderizado llena, intenta de nuevo.", time.time()
+            else:
+                job.future = self._pool.submit(self._run, job, tree, key, fmt)
+            self._remember(job)
+            return job
+
+    # Extension del artefacto que se genera para el formato pedido
+    def artifact_ext(self, fmt: str) -> str:
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato desconocido: {fmt!r}. Opciones: {', '.join(FORMATS)}")
+        if self.backend == "native":
+            # Sin Graphviz solo se puede generar SVG
+            fmt = "svg"
+        return "." + fmt
+
+    def status(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        # Trabajo olvidado (o de otro proceso) cuyo artefacto ya existe
+        key, dot, fmt = job_id.rpartition(".")
+        if dot and fmt in FORMATS and self.store.lookup(key, "." + fmt):
+            return RenderJob(job_id, "done", self.store.url(key, "." + fmt))
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            return self._cancel(job_id)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job: RenderJob, tree, key: str, fmt: str):
+        job.status = "running"
+        try:
+            self.store.put(key, "." + fmt, lambda path: render_tree(tree, path, fmt, self.timeout, self.backend, self.dot_options))
+            job.url = self.store.url(key, "." + fmt)
+            job.status = "done"
+        except subprocess.TimeoutExpired:
+            job.error = f"Tiempo agotado al generar árbol ({self.timeout:g} s)."
+            job.status = "error"
+        except subprocess.CalledProcessError as e:
+            job.error = f"Error al generar árbol: dot terminó con código {e.returncode}."
+            job.status = "error"
+        except Exception as e:
+            job.error = f"Error al generar árbol: {e}"
+            job.status = "error"
+        finally:
+            job.future = None
+            job.finished = time.time()
+
+    def _cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.status != "queued" or job.future is None or not job.future.cancel():
+            return False
+        job.status, job.future, job.finished = "cancelled", None, time.time()
+        return True
+
+    def _queued(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status == "queued")
+
+    def _remember(self, job: RenderJob):
+        jobs = self._jobs
+        jobs[job.id] = job
+        jobs.move_to_end(job.id)
+        # Olvida los trabajos terminados mas viejos (los activos se conservan)
+        if len(jobs) > self.max_jobs:
+            for old in [j for j in jobs.values() if j.status not in ACTIVE][:len(jobs) - self.max_jobs]:
+                del jobs[old.id]
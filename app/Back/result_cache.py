@@ -0,0 +1,118 @@
+# result_cache.py
+# Cache de resultados de /api/analyze: hash del codigo (y de las opciones que
+# cambian la respuesta) -> JSON ya serializado. Un nivel en memoria (LRU acotado
+# por cantidad y por bytes) y, si se configura un directorio, un segundo nivel
+# en disco sobre ArtifactStore (escrituras atomicas, LRU por tamano y edad).
+# Cada entrada guarda ademas un dato corto (meta) para validarla al leerla;
+# /api/analyze guarda ahi el id del trabajo de la imagen del arbol.
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.Back.artifacts import ArtifactStore
+
+# Cambiarlo invalida todas las entradas (p.ej. si cambia el formato de la respuesta)
+CACHE_VERSION = "2"
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 2**20, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 256 * 2**20, disk_max_age: float = 7 * 86400):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = ArtifactStore(disk_dir, "", disk_max_bytes, disk_max_age) if disk_dir else None
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(source: str, options: Dict[str, Any]) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{CACHE_VERSION}\x00{json.dumps(options, sort_keys=True)}\x00".encode())
+        h.update(source.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    # valid(meta) decide si la entrada sigue sirviendo; si no, se descarta y
+    # cuenta como fallo
+    def get(self, key: str, valid: Optional[Callable[[str], bool]] = None) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        level = "hits"
+        if entry is None and self.disk is not None:
+            entry = self._read_disk(key)
+            level = "disk_hits"
+        if entry is not None and valid is not None and not valid(entry[1]):
+            self.discard(key)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                setattr(self, level, getattr(self, level) + 1)
+                if level == "disk_hits":
+                    self._store(key, entry)
+        return entry
+
+    def _read_disk(self, key: str) -> Optional[Tuple[bytes, str]]:
+        path = self.disk.lookup(key, ".json")
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                meta, _, body = f.read().partition(b"\n")
+        except FileNotFoundError:
+            return None
+        return body, meta.decode()
+
+    def put(self, key: str, body: bytes, meta: str = ""):
+        with self._lock:
+            self._store(key, (body, meta))
+        if self.disk is not None:
+            def write(path):
+                with open(path, "wb") as f:
+                    f.write(meta.encode() + b"\n" + body)
+            self.disk.put(key, ".json", write)
+
+    def discard(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry[0])
+        if self.disk is not None:
+            try:
+                os.remove(self.disk.path(key, ".json"))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _store(self, key: str, entry: Tuple[bytes, str]):
+        entries = self._entries
+        old = entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+        if len(entry[0]) > self.max_bytes:
+            return
+        entries[key] = entry
+        self._bytes += len(entry[0])
+        while len(entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (body, _) = entries.popitem(last=False)
+            self._bytes -= len(body)
+            self.evictions += 1
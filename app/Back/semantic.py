@@ -1,5 +1,74 @@
-from typing import Dict, List, Optional, Any
-from app.Back.parser import Node
+# semantic.py
+# Tabla de simbolos: clases -> campos y metodos (tipo de retorno, parametros y
+# variables locales), armada en un solo recorrido del arbol. Del arbol de
+# derivacion solo se visitan los nodos que pueden declarar algo (miembros,
+# parametros, bloques y sentencias); las expresiones no se recorren.
+# Los hijos se buscan por posicion: la produccion fija donde esta cada simbolo
+# (p.ej. Member -> ModifiersOpt TypeOrVoid id MemberRest), asi que no hace
+# falta revisar la lista de hijos.
+# Los locales tienen alcance de bloque: un bloque ve los parametros y los
+# locales de los bloques que lo contienen (no se pueden volver a declarar),
+# pero dos bloques hermanos si pueden usar el mismo nombre.
+from typing import Any, Dict, Iterator, List, Optional
+from app.Back.ast_builder import AstNode
+from app.Back.grammar import GRAMMAR
+from app.Back.parser_generator import CompiledGrammar, check_builtin_grammar, get_compiled
+from app.Back.tree import Node
+
+
+def _child_index(grammar) -> Dict[str, Dict[str, int]]:
+    # Para cada no terminal: simbolo -> posicion en su lado derecho, si es la
+    # misma en todas las alternativas que lo contienen
+    index = {}
+    for lhs, prods in grammar.items():
+        pos, ambiguous = {}, set()
+        for rhs in prods:
+            for i, sym in enumerate(rhs):
+                if pos.setdefault(sym, i) != i:
+                    ambiguous.add(sym)
+        index[lhs] = {s: i for s, i in pos.items() if s not in ambiguous}
+    return index
+
+
+_CHILD = _child_index(GRAMMAR)
+_NO_CHILDREN: Dict[str, int] = {}
+
+# Marca de fin de bloque en la pila del recorrido
+_POP = object()
+
+
+def _child(node: Optional[Node], sym: str) -> Optional[Node]:
+    # None si el nodo no lo tiene (otra alternativa o un nodo de error sin hijos)
+    if node is None:
+        return None
+    i = _CHILD.get(node.symbol, _NO_CHILDREN).get(sym)
+    ch = node.children
+    if i is None or i >= len(ch) or ch[i].symbol != sym:
+        return None
+    return ch[i]
+
+
+def _spine(node: Optional[Node], item: str, rest: str) -> Iterator[Node]:
+    # Elementos de una lista recursiva por la derecha (MemberList, ParamRest, ...)
+    while node is not None:
+        x = _child(node, item)
+        if x is not None:
+            yield x
+        node = _child(node, rest)
+
+
+def _value(idnode: Optional[Node]) -> Optional[str]:
+    tok = idnode.token if idnode is not None else None
+    return tok.value if tok is not None else None
+
+
+def _type_name(node: Optional[Node]) -> Optional[str]:
+    # Type / TypeOrVoid -> tipo del token de la hoja (int, String, void, ...)
+    while node is not None and node.children:
+        node = node.children[0]
+    tok = node.token if node is not None else None
+    return tok.type if tok is not None else None
+
 
 class SymbolTable:
     def __init__(self):
@@ -7,124 +76,351 @@ class SymbolTable:
         self.errors: List[str] = []
 
     def analyze(self, root: Node):
+        if isinstance(root, AstNode):
+            self._analyze_ast(root)
+            return
         if root.symbol != "Prog":
             self.errors.append("Root is not Prog")
             return
-        for ch in getattr(root, "children", []):
-            self._walk(ch)
+        self._class_decl(_child(root, "ClassDecl"))
 
-    def _walk(self, node: Node):
-        if node.symbol == "ClassDecl":
-            self._class_decl(node)
-            return
-        for c in getattr(node, "children", []):
-            self._walk(c)
-
-    def _class_decl(self, node: Node):
-        idnode = next((c for c in node.children if c.symbol == "id" and c.token), None)
-        if not idnode:
+    def _new_class(self, cname: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not cname:
             self.errors.append("Class without id")
-            return
-        cname = idnode.token.value
+            return None
         if cname in self.classes:
             self.errors.append(f"Duplicate class {cname}")
-            return
+            return None
         cls = {"fields": {}, "methods": {}}
         self.classes[cname] = cls
+        return cls
 
-        mlist = next((c for c in node.children if c.symbol == "MemberList"), None)
-        if mlist:
-            self._members(mlist, cls, cname)
+    def _field(self, cls: Dict, cname: str, name: Optional[str], t: Optional[str]):
+        if not name:
+            return
+        if name in cls["fields"]:
+            self.errors.append(f"Duplicate field {name} in {cname}")
+        else:
+            cls["fields"][name] = t
 
-    def _members(self, node: Node, cls: Dict, cname: str):
-        def rec(n: Node):
-            for ch in getattr(n, "children", []):
-                if ch.symbol == "Member":
-                    self._member(ch, cls, cname)
-                rec(ch)
-        rec(node)
+    # Devuelve (datos del metodo, alcance de los parametros) o None si no se registra
+    def _method(self, cls: Dict, cname: str, mname: Optional[str], rettype: Optional[str], params: List):
+        if not mname:
+            self.errors.append(f"Method without name in {cname}")
+            return None
+        if mname in cls["methods"]:
+            self.errors.append(f"Duplicate method {mname} in {cname}")
+            return None
+        data = {"ret": rettype, "params": params, "locals": {}}
+        cls["methods"][mname] = data
+        scope = {}
+        for t, name in params:
+            if not name:
+                continue
+            if name in scope:
+                self.errors.append(f"Duplicate parameter {name} in {mname}")
+            else:
+                scope[name] = t
+        return data, scope
+
+    def _local(self, data: Dict, scopes: List[Dict], name: Optional[str], t: Optional[str]):
+        if not name:
+            return
+        if any(name in s for s in scopes):
+            self.errors.append(f"Duplicate local {name} in method")
+        else:
+            scopes[-1][name] = t
+            data["locals"].setdefault(name, t)
+
+    # Arbol de derivacion
+    def _class_decl(self, node: Optional[Node]):
+        if node is None or not node.children:
+            return
+        cname = _value(_child(node, "id"))
+        cls = self._new_class(cname)
+        if cls is None:
+            return
+        for member in _spine(_child(node, "MemberList"), "Member", "MemberList"):
+            self._member(member, cls, cname)
 
     def _member(self, node: Node, cls: Dict, cname: str):
-        if not node.children:
-            return
-        inner = node.children[0]
-        if inner.symbol == "VarDecl":
-            t = self._extract_type(inner)
-            idnode = next((c for c in inner.children if c.symbol == "id" and c.token), None)
-            if idnode:
-                name = idnode.token.value
-                if name in cls["fields"]:
-                    self.errors.append(f"Duplicate field {name} in {cname}")
+        rest = _child(node, "MemberRest")
+        if rest is None or not rest.children:
+            return
+        name = _value(_child(node, "id"))
+        t = _type_name(_child(node, "TypeOrVoid"))
+        tail = _child(rest, "FieldTail")
+        if tail is not None:
+            # int a, b = 2;  ->  id InitOpt FieldRest(, id InitOpt FieldRest)
+            self._field(cls, cname, name, t)
+            for idnode in _spine(_child(tail, "FieldRest"), "id", "FieldRest"):
+                self._field(cls, cname, _value(idnode), t)
+            return
+        params = []
+        for p in _spine(_child(rest, "ParamList"), "Param", "ParamRest"):
+            params.append((_type_name(_child(p, "Type")), _value(_child(p, "id"))))
+        method = self._method(cls, cname, name, t, params)
+        if method is not None:
+            self._block(_child(rest, "Block"), method[0], [method[1]])
+
+    def _block(self, block: Optional[Node], data: Dict, scopes: List[Dict]):
+        stack = [block] if block is not None else []
+        while stack:
+            node = stack.pop()
+            if node is _POP:
+                scopes.pop()
+                continue
+            if node.symbol == "Stmt":
+                if not node.children:
+                    continue
+                node = node.children[0]
+            sym = node.symbol
+            if sym == "Block":
+                scopes.append({})
+                stack.append(_POP)
+                stmts = list(_spine(_child(node, "StmtList"), "Stmt", "StmtList"))
+                stack.extend(reversed(stmts))
+            elif sym == "VarDeclStmt":
+                t = _type_name(_child(node, "Type"))
+                for decl in _spine(_child(node, "VarDeclList"), "VarDecl", "VarDeclRest"):
+                    self._local(data, scopes, _value(_child(decl, "id")), t)
+            elif sym == "IfStmt":
+                other = _child(_child(node, "ElseOpt"), "Stmt")
+                if other is not None:
+                    stack.append(other)
+                body = _child(node, "Stmt")
+                if body is not None:
+                    stack.append(body)
+            elif sym in ("WhileStmt", "ForStmt"):
+                body = _child(node, "Stmt")
+                if body is not None:
+                    stack.append(body)
+
+    # Misma tabla de simbolos a partir del arbol abstracto (Parser.parse(tree="ast"))
+    def _analyze_ast(self, root: AstNode):
+        if root.symbol != "Program":
+            self.errors.append("Root is not Program")
+            return
+        for cls_node in root.children:
+            if cls_node.symbol != "Class":
+                continue
+            cname = cls_node.value
+            cls = self._new_class(cname)
+            if cls is None:
+                continue
+            for m in cls_node.children:
+                if m.symbol == "Field":
+                    self._field(cls, cname, m.value, m.type)
+                elif m.symbol == "Method":
+                    params = [(c.type, c.value) for c in m.children if c.symbol == "Param"]
+                    method = self._method(cls, cname, m.value, m.type, params)
+                    if method is not None:
+                        self._ast_block(m.children[-1], method[0], [method[1]])
+
+    def _ast_block(self, block: AstNode, data: Dict, scopes: List[Dict]):
+        stack = [block]
+        while stack:
+            node = stack.pop()
+            if node is _POP:
+                scopes.pop()
+                continue
+            sym = node.symbol
+            if sym == "Block":
+                scopes.append({})
+                stack.append(_POP)
+                stack.extend(reversed(node.children))
+            elif sym == "VarDecl":
+                self._local(data, scopes, node.value, node.type)
+            elif sym in ("If", "While", "For"):
+                stack.extend(reversed(node.children))
+
+
+# Eventos de un miembro, ordenados por posicion al cerrar el miembro
+_OPEN, _CLOSE, _DECL, _USE, _CALL = range(5)
+
+
+def _pos(tok) -> tuple:
+    return tok.line, tok.col
+
+
+# Un Item que no se pudo analizar (error de sintaxis) llega como None y se omite
+def _list_first(alt: int, v: list) -> list:
+    # X -> Item Rest | ε
+    return ([v[0]] if v[0] is not None else []) + (v[1] or []) if alt == 0 else []
+
+
+def _list_rest(alt: int, v: list) -> list:
+    # Rest -> , Item Rest | ε
+    return ([v[1]] if v[1] is not None else []) + (v[2] or []) if alt == 0 else []
+
+
+class SemanticHooks:
+    # La misma tabla de simbolos armada durante el analisis sintactico, con
+    # acciones al terminar cada produccion:
+    #   sem = SemanticHooks()
+    #   Parser(tokens, hooks=sem.hooks).parse("none")   # sem.classes, sem.errors
+    # Como las acciones van de abajo hacia arriba, cada miembro junta sus
+    # declaraciones, usos y bloques como eventos con su posicion y los resuelve
+    # en orden al terminar; lo que no es local se resuelve contra los campos y
+    # metodos al terminar la clase (un campo puede declararse despues de usarse).
+    # Ademas de lo que informa SymbolTable, marca identificadores y metodos no
+    # declarados; los nombres calificados (x.y) no se revisan.
+    # compiled: la gramatica del Parser que va a usar los hooks (por defecto la activa)
+    def __init__(self, compiled: Optional[CompiledGrammar] = None):
+        check_builtin_grammar(compiled if compiled is not None else get_compiled(), "El analisis semantico")
+        self.classes: Dict[str, Dict[str, Any]] = {}
+        self._errors: List[tuple] = []
+        self._events: List[list] = []
+        self._cls = {"fields": {}, "methods": {}}
+        # Errores que llevan el nombre de la clase, que se conoce al final
+        self._pending: List[tuple] = []
+        self._unresolved: List[tuple] = []
+        self.hooks = {
+            "Type": self._type,
+            "TypeOrVoid": self._type_or_void,
+            "Param": self._param,
+            "ParamList": _list_first,
+            "ParamRest": _list_rest,
+            "VarDecl": self._var_decl,
+            "VarDeclList": _list_first,
+            "VarDeclRest": _list_rest,
+            "VarDeclStmt": self._var_decl_stmt,
+            "Block": self._block,
+            "PrimaryTail": self._primary_tail,
+            "PrimaryExpr": self._primary_expr,
+            "FieldTail": self._field_tail,
+            "FieldRest": self._field_rest,
+            "MemberRest": self._member_rest,
+            "Member": self._member,
+            "ClassDecl": self._class_decl,
+        }
+
+    @property
+    def errors(self) -> List[str]:
+        return [msg for _, msg in sorted(self._errors, key=lambda e: e[0])]
+
+    def _type(self, alt, v):
+        return v[0].type if v[0] is not None else None
+
+    def _type_or_void(self, alt, v):
+        return v[0] if alt == 0 else "void"
+
+    def _param(self, alt, v):
+        return v[0], v[1]
+
+    def _var_decl(self, alt, v):
+        tok = v[0]
+        if tok is None:
+            return None
+        ev = [_pos(tok), _DECL, tok.value, None]
+        self._events.append(ev)
+        return ev
+
+    def _var_decl_stmt(self, alt, v):
+        # El tipo llega despues de los declaradores
+        for ev in v[1] or ():
+            if ev is not None:
+                ev[3] = v[0]
+
+    def _block(self, alt, v):
+        if v[0] is not None and v[2] is not None:
+            self._events.append([_pos(v[0]), _OPEN, None, None])
+            self._events.append([_pos(v[2]), _CLOSE, None, None])
+
+    def _primary_tail(self, alt, v):
+        return ("call", "field", None)[alt]
+
+    def _primary_expr(self, alt, v):
+        if alt != 1 or v[0] is None or v[1] == "field":
+            return
+        tok = v[0]
+        self._events.append([_pos(tok), _CALL if v[1] == "call" else _USE, tok.value, tok.line])
+
+    def _field_tail(self, alt, v):
+        return v[1] or []
+
+    def _field_rest(self, alt, v):
+        return [v[1]] + (v[3] or []) if alt == 0 else []
+
+    def _member_rest(self, alt, v):
+        return ("method", v[1] or []) if alt == 0 else ("field", v[0] or [])
+
+    def _member(self, alt, v):
+        events, self._events = self._events, []
+        name_tok, t, rest = v[2], v[1], v[3]
+        if rest is None:
+            return
+        kind, items = rest
+        if kind == "field":
+            for tok in [name_tok] + items:
+                if tok is None:
+                    continue
+                if tok.value in self._cls["fields"]:
+                    self._pending.append((_pos(tok), f"Duplicate field {tok.value} in {{cls}}"))
                 else:
-                    cls["fields"][name] = t
-
-        elif inner.symbol == "MethodDecl":
-            rettype = self._extract_rettype(inner)
-            mname_node = next((c for c in inner.children if c.symbol == "id" and c.token), None)
-            mname = mname_node.token.value if mname_node else None
-            if not mname:
-                self.errors.append(f"Method without name in {cname}")
-                return
-            if mname in cls["methods"]:
-                self.errors.append(f"Duplicate method {mname} in {cname}")
-                return
-
-            params = self._collect_params(next((c for c in inner.children if c.symbol == "ParamList"), None))
-            data = {"ret": rettype, "params": params, "locals": {}}
-            cls["methods"][mname] = data
-
-            block = next((c for c in inner.children if c.symbol == "Block"), None)
-            if block:
-                self._collect_locals(block, data)
-
-    def _collect_params(self, plist: Optional[Node]):
-        res = []
-        if not plist:
-            return res
-        def rec(n: Node):
-            for c in getattr(n, "children", []):
-                if c.symbol == "Param":
-                    t = self._extract_type(c)
-                    idnode = next((x for x in c.children if x.symbol == "id" and x.token), None)
-                    name = idnode.token.value if idnode else None
-                    res.append((t, name))
+                    self._cls["fields"][tok.value] = t
+            # Usos en los inicializadores
+            self._unresolved += [(e[0], e[1], e[2], e[3]) for e in events if e[1] in (_USE, _CALL)]
+            return
+
+        if name_tok is None:
+            self._pending.append(((0, 0), "Method without name in {cls}"))
+            return
+        mname = name_tok.value
+        if mname in self._cls["methods"]:
+            self._pending.append((_pos(name_tok), f"Duplicate method {mname} in {{cls}}"))
+            return
+        params = [(pt, ptok.value if ptok is not None else None) for pt, ptok in items if pt is not None or ptok is not None]
+        data = {"ret": t, "params": params, "locals": {}}
+        self._cls["methods"][mname] = data
+        scope = {}
+        for pt, ptok in items:
+            if ptok is None:
+                continue
+            if ptok.value in scope:
+                self._errors.append((_pos(ptok), f"Duplicate parameter {ptok.value} in {mname}"))
+            else:
+                scope[ptok.value] = pt
+        self._resolve(events, data, [scope])
+
+    def _resolve(self, events: List[list], data: Dict, scopes: List[Dict]):
+        events.sort(key=lambda e: e[0])
+        for pos, kind, name, extra in events:
+            if kind == _OPEN:
+                scopes.append({})
+            elif kind == _CLOSE:
+                if len(scopes) > 1:
+                    scopes.pop()
+            elif kind == _DECL:
+                if any(name in s for s in scopes):
+                    self._errors.append((pos, f"Duplicate local {name} in method"))
                 else:
-                    rec(c)
-        rec(plist)
-        return res
-
-    def _collect_locals(self, block: Node, method_sym: Dict):
-        def rec(n: Node):
-            for c in getattr(n, "children", []):
-                if c.symbol == "VarDecl":
-                    t = self._extract_type(c)
-                    idnode = next((x for x in c.children if x.symbol == "id" and x.token), None)
-                    if idnode:
-                        name = idnode.token.value
-                        if name in method_sym["locals"]:
-                            self.errors.append(f"Duplicate local {name} in method")
-                        else:
-                            method_sym["locals"][name] = t
-                rec(c)
-        rec(block)
-
-    def _extract_type(self, node: Node) -> Optional[str]:
-        tnode = next((c for c in node.children if c.symbol == "Type"), None)
-        if not tnode:
-            return None
-        leaf = next((c for c in tnode.children if c.token), None)
-        return leaf.token.type if leaf and leaf.token else None
+                    scopes[-1][name] = extra
+                    data["locals"].setdefault(name, extra)
+            elif kind == _CALL or not any(name in s for s in scopes):
+                self._unresolved.append((pos, kind, name, extra))
+
+    def _class_decl(self, alt, v):
+        cls, pending, unresolved = self._cls, self._pending, self._unresolved
+        self._cls, self._pending, self._unresolved = {"fields": {}, "methods": {}}, [], []
+        cname = v[2].value if v[2] is not None else None
+        if not cname:
+            self._errors.append(((0, 0), "Class without id"))
+            return
+        if cname in self.classes:
+            self._errors.append((_pos(v[2]), f"Duplicate class {cname}"))
+            return
+        self.classes[cname] = cls
+        self._errors += [(pos, msg.format(cls=cname)) for pos, msg in pending]
+        for pos, kind, name, line in unresolved:
+            if kind == _CALL and name not in cls["methods"]:
+                self._errors.append((pos, f"Undeclared method {name} (line {line})"))
+            elif kind == _USE and name not in cls["fields"]:
+                self._errors.append((pos, f"Undeclared identifier {name} (line {line})"))
 
-    def _extract_rettype(self, node: Node) -> Optional[str]:
-        tov = next((c for c in node.children if c.symbol == "TypeOrVoid"), None)
-        if not tov:
-            return None
-        v = next((c for c in tov.children if c.token and c.token.type == "void"), None)
-        if v:
-            return "void"
-        return self._extract_type(tov)
 
 def run_semantic_on_tree(root: Node):
+    check_builtin_grammar(get_compiled(), "El analisis semantico")
     st = SymbolTable()
     st.analyze(root)
     return st
@@ -1,16 +1,14 @@
 # table_gen.py
 import csv
 from typing import List
-from app.Back.parser_generator import ParserGenerator
-from app.Back.grammar import GRAMMAR, START_SYMBOL
-from app.Back.grammar import get_terminals
+from app.Back import metrics
+from app.Back.parser_generator import ParserGenerator, get_compiled
 
 def export_table_csv(filename: str = "tabla_transicion.csv") -> str:
-    pg = ParserGenerator()
-    res = pg.generate()
-    table = res["table"]
-    terminals = sorted(set(get_terminals() + ["$"]))
-    nonterms = list(GRAMMAR.keys())
+    compiled = get_compiled()
+    table = compiled.table
+    terminals = list(compiled.terminals)
+    nonterms = compiled.nonterms
 
     with open(filename, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
@@ -24,12 +22,11 @@ def export_table_csv(filename: str = "tabla_transicion.csv") -> str:
     return filename
 
 def export_table_txt(filename: str = "tabla_transicion.txt") -> str:
-    pg = ParserGenerator()
-    res = pg.generate()
-    table = res["table"]
-    conflicts = res["conflicts"]
-    terminals = sorted(set(get_terminals() + ["$"]))
-    nonterms = list(GRAMMAR.keys())
+    compiled = get_compiled()
+    table = compiled.table
+    conflicts = compiled.conflicts
+    terminals = list(compiled.terminals)
+    nonterms = compiled.nonterms
 
     lines: List[str] = []
     lines.append("== Tabla LL(1) ==")
@@ -56,7 +53,15 @@ def export_table_txt(filename: str = "tabla_transicion.txt") -> str:
     return filename
 
 if __name__ == "__main__":
-    #Se crean dos archivos para ver la tabla de transiciones del parser
-    csv_path = export_table_csv()
-    txt_path = export_table_txt()
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m app.Back.table_gen")
+    ap.add_argument("--profile", metavar="SALIDA", help="perfilar la generacion con cProfile y guardar las estadisticas (pstats)")
+    args = ap.parse_args()
+    with metrics.profiled(args.profile):
+        #Se crean dos archivos para ver la tabla de transiciones del parser
+        csv_path = export_table_csv()
+        txt_path = export_table_txt()
+        # Artefacto binario que carga el parser al arrancar
+        bin_path = ParserGenerator().write_artifact()
     print("Tabla exportada a:", csv_path, "y", txt_path)
+    print("Tabla compilada guardada en:", bin_path)
@@ -0,0 +1,253 @@
+# tree.py
+# Representaciones del arbol de derivacion y recorrido comun para ambas.
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from app.Back.grammar import EPS
+
+
+@dataclass(slots=True)
+class Node:
+    symbol: str
+    token: Optional[Any] = None
+    # Las hojas comparten la tupla vacia; los no terminales llevan una lista
+    children: Sequence[Any] = ()
+
+
+# Todas las expansiones epsilon apuntan a la misma hoja
+EPS_LEAF = Node(EPS)
+
+
+# Constructores de arbol para el driver de pila del Parser (codigos de IntTable):
+#   leaf(t, token)      terminal t emparejado con token
+#   missing(t)          terminal t que faltaba en la entrada
+#   reduce(p, values)   produccion p terminada; values = valores de su lado derecho
+#   error(A)            no terminal A que no se pudo expandir
+#   eps                 valor de una hoja ε
+#   finish(root)        valor que devuelve Parser.parse
+class NodeBuilder:
+    def __init__(self, it):
+        self.nonterm_names = it.nonterm_names
+        self.term_names = it.term_names
+        self.prod_names = [it.nonterm_names[A] for A in it.lhs]
+        self.eps = EPS_LEAF
+
+    def leaf(self, t: int, token) -> Node:
+        return Node(self.term_names[t], token)
+
+    def missing(self, t: int) -> Node:
+        return Node(self.term_names[t])
+
+    def reduce(self, p: int, children: List[Node]) -> Node:
+        return Node(self.prod_names[p], None, children)
+
+    def error(self, A: int) -> Node:
+        return Node(self.nonterm_names[A], None, [])
+
+    def finish(self, root: Node) -> Node:
+        return root
+
+
+# Arbol "plano": cada nodo es un indice en arrays paralelos.
+#   sym[i]   id del simbolo (no terminales, luego terminales, luego ε)
+#   tok[i]   indice en tokens, -1 si no tiene token
+#   first[i], count[i]   rango de sus hijos dentro de kids
+# El nodo 0 es la hoja ε compartida.
+class FlatTree:
+    def __init__(self, symbols: Tuple[str, ...]):
+        self.symbols = symbols
+        self.sym = array("H")
+        self.tok = array("i")
+        self.first = array("I")
+        self.count = array("I")
+        self.kids = array("I")
+        self.tokens: List[Any] = []
+        self.root = 0
+        self._add(symbols.index(EPS), -1)
+
+    def _add(self, sym: int, tok: int) -> int:
+        i = len(self.sym)
+        self.sym.append(sym)
+        self.tok.append(tok)
+        self.first.append(0)
+        self.count.append(0)
+        return i
+
+    def node(self, i: int) -> "FlatNode":
+        return FlatNode(self, i)
+
+    def __len__(self) -> int:
+        return len(self.sym)
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.sym, self.tok, self.first, self.count, self.kids))
+
+
+class FlatNode:
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: FlatTree, index: int):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def symbol(self) -> str:
+        return self.tree.symbols[self.tree.sym[self.index]]
+
+    @property
+    def token(self):
+        k = self.tree.tok[self.index]
+        return self.tree.tokens[k] if k >= 0 else None
+
+    @property
+    def children(self) -> List["FlatNode"]:
+        t = self.tree
+        f = t.first[self.index]
+        return [FlatNode(t, k) for k in t.kids[f:f + t.count[self.index]]]
+
+
+class FlatBuilder:
+    def __init__(self, it):
+        self.N = len(it.nonterm_names)
+        self.lhs = it.lhs
+        self.tree = FlatTree(tuple(it.nonterm_names) + tuple(it.term_names) + ("<unknown>", EPS))
+        self.eps = 0
+
+    def leaf(self, t: int, token) -> int:
+        tree = self.tree
+        tree.tokens.append(token)
+        return tree._add(self.N + t, len(tree.tokens) - 1)
+
+    def missing(self, t: int) -> int:
+        return self.tree._add(self.N + t, -1)
+
+    def reduce(self, p: int, children: List[int]) -> int:
+        tree = self.tree
+        i = tree._add(self.lhs[p], -1)
+        if children:
+            tree.first[i] = len(tree.kids)
+            tree.count[i] = len(children)
+            tree.kids.extend(children)
+        return i
+
+    def error(self, A: int) -> int:
+        return self.tree._add(A, -1)
+
+    def finish(self, root: int) -> FlatNode:
+        self.tree.root = root
+        return FlatNode(self.tree, root)
+
+
+# No construye nada: para validar la entrada sin guardar el arbol
+class NullBuilder:
+    def __init__(self, it):
+        self.eps = None
+
+    def leaf(self, t: int, token):
+        return None
+
+    def missing(self, t: int):
+        return None
+
+    def reduce(self, p: int, values: list):
+        return None
+
+    def error(self, A: int):
+        return None
+
+    def finish(self, root):
+        return None
+
+
+# Acciones al terminar cada produccion (traduccion dirigida por la sintaxis):
+# hooks = {no terminal: fn(alt, valores)}, con la misma forma que las acciones
+# del AST (ast_builder.ACTIONS). Cada valor es el token de un terminal (None si
+# faltaba o es ε) o lo que devolvio el hook de un no terminal (None si no
+# tiene). Envuelve a otro constructor: con NullBuilder solo se calculan los
+# valores de los hooks; con los demas cada valor es el par (nodo, valor del hook).
+class HookBuilder:
+    def __init__(self, inner, hooks: Dict[str, Callable[[int, list], Any]], it):
+        unknown = set(hooks) - set(it.nonterm_names)
+        if unknown:
+            raise ValueError(f"Hooks para simbolos que no son no terminales: {', '.join(sorted(unknown))}")
+        names = it.nonterm_names
+        self.alt = it.alt
+        self.hooks = [hooks.get(names[A]) for A in it.lhs]
+        self.inner = inner
+        self.pairs = not isinstance(inner, NullBuilder)
+        self.eps = (inner.eps, None) if self.pairs else None
+        if not self.pairs:
+            # Sin arbol: funciones directas para el driver, sin pasar por los pares
+            hooks_by_prod, alt = self.hooks, self.alt
+
+            def reduce(p: int, values: list):
+                hook = hooks_by_prod[p]
+                return hook(alt[p], values) if hook is not None else None
+
+            self.reduce = reduce
+            self.leaf = lambda t, token: token
+
+    def leaf(self, t: int, token):
+        return (self.inner.leaf(t, token), token) if self.pairs else token
+
+    def missing(self, t: int):
+        return (self.inner.missing(t), None) if self.pairs else None
+
+    def reduce(self, p: int, values: list):
+        hook = self.hooks[p]
+        if not self.pairs:
+            return hook(self.alt[p], values) if hook is not None else None
+        node = self.inner.reduce(p, [v[0] for v in values])
+        return node, (hook(self.alt[p], [v[1] for v in values]) if hook is not None else None)
+
+    def error(self, A: int):
+        return (self.inner.error(A), None) if self.pairs else None
+
+    def finish(self, root):
+        return self.inner.finish(root[0] if self.pairs else None)
+
+
+# Cuenta cuantas veces se reduce cada produccion (counts[p]) y delega todo lo
+# demas en otro constructor; el parser solo lo agrega con las metricas
+# encendidas, asi el driver no lleva contadores propios
+class CountBuilder:
+    def __init__(self, inner, it):
+        self.inner = inner
+        self.counts = counts = [0] * len(it.prods)
+        self.leaf, self.missing, self.error, self.eps = inner.leaf, inner.missing, inner.error, inner.eps
+        inner_reduce = inner.reduce
+
+        def reduce(p: int, values: list):
+            counts[p] += 1
+            return inner_reduce(p, values)
+
+        self.reduce = reduce
+
+    def finish(self, root):
+        return self.inner.finish(root)
+
+
+# Recorrido en preorden (nodo, profundidad), iterativo y valido para Node y FlatNode
+def walk(root) -> Iterator[Tuple[Any, int]]:
+    if isinstance(root, FlatNode):
+        yield from _walk_flat(root.tree, root.index)
+        return
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        yield node, depth
+        children = node.children
+        if children:
+            stack.extend((c, depth + 1) for c in reversed(children))
+
+
+def _walk_flat(tree: FlatTree, root: int) -> Iterator[Tuple[FlatNode, int]]:
+    first, count, kids = tree.first, tree.count, tree.kids
+    stack = [(root, 0)]
+    while stack:
+        i, depth = stack.pop()
+        yield FlatNode(tree, i), depth
+        n = count[i]
+        if n:
+            f = first[i]
+            stack.extend((k, depth + 1) for k in reversed(kids[f:f + n]))
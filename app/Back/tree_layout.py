@@ -0,0 +1,241 @@
+# tree_layout.py
+# Dibujo de arboles en SVG sin Graphviz.
+# La posicion de cada nodo se calcula con el algoritmo de Walker en tiempo lineal
+# (Buchheim, Junger y Leipert, 2002), todo iterativo para no depender del limite
+# de recursion. Antes de dibujar se quitan las hojas ε y cada cadena de nodos con
+# un solo hijo (Expr > CondOrExpr > ... > PrimaryExpr) se junta en una sola caja.
+from html import escape
+from typing import IO, Iterator, List
+from app.Back.grammar import EPS
+from app.Back.tree import walk
+
+CHAR_W = 7.2     # ancho aproximado de un caracter monoespaciado de 12px
+PAD = 12.0       # margen interno horizontal de cada caja
+BOX_H = 22.0
+LEVEL_H = 50.0   # distancia vertical entre niveles
+GAP = 10.0       # separacion minima entre cajas vecinas
+MARGIN = 10.0
+MAX_LABEL = 40
+
+
+class TreeLayout:
+    # Nodos numerados en preorden; kids[i] = hijos de i, x/y = centro de la caja
+    def __init__(self, labels: List[str], kids: List[List[int]], depth: List[int], leaf: List[bool]):
+        self.labels = labels
+        self.kids = kids
+        self.depth = depth
+        self.leaf = leaf
+        self.width = [len(l) * CHAR_W + PAD for l in labels]
+        self.x = _tidy(kids, self.width, GAP)
+        self.y = [MARGIN + BOX_H / 2 + d * LEVEL_H for d in depth]
+        if self.x:
+            left = min(x - w / 2 for x, w in zip(self.x, self.width))
+            self.x = [x - left + MARGIN for x in self.x]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def size(self):
+        if not self.x:
+            return 2 * MARGIN, 2 * MARGIN
+        right = max(x + w / 2 for x, w in zip(self.x, self.width))
+        return right + MARGIN, max(self.y) + BOX_H / 2 + MARGIN
+
+
+def _label(node) -> str:
+    tok = node.token
+    value = tok.value if tok is not None else getattr(node, "value", None)
+    # Palabras clave y operadores: el valor es el mismo simbolo
+    text = node.symbol if value is None or value == node.symbol else f"{node.symbol}:{value}"
+    return text if len(text) <= MAX_LABEL else text[:MAX_LABEL - 1] + "…"
+
+
+def build_layout(root, collapse: bool = True) -> TreeLayout:
+    labels: List[str] = []
+    kids: List[List[int]] = []
+    leaf: List[bool] = []
+    parents: List[int] = []
+    for node, depth in walk(root):
+        if collapse and node.symbol == EPS and not node.children:
+            continue
+        i = len(labels)
+        labels.append(_label(node))
+        kids.append([])
+        leaf.append(node.token is not None)
+        del parents[depth:]
+        if depth:
+            kids[parents[depth - 1]].append(i)
+        parents.append(i)
+
+    if not collapse:
+        depth = [0] * len(labels)
+        for i, k in enumerate(kids):
+            for c in k:
+                depth[c] = depth[i] + 1
+        return TreeLayout(labels, kids, depth, leaf)
+
+    # Juntar cadenas de un solo hijo y renumerar en preorden
+    chain = [[l] for l in labels]
+    new_labels, new_kids, new_depth, new_leaf = [], [], [], []
+    stack = [(0, -1, 0)] if labels else []
+    while stack:
+        i, parent, d = stack.pop()
+        k = kids[i]
+        while len(k) == 1:
+            chain[i].append(labels[k[0]])
+            leaf[i] = leaf[k[0]]
+            k = kids[k[0]]
+        j = len(new_labels)
+        parts = chain[i]
+        new_labels.append(" › ".join(parts) if len(parts) <= 3 else f"{parts[0]} › … › {parts[-1]}")
+        new_kids.append([])
+        new_depth.append(d)
+        new_leaf.append(leaf[i])
+        if parent >= 0:
+            new_kids[parent].append(j)
+        stack.extend((c, j, d + 1) for c in reversed(k))
+    return TreeLayout(new_labels, new_kids, new_depth, new_leaf)
+
+
+def _tidy(kids: List[List[int]], width: List[float], gap: float) -> List[float]:
+    # Walker/Buchheim con separacion segun el ancho de cada caja.
+    # Devuelve la coordenada x del centro de cada nodo (el nodo 0 es la raiz).
+    n = len(kids)
+    if not n:
+        return []
+    parent = [-1] * n
+    number = [0] * n
+    for v in range(n):
+        for i, w in enumerate(kids[v]):
+            parent[w] = v
+            number[w] = i
+    prelim = [0.0] * n
+    mod = [0.0] * n
+    shift = [0.0] * n
+    change = [0.0] * n
+    thread = [-1] * n
+    ancestor = list(range(n))
+    default = [-1] * n   # ancestro por defecto de los hijos de cada nodo
+
+    def next_left(v):
+        k = kids[v]
+        return k[0] if k else thread[v]
+
+    def next_right(v):
+        k = kids[v]
+        return k[-1] if k else thread[v]
+
+    def apportion(v, w, da):
+        # w = hermano izquierdo de v; acerca el subarbol de v a los anteriores
+        vip = vop = v
+        vim = w
+        vom = kids[parent[v]][0]
+        sip, sop, sim, som = mod[vip], mod[vop], mod[vim], mod[vom]
+        nr, nl = next_right(vim), next_left(vip)
+        while nr >= 0 and nl >= 0:
+            vim, vip = nr, nl
+            vom, vop = next_left(vom), next_right(vop)
+            ancestor[vop] = v
+            sh = prelim[vim] + sim - prelim[vip] - sip + (width[vim] + width[vip]) * 0.5 + gap
+            if sh > 0:
+                a = ancestor[vim]
+                if parent[a] != parent[v]:
+                    a = da
+                part = sh / (number[v] - number[a])
+                change[v] -= part
+                shift[v] += sh
+                change[a] += part
+                prelim[v] += sh
+                mod[v] += sh
+                sip += sh
+                sop += sh
+            sim += mod[vim]
+            sip += mod[vip]
+            som += mod[vom]
+            sop += mod[vop]
+            nr, nl = next_right(vim), next_left(vip)
+        if nr >= 0 and next_right(vop) < 0:
+            thread[vop] = nr
+            mod[vop] += sim - sop
+        if nl >= 0 and next_left(vom) < 0:
+            thread[vom] = nl
+            mod[vom] += sip - som
+            da = v
+        return da
+
+    # Primer recorrido en postorden (hijos de izquierda a derecha)
+    order = []
+    stack = [0]
+    while stack:
+        v = stack.pop()
+        order.append(v)
+        stack.extend(kids[v])
+    for v in reversed(order):
+        p = parent[v]
+        k = kids[v]
+        left = kids[p][number[v] - 1] if p >= 0 and number[v] else -1
+        if k:
+            s = c = 0.0
+            for w in reversed(k):
+                prelim[w] += s
+                mod[w] += s
+                c += change[w]
+                s += shift[w] + c
+            mid = (prelim[k[0]] + prelim[k[-1]]) * 0.5
+            if left >= 0:
+                prelim[v] = prelim[left] + (width[left] + width[v]) * 0.5 + gap
+                mod[v] = prelim[v] - mid
+            else:
+                prelim[v] = mid
+        elif left >= 0:
+            prelim[v] = prelim[left] + (width[left] + width[v]) * 0.5 + gap
+        if p >= 0:
+            default[p] = v if left < 0 else apportion(v, left, default[p])
+
+    # Segundo recorrido en preorden: x = prelim + suma de mod de los ancestros
+    x = [0.0] * n
+    stack = [(0, 0.0)]
+    while stack:
+        v, m = stack.pop()
+        x[v] = prelim[v] + m
+        m += mod[v]
+        stack.extend((w, m) for w in kids[v])
+    return x
+
+
+def iter_svg(root, collapse: bool = True, chunk: int = 1000) -> Iterator[str]:
+    # Genera el SVG por partes para poder enviarlo mientras se escribe
+    lay = build_layout(root, collapse)
+    w, h = lay.size()
+    yield (f'<svg xmlns="http://www.w3.org/2000/svg" width="{w:.0f}" height="{h:.0f}" '
+           f'viewBox="0 0 {w:.0f} {h:.0f}" font-family="monospace" font-size="12">\n'
+           '<style>rect{fill:#fff;stroke:#444}.t rect{fill:#e3f0ff}'
+           'text{text-anchor:middle;dominant-baseline:central}path{fill:none;stroke:#999}</style>\n')
+    xs, ys, kids = lay.x, lay.y, lay.kids
+    half = BOX_H / 2
+    parts = ['<path d="']
+    for v in range(len(lay)):
+        for c in kids[v]:
+            parts.append(f"M{xs[v]:.1f} {ys[v] + half:.1f}L{xs[c]:.1f} {ys[c] - half:.1f}")
+        if len(parts) >= chunk:
+            yield "".join(parts)
+            parts = []
+    parts.append('"/>\n')
+    yield "".join(parts)
+    parts = []
+    for v in range(len(lay)):
+        wd = lay.width[v]
+        cls = ' class="t"' if lay.leaf[v] else ""
+        parts.append(f'<g{cls}><rect x="{xs[v] - wd / 2:.1f}" y="{ys[v] - half:.1f}" width="{wd:.1f}" '
+                     f'height="{BOX_H:.0f}" rx="3"/><text x="{xs[v]:.1f}" y="{ys[v]:.1f}">'
+                     f'{escape(lay.labels[v], quote=False)}</text></g>\n')
+        if len(parts) >= chunk:
+            yield "".join(parts)
+            parts = []
+    parts.append("</svg>\n")
+    yield "".join(parts)
+
+
+def write_svg(root, out: IO[str], collapse: bool = True) -> None:
+    for part in iter_svg(root, collapse):
+        out.write(part)
@@ -1,5 +1,7 @@
 # tree_viz.py
+from app.Back import metrics
 from app.Back.parser import Node
+from app.Back.grammar import EPS
 from typing import Optional
 import subprocess
 import shutil
@@ -7,41 +9,133 @@ import os
 
 def _node_label(n: Node) -> str:
     if n.token:
-        val = str(n.token.value).replace('"', '\\"')
-        return f"{n.symbol}:{val}"
+        return f"{n.symbol}:{_escape(n.token.value)}"
+    value = getattr(n, "value", None)
+    if value is not None:
+        return f"{n.symbol}:{_escape(value)}"
     return n.symbol
 
-def export_dot(root: Node, path: str) -> str:
-    lines = ["digraph G {", '  node [shape=box, fontsize=10];', '  rankdir=TB;']
-    id_map = {}
-    counter = [0]
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
 
-    def rec(node: Node):
-        nid = counter[0]
-        counter[0] += 1
-        id_map[id(node)] = nid
+def _is_eps(n) -> bool:
+    return n.symbol == EPS and not n.children
+
+# Escribe el DOT por partes en out (archivo, socket.makefile("w"), StringIO...)
+# sin guardar el documento completo. Opciones:
+#   drop_eps    quitar las hojas ε
+#   collapse    juntar cada cadena de nodos con un solo hijo en una caja
+#   max_depth   no bajar de esa profundidad
+#   max_nodes   dejar de escribir nodos al llegar a esa cantidad
+# Donde se corta se agrega un nodo "… N más" (N = subarboles omitidos).
+# Devuelve la cantidad de nodos escritos (sin contar los "… N más").
+def write_dot(root: Node, out, drop_eps: bool = False, collapse: bool = False,
+              max_depth: Optional[int] = None, max_nodes: Optional[int] = None, chunk: int = 1000) -> int:
+    out.write('digraph G {\n  node [shape=box, fontsize=10];\n  rankdir=TB;\n')
+    lines = []
+    nid = 0
+    # (nodo, profundidad, id del padre)
+    stack = [(root, 0, -1)]
+    while stack:
+        if max_nodes is not None and nid >= max_nodes:
+            break
+        node, depth, parent = stack.pop()
         label = _node_label(node)
+        kids = node.children
+        if drop_eps and kids:
+            kids = [c for c in kids if not _is_eps(c)]
+        if collapse:
+            chain = [label]
+            while len(kids) == 1:
+                node = kids[0]
+                chain.append(_node_label(node))
+                kids = node.children
+                if drop_eps and kids:
+                    kids = [c for c in kids if not _is_eps(c)]
+            label = "\\n".join(chain) if len(chain) <= 3 else f"{chain[0]}\\n…\\n{chain[-1]}"
         lines.append(f'  {nid} [label="{label}"];')
-        for child in getattr(node, "children", []):
-            rec(child)
-            lines.append(f'  {nid} -> {id_map[id(child)]};')
-
-    rec(root)
+        if parent >= 0:
+            lines.append(f'  {parent} -> {nid};')
+        if kids:
+            if max_depth is not None and depth >= max_depth:
+                _more(lines, f"{nid}m", nid, len(kids))
+            else:
+                stack.extend((c, depth + 1, nid) for c in reversed(kids))
+        nid += 1
+        if len(lines) >= chunk:
+            out.write("\n".join(lines) + "\n")
+            lines = []
+    # Lo que quedo pendiente por max_nodes: un "… N más" por padre
+    pending = {}
+    for _, _, parent in stack:
+        pending[parent] = pending.get(parent, 0) + 1
+    for parent, n in pending.items():
+        if parent >= 0:
+            _more(lines, f"{parent}m", parent, n)
     lines.append("}")
+    out.write("\n".join(lines) + "\n")
+    return nid
+
+def _more(lines, mid: str, parent: int, n: int):
+    lines.append(f'  "{mid}" [label="… {n} más", shape=plaintext];')
+    lines.append(f'  {parent} -> "{mid}" [style=dashed];')
 
-    with open(path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+def export_dot(root: Node, path: str, **options) -> str:
+    with metrics.span("export_dot"), open(path, "w", encoding="utf-8") as f:
+        write_dot(root, f, **options)
+        if metrics.active():
+            metrics.count("bytes_written", f.tell())
     return path
 
 def render_dot_to_png(dot_path: str, png_path: Optional[str] = None) -> str:
     if png_path is None:
         base, _ = os.path.splitext(dot_path)
         png_path = base + ".png"
+    return render_dot(dot_path, png_path, "png")
 
+# fmt: cualquier formato de salida de dot (png, svg, ...). Con timeout, el
+# proceso se mata si tarda mas de esos segundos (subprocess.TimeoutExpired)
+def render_dot(dot_path: str, out_path: str, fmt: str = "png", timeout: Optional[float] = None) -> str:
     if shutil.which("dot") is None:
         raise RuntimeError(
             "Graphviz no encontrado. Instala Graphviz y asegúrate de que 'dot' esté en PATH."
         )
 
-    subprocess.run(["dot", "-Tpng", dot_path, "-o", png_path], check=True)
-    return png_path
+    with metrics.span("dot"):
+        subprocess.run(["dot", f"-T{fmt}", dot_path, "-o", out_path], check=True, timeout=timeout)
+    if metrics.active():
+        metrics.count("bytes_written", os.path.getsize(out_path))
+    return out_path
+
+# Backends para dibujar el arbol: "graphviz" (proceso dot, png o svg) o
+# "native" (tree_layout.py, solo svg, sin procesos externos). "auto" usa
+# Graphviz si esta instalado.
+BACKENDS = ("auto", "graphviz", "native")
+
+def resolve_backend(backend: str = "auto") -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend!r}. Opciones: {', '.join(BACKENDS)}")
+    if backend == "auto":
+        return "graphviz" if shutil.which("dot") else "native"
+    return backend
+
+# Genera directamente la imagen (el .dot intermedio se borra al terminar)
+# dot_options: opciones de write_dot para el backend Graphviz
+def render_tree(root: Node, out_path: str, fmt: str = "png", timeout: Optional[float] = None,
+                backend: str = "graphviz", dot_options: Optional[dict] = None) -> str:
+    if resolve_backend(backend) == "native":
+        if fmt != "svg":
+            raise ValueError("El backend nativo solo genera SVG.")
+        from app.Back.tree_layout import write_svg
+        with metrics.span("svg"), open(out_path, "w", encoding="utf-8") as f:
+            write_svg(root, f)
+            if metrics.active():
+                metrics.count("bytes_written", f.tell())
+        return out_path
+    dot_path = out_path + ".dot"
+    try:
+        export_dot(root, dot_path, **(dot_options or {}))
+        return render_dot(dot_path, out_path, fmt, timeout)
+    finally:
+        if os.path.exists(dot_path):
+            os.remove(dot_path)
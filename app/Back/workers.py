@@ -0,0 +1,249 @@
+# workers.py
+# Analisis completo de un programa, pensado para correr en procesos de un pool.
+# Cada proceso carga la tabla LL(1) una sola vez (init_worker) y la reutiliza.
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.Back import metrics
+from app.Back.artifacts import TokenDigest, render_salt
+from app.Back.grammar import EPS
+from app.Back.lexer import Lexer, Token
+from app.Back.parser import BUILDERS, Parser
+from app.Back.parser_generator import get_compiled
+from app.Back.semantic import SemanticHooks
+from app.Back.tree import EPS_LEAF, Node, walk
+
+
+_watcher = None
+
+
+# grammar_file: cada proceso vigila la gramatica por su cuenta (ver grammar_watch)
+def init_worker(grammar_file: Optional[str] = None, interval: float = 1.0):
+    global _watcher
+    get_compiled()
+    if grammar_file and _watcher is None:
+        from app.Back.grammar_watch import GrammarWatcher
+        _watcher = GrammarWatcher(grammar_file, interval, verbose=False).start()
+
+
+# Pool de procesos ya preparado para analizar. Usa "spawn" para no copiar los
+# hilos del proceso que lo crea (servidor web, cola de imagenes).
+def make_pool(workers: int = 0, grammar_file: Optional[str] = None, interval: float = 1.0) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=init_worker,
+                               initargs=(grammar_file, interval), mp_context=multiprocessing.get_context("spawn"))
+
+
+# Arranca los procesos del pool (y carga la tabla en cada uno) antes de la
+# primera peticion
+def warm_pool(pool: Executor, workers: int):
+    wait([pool.submit(init_worker) for _ in range(workers)])
+
+
+# Arbol en preorden como [profundidad, simbolo, valor]: sin anidar, para que
+# json no dependa del limite de recursion en arboles profundos
+def tree_rows(root) -> List[list]:
+    rows = []
+    for node, depth in walk(root):
+        if node.token is not None:
+            value = node.token.value
+        else:
+            value = getattr(node, "value", None)
+        rows.append([depth, node.symbol, value])
+    return rows
+
+
+# Arbol de Node a partir de tree_rows (las hojas vuelven con un Token sin
+# posicion): alcanza para dibujarlo
+def tree_from_rows(rows: List[list]) -> Optional[Node]:
+    parents: List[Node] = []
+    for depth, symbol, value in rows:
+        if symbol == EPS:
+            node = EPS_LEAF
+        else:
+            node = Node(symbol, None if value is None else Token(symbol, value, -1, -1), [])
+        del parents[depth:]
+        if parents:
+            parents[-1].children.append(node)
+        parents.append(node)
+    return parents[0] if parents else None
+
+
+def token_rows(tokens) -> List[Dict[str, Any]]:
+    return [
+        {"lexeme": t.value, "category": t.type, "line": t.line}
+        for t in tokens if t.type not in ("$",)
+    ]
+
+
+# Lexer, parser y (con semantic) tabla de simbolos de /api/analyze. Con las
+# metricas activas los tokens se leen antes en una lista, asi el lexer y el
+# parser se miden por separado; si no, el lexer alimenta al parser sobre la
+# marcha. Devuelve (lexer, digest de los tokens, SemanticHooks o None, arbol, errores).
+def run_analysis(code: str, want_tokens: bool = False, semantic: bool = False) -> tuple:
+    with metrics.span("analyze"):
+        lex = Lexer(code)
+        # La misma gramatica para el parser y para la clave de la imagen, aunque
+        # se recargue en el medio
+        compiled = get_compiled()
+        digest = TokenDigest(lex.lex() if metrics.active() else lex.stream(record=want_tokens),
+                             render_salt(compiled.fingerprint))
+        # La tabla de simbolos se arma durante el mismo analisis
+        sem = SemanticHooks(compiled) if semantic else None
+        tree, errors = Parser(digest, compiled, hooks=sem.hooks if sem else None).parse()
+    return lex, digest, sem, tree, errors
+
+
+# Lo que calcula /api/analyze, para correr en un proceso del pool: el arbol
+# vuelve como filas junto con el hash de sus tokens (clave de la imagen).
+# Si la imagen ya existe en tree_dir (<hash><tree_ext>) el arbol no se envia
+# ("rows": None), porque pasarlo entre procesos cuesta mas que el analisis.
+# timings: agregar los tiempos y conteos del analisis ("timings", ver metrics.Recorder)
+def analyze_request(code: str, want_tokens: bool = False, semantic: bool = False,
+                    tree_dir: Optional[str] = None, tree_ext: str = ".png",
+                    timings: bool = False) -> Dict[str, Any]:
+    with metrics.maybe_collect(timings) as rec:
+        lex, digest, sem, tree, errors = run_analysis(code, want_tokens, semantic)
+    key = digest.hexdigest()
+    skip = tree_dir is not None and os.path.exists(os.path.join(tree_dir, key + tree_ext))
+    result: Dict[str, Any] = {"errors": errors, "digest": key, "rows": None if skip else tree_rows(tree)}
+    if semantic:
+        result["semantic_errors"] = sem.errors
+    if want_tokens:
+        result["tokens"] = token_rows(lex.tokens)
+    if rec is not None:
+        result["timings"] = rec.to_dict()
+    return result
+
+
+# timeout: segundos maximos; solo se aplica en el hilo principal (como en los
+# procesos del pool), donde se puede interrumpir con una senal
+def analyze_source(code: str, name: Optional[str] = None, tree: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+    if timeout and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        try:
+            # La alarma puede llegar hasta que se desactiva: queda dentro del try
+            try:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+                return _analyze(code, name, tree)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        except TimeoutError:
+            return {"file": name, "error": f"Tiempo agotado ({timeout:g} s).", "elapsed_ms": timeout * 1e3}
+        finally:
+            signal.signal(signal.SIGALRM, previous)
+    return _analyze(code, name, tree)
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError
+
+
+def _analyze(code: str, name: Optional[str], tree: Optional[str]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    lex = Lexer(code)
+    counter = _Counter(lex.stream())
+    mode = tree if tree in BUILDERS else "none"
+    try:
+        root, errors = Parser(counter).parse(mode)
+    except ValueError as e:
+        # "ast" con una gramatica que no es la de grammar.py
+        return {"file": name, "error": str(e), "elapsed_ms": round((time.perf_counter() - t0) * 1e3, 3)}
+    result: Dict[str, Any] = {
+        "file": name,
+        "tokens": counter.count - 1,  # sin contar "$"
+        "lexical_errors": lex.errors,
+        "syntax_errors": errors,
+    }
+    if root is not None:
+        result["tree"] = tree_rows(root)
+    result["elapsed_ms"] = round((time.perf_counter() - t0) * 1e3, 3)
+    return result
+
+
+def analyze_file(path: str, tree: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            code = f.read()
+    except OSError as e:
+        return {"file": path, "error": str(e), "elapsed_ms": 0.0}
+    return analyze_source(code, path, tree)
+
+
+# Ejecuta fn(*args) en el pool para cada (etiqueta, args) y entrega
+# (etiqueta, resultado) en el orden en que terminan. Hay a lo sumo `window`
+# tareas en vuelo. Si timeout no es None, una tarea que pasa ese tiempo
+# corriendo se entrega como (etiqueta, TimeoutError()): el reloj arranca cuando
+# el pool se la pasa a sus procesos (fut.running()), no al enviarla, asi
+# esperar en la cola no cuenta. El pool le pasa a lo sumo una tarea de mas a
+# cada proceso, asi que puede esperar ahi hasta una tarea ajena: timeout es
+# solo un respaldo por si el proceso no responde (el limite real lo aplica
+# la tarea, p.ej. analyze_source) y conviene que sea mas del doble de ese
+# limite. Una tarea vencida sigue ocupando su lugar en la ventana hasta que
+# termina de verdad (cancel() no detiene a un proceso que ya la esta
+# corriendo), y su resultado se descarta.
+def run_unordered(pool: Executor, fn: Callable, items: Iterable[Tuple[Any, tuple]], window: int,
+                  timeout: Optional[float] = None) -> Iterator[Tuple[Any, Any]]:
+    items = iter(items)
+    # fut -> [etiqueta, momento en que empezo a correr o None]
+    pending: Dict[Any, list] = {}
+    expired: set = set()
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) + len(expired) < window:
+            item = next(items, None)
+            if item is None:
+                exhausted = True
+            else:
+                tag, args = item
+                pending[pool.submit(fn, *args)] = [tag, None]
+        if not pending and not expired:
+            break
+        wait_for = None
+        if timeout is not None and pending:
+            now = time.monotonic()
+            for fut, entry in pending.items():
+                if entry[1] is None and fut.running():
+                    entry[1] = now
+            started = [t for _, t in pending.values() if t is not None]
+            wait_for = max(0.0, min(started) + timeout - now) if started else None
+            if len(started) < len(pending):
+                # Hasta que arranquen las que esperan en la cola
+                wait_for = min(wait_for, _POLL) if wait_for is not None else _POLL
+        done, _ = wait(list(pending) + list(expired), timeout=wait_for, return_when=FIRST_COMPLETED)
+        expired -= done
+        for fut in done:
+            if fut not in pending:
+                continue
+            tag, _ = pending.pop(fut)
+            try:
+                yield tag, fut.result()
+            except Exception as e:
+                yield tag, e
+        if timeout is not None:
+            now = time.monotonic()
+            for fut in [f for f, (_, t) in pending.items() if t is not None and now - t >= timeout and not f.done()]:
+                tag, _ = pending.pop(fut)
+                if not fut.cancel():
+                    expired.add(fut)
+                yield tag, TimeoutError()
+
+
+# Cada cuanto run_unordered revisa si las tareas en cola ya empezaron (segundos)
+_POLL = 0.05
+
+
+class _Counter:
+    # Cuenta los tokens que pasan hacia el parser sin guardarlos
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.count = 0
+
+    def __iter__(self):
+        for tok in self.tokens:
+            self.count += 1
+            yield tok
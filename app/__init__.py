@@ -2,14 +2,86 @@
 from flask import Flask
 from flask_cors import CORS
 from . import routes
+from .Back.artifacts import ArtifactStore
+from .Back.render_queue import RenderQueue
+from .Back.incremental import SessionStore
+from .Back.result_cache import ResultCache
+from .Back.workers import make_pool
+from .Back.grammar_watch import GrammarWatcher
+from .Back import metrics
 import os
 
-def create_app():
+# config: valores que reemplazan a los de abajo (p.ej. en pruebas o al montar la
+# app desde otro modulo). Tambien se leen las variables de entorno FLASK_<CLAVE>
+# (FLASK_BATCH_MAX_BYTES=1048576), con el valor interpretado como JSON si se puede
+def create_app(config=None):
     template_folder = os.path.join(os.path.dirname(__file__), "Front", "templates")
     static_folder = os.path.join(os.path.dirname(__file__), "Front", "static")
 
     app = Flask(__name__, template_folder=template_folder, static_folder=static_folder)
     CORS(app)
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+
+    # Imagenes de arboles por contenido: static/trees/<hash>.png
+    app.config.setdefault("TREE_CACHE_DIR", os.path.join(static_folder, "trees"))
+    app.config.setdefault("TREE_CACHE_MAX_BYTES", 64 * 2**20)
+    app.config.setdefault("TREE_CACHE_MAX_AGE", 7 * 86400)
+    app.extensions["tree_artifacts"] = ArtifactStore(
+        app.config["TREE_CACHE_DIR"], "static/trees",
+        app.config["TREE_CACHE_MAX_BYTES"], app.config["TREE_CACHE_MAX_AGE"],
+    )
+    # Procesos dot simultaneos y segundos maximos por imagen
+    app.config.setdefault("RENDER_WORKERS", 2)
+    app.config.setdefault("RENDER_TIMEOUT", 30)
+    # "auto" (Graphviz si esta instalado), "graphviz" o "native" (SVG en Python)
+    app.config.setdefault("RENDER_BACKEND", "auto")
+    # Opciones de write_dot para Graphviz: arboles grandes quedan acotados
+    app.config.setdefault("RENDER_DOT_OPTIONS", {"drop_eps": True, "collapse": True, "max_nodes": 5000})
+    app.extensions["render_queue"] = RenderQueue(
+        app.extensions["tree_artifacts"], app.config["RENDER_WORKERS"], app.config["RENDER_TIMEOUT"],
+        backend=app.config["RENDER_BACKEND"], dot_options=app.config["RENDER_DOT_OPTIONS"],
+    )
+    # Sesiones de edicion incremental (/api/session)
+    app.config.setdefault("SESSION_MAX", 256)
+    app.config.setdefault("SESSION_TTL", 1800)
+    app.extensions["sessions"] = SessionStore(app.config["SESSION_MAX"], app.config["SESSION_TTL"])
+    # Cache de respuestas de /api/analyze; con RESULT_CACHE_DIR se agrega un nivel en disco
+    app.config.setdefault("RESULT_CACHE_MAX_ENTRIES", 1024)
+    app.config.setdefault("RESULT_CACHE_MAX_BYTES", 64 * 2**20)
+    app.config.setdefault("RESULT_CACHE_DIR", None)
+    app.config.setdefault("RESULT_CACHE_DISK_MAX_BYTES", 256 * 2**20)
+    app.config.setdefault("RESULT_CACHE_DISK_MAX_AGE", 7 * 86400)
+    app.extensions["result_cache"] = ResultCache(
+        app.config["RESULT_CACHE_MAX_ENTRIES"], app.config["RESULT_CACHE_MAX_BYTES"],
+        app.config["RESULT_CACHE_DIR"], app.config["RESULT_CACHE_DISK_MAX_BYTES"],
+        app.config["RESULT_CACHE_DISK_MAX_AGE"],
+    )
+    # Pool de procesos para /api/analyze/batch y el modo ASGI (app/asgi.py);
+    # los procesos se crean al usarlo
+    app.config.setdefault("ANALYSIS_WORKERS", os.cpu_count() or 1)
+    app.config.setdefault("BATCH_MAX_BYTES", 16 * 2**20)
+    app.config.setdefault("BATCH_MAX_ITEMS", 1000)
+    app.config.setdefault("BATCH_ITEM_TIMEOUT", 10)
+    # Modo ASGI: analisis esperando turno antes de responder 503
+    app.config.setdefault("ASYNC_MAX_PENDING", 256)
+    app.config.setdefault("ASYNC_MAX_BODY", 2 * 2**20)
+    # Recarga en caliente: archivo de gramatica (.py, .json o BNF) que se revisa
+    # cada GRAMMAR_POLL_INTERVAL segundos, aqui y en cada proceso del pool
+    app.config.setdefault("GRAMMAR_FILE", os.environ.get("GRAMMAR_FILE"))
+    app.config.setdefault("GRAMMAR_POLL_INTERVAL", 1.0)
+    grammar_file = app.config["GRAMMAR_FILE"]
+    if grammar_file:
+        app.extensions["grammar_watcher"] = GrammarWatcher(grammar_file, app.config["GRAMMAR_POLL_INTERVAL"]).start()
+    app.extensions["analysis_pool"] = make_pool(app.config["ANALYSIS_WORKERS"], grammar_file,
+                                                app.config["GRAMMAR_POLL_INTERVAL"])
+
+    # Tiempos por etapa y contadores del proceso (/api/metrics); apagados no
+    # cuestan nada. "timings" en /api/analyze funciona igual sin esto
+    app.config.setdefault("METRICS", os.environ.get("METRICS", "") not in ("", "0"))
+    if app.config["METRICS"]:
+        metrics.enable()
 
     app.register_blueprint(routes.bp)
     app.register_blueprint(routes.bp2)
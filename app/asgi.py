@@ -0,0 +1,305 @@
+# app/asgi.py
+# Modo de servicio asincrono (ASGI):  uvicorn app.asgi:app --port 8000
+# /api/analyze se atiende en el bucle de eventos y el trabajo de CPU (lexer,
+# parser y analisis semantico) corre en el pool de procesos de la aplicacion,
+# que se arranca al iniciar el servidor (cada proceso carga la tabla LL(1) una
+# vez). Las peticiones esperan turno en una cola acotada; si esta llena se
+# responde 503 con Retry-After en lugar de acumular trabajo. Las demas rutas
+# pasan a la aplicacion Flask, que corre en un hilo.
+import asyncio
+import io
+import json
+import sys
+import threading
+from typing import Optional
+from flask import Flask
+from app import create_app
+from app.results import analysis_key, image_alive, tree_job
+from app.Back import metrics
+from app.Back.render_queue import FORMATS
+from app.Back.workers import analyze_request, tree_from_rows, warm_pool
+
+
+class AnalysisQueue:
+    # Cola acotada delante del pool: dos tareas por proceso la consumen y cada
+    # una tiene a lo sumo un analisis en el pool, asi cada proceso tiene el
+    # siguiente listo pero nunca se acumula mas trabajo del que puede atender
+    def __init__(self, pool, workers: int, max_pending: int):
+        self.pool = pool
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def start(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(self.max_pending)
+            self._tasks = [asyncio.create_task(self._consume()) for _ in range(2 * self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks, self.queue = [], None
+
+    # Devuelve None si la cola esta llena
+    def submit(self, *args) -> Optional[asyncio.Future]:
+        self.start()
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((fut, args))
+        except asyncio.QueueFull:
+            return None
+        return fut
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            fut, args = await self.queue.get()
+            if fut.done():
+                # El cliente se fue mientras esperaba
+                continue
+            try:
+                result = await loop.run_in_executor(self.pool, analyze_request, *args)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+            else:
+                if not fut.done():
+                    fut.set_result(result)
+
+
+class AsgiApp:
+    def __init__(self, flask_app: Flask):
+        self.flask = flask_app
+        config = flask_app.config
+        self.pool = flask_app.extensions["analysis_pool"]
+        self.workers = config["ANALYSIS_WORKERS"]
+        self.max_body = config["ASYNC_MAX_BODY"]
+        # Las demas rutas (Flask) reciben el cuerpo ya leido: hasta el mayor
+        # de los limites de las rutas, que despues aplican el suyo
+        self.max_wsgi_body = max(config["ASYNC_MAX_BODY"], config["BATCH_MAX_BYTES"])
+        self.analysis = AnalysisQueue(self.pool, self.workers, config["ASYNC_MAX_PENDING"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/api/analyze":
+            await self._analyze(receive, send)
+        elif scope["type"] == "http":
+            await self._wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await asyncio.get_running_loop().run_in_executor(None, warm_pool, self.pool, self.workers)
+                self.analysis.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.analysis.stop()
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.flask.extensions["render_queue"].shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # Misma respuesta que la ruta sincronica (routes.analyze), con el analisis
+    # en el pool
+    async def _analyze(self, receive, send):
+        body = await _read_body(receive, self.max_body)
+        if body is None:
+            return await _send_json(send, 413, {"error": f"El código supera el máximo de {self.max_body} bytes."})
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return await _send_json(send, 400, {"error": "Se esperaba un objeto JSON."})
+        code = data.get("code", "")
+        want_tokens = bool(data.get("tokens", False))
+        semantic = bool(data.get("semantic", False))
+        fmt = data.get("format", "png")
+        want_timings = bool(data.get("timings", False))
+
+        with self.flask.app_context():
+            key = analysis_key(code, want_tokens, semantic, fmt)
+            cache = self.flask.extensions["result_cache"]
+            hit = None if want_timings else cache.get(key, image_alive)
+        if hit is not None:
+            return await _send(send, 200, hit[0])
+
+        # El analisis corre en otro proceso: sus tiempos vuelven con el
+        # resultado y se suman aqui al registro de metricas
+        timings = want_timings or metrics.enabled()
+        queue = self.flask.extensions["render_queue"]
+        ext = queue.artifact_ext(fmt if fmt in FORMATS else "png")
+        try:
+            analysis = await self._run(send, code, want_tokens, semantic, queue.store.root, ext, timings)
+            if analysis is not None and analysis["rows"] is None and not queue.store.lookup(analysis["digest"], ext):
+                # La imagen se borro mientras se analizaba: hace falta el arbol
+                analysis = await self._run(send, code, want_tokens, semantic, None, ext, timings)
+        except ValueError as e:
+            # "semantic" con una gramatica recargada que no es la de grammar.py
+            return await _send_json(send, 409, {"error": str(e)})
+        if analysis is None:
+            return
+        if "timings" in analysis:
+            metrics.merge(analysis["timings"])
+
+        # La cola de imagenes necesita el arbol: se rearma fuera del bucle
+        tree = None
+        if analysis["rows"] is not None:
+            tree = await asyncio.to_thread(tree_from_rows, analysis["rows"])
+        result = {"errors": analysis["errors"]}
+        if semantic:
+            result["semantic_errors"] = analysis["semantic_errors"]
+        with self.flask.app_context():
+            result.update(tree_job(tree, analysis["digest"], data))
+            if want_tokens:
+                result["tokens"] = analysis["tokens"]
+            if want_timings:
+                result["timings"] = analysis["timings"]
+            out = self.flask.json.dumps(result).encode("utf-8") + b"\n"
+        if not want_timings:
+            cache.put(key, out, result["tree_job"])
+        await _send(send, 200, out)
+
+    # Resultado de analyze_request, o None si la cola estaba llena (ya se respondio 503)
+    async def _run(self, send, *args) -> Optional[dict]:
+        fut = self.analysis.submit(*args)
+        if fut is None:
+            await _send_json(send, 503, {"error": "Servidor ocupado, intenta de nuevo."},
+                             [(b"retry-after", b"1")])
+            return None
+        # Si el cliente se va, la tarea se cancela y con ella fut: el consumidor la salta
+        return await fut
+
+    # Pasa la peticion a Flask (WSGI) en un hilo. La respuesta se envia por
+    # partes a medida que Flask la genera, asi las rutas que transmiten
+    # (/api/analyze/batch, /api/tree.svg) siguen transmitiendo.
+    async def _wsgi(self, scope, receive, send):
+        body = await _read_body(receive, self.max_wsgi_body)
+        if body is None:
+            return await _send_json(send, 413, {"error": f"El cuerpo supera el máximo de {self.max_wsgi_body} bytes."})
+        environ = _environ(scope, body)
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue(8)
+
+        gone = threading.Event()
+
+        # Devuelve False si ya no hay a quien enviar (el cliente se fue)
+        def put(item) -> bool:
+            if gone.is_set():
+                return False
+            asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+            return True
+
+        def start_response(status, headers, exc_info=None):
+            put(("start", int(status.split(" ", 1)[0]),
+                 [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]))
+
+        # Todo el recorrido de la respuesta en el mismo hilo: los generadores de
+        # Flask (stream_with_context) guardan su contexto en ese hilo
+        def run():
+            try:
+                response = self.flask(environ, start_response)
+                try:
+                    for chunk in response:
+                        if chunk and not put(chunk):
+                            break
+                finally:
+                    if hasattr(response, "close"):
+                        response.close()
+            except BaseException as e:
+                put(e)
+            finally:
+                put(None)
+
+        worker = loop.run_in_executor(None, run)
+        started = finished = False
+        try:
+            while True:
+                item = await chunks.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    print(f"Error en {scope['path']}: {item!r}", file=sys.stderr)
+                    if not started:
+                        await _send(send, 500, b"Internal Server Error", content_type=b"text/plain")
+                        finished = True
+                elif isinstance(item, tuple):
+                    await send({"type": "http.response.start", "status": item[1], "headers": item[2]})
+                    started = True
+                else:
+                    await send({"type": "http.response.body", "body": item, "more_body": True})
+            if started and not finished:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            # Libera al hilo si quedo esperando lugar en la cola
+            gone.set()
+            while not chunks.empty():
+                chunks.get_nowait()
+            await worker
+
+
+async def _read_body(receive, limit: Optional[int]) -> Optional[bytes]:
+    parts = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise asyncio.CancelledError
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if limit is not None and size > limit:
+            return None
+        parts.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(parts)
+
+
+async def _send(send, status: int, body: bytes, headers=(), content_type: bytes = b"application/json"):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(send, status: int, data, headers=()):
+    await _send(send, status, json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n", headers)
+
+
+def _environ(scope, body: bytes) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+        else:
+            key = "HTTP_" + name
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+app = AsgiApp(create_app())
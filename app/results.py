@@ -0,0 +1,36 @@
+# app/results.py
+# Piezas de la respuesta de /api/analyze que comparten la ruta sincronica
+# (routes.py) y el modo ASGI (asgi.py). Necesitan un contexto de aplicacion.
+from flask import current_app
+from .Back.parser_generator import get_compiled
+from .Back.render_queue import ACTIVE, FORMATS
+
+
+# Clave de la cache de resultados: el codigo, las opciones que cambian la
+# respuesta y la gramatica activa
+def analysis_key(code, want_tokens, semantic, fmt):
+    options = {"tokens": want_tokens, "format": fmt, "grammar": get_compiled().fingerprint}
+    if semantic:
+        options["semantic"] = True
+    return current_app.extensions["result_cache"].key(code, options)
+
+# Una respuesta guardada sirve mientras su imagen exista o se este generando
+def image_alive(job_id):
+    job = current_app.extensions["render_queue"].status(job_id)
+    return job is not None and job.status in ACTIVE + ("done",)
+
+# Encola el dibujo del arbol y devuelve los campos tree_* de la respuesta
+def tree_job(tree, key, data):
+    fmt = data.get("format", "png")
+    if fmt not in FORMATS:
+        fmt = "png"
+    job = current_app.extensions["render_queue"].submit(tree, key, fmt, data.get("replaces"))
+    state = job.to_dict()
+    result = {
+        "tree_job": state["id"],
+        "tree_status": state["status"],
+        "tree_image": state.get("url"),
+    }
+    if "error" in state:
+        result["tree_error"] = state["error"]
+    return result
@@ -1,8 +1,13 @@
-from flask import Blueprint, request, jsonify, current_app, render_template
+from flask import Blueprint, Response, request, jsonify, current_app, render_template, stream_with_context
 from .Back.lexer import Lexer
 from .Back.parser import Parser
-from .Back.tree_viz import export_dot, render_dot_to_png
-import os
+from .Back import metrics
+from .Back.artifacts import TokenDigest, render_salt
+from .Back.parser_generator import get_compiled
+from .Back.tree_layout import iter_svg
+from .Back.workers import analyze_source, run_analysis, run_unordered, token_rows
+from .results import analysis_key, image_alive, tree_job
+import json
 
 
 bp = Blueprint("main", __name__, template_folder="Front/templates", static_folder="Front/static")
@@ -20,33 +25,200 @@ def project_display():
 def analyze():
     data = request.get_json()
     code = data.get("code", "")
+    # La lista de tokens solo se arma si el cliente la pide ("tokens": true);
+    # "semantic": true agrega los errores de la tabla de simbolos (duplicados y no declarados)
+    want_tokens = bool(data.get("tokens", False))
+    semantic = bool(data.get("semantic", False))
+    fmt = data.get("format", "png")
+    # "timings": true agrega los tiempos de cada etapa y los conteos del
+    # analisis (ver Back/metrics.py); esas respuestas no pasan por la cache
+    want_timings = bool(data.get("timings", False))
 
-    lex = Lexer(code)
-    tokens = lex.lex()
-    token_list = [
-        {"lexeme": t.value, "category": t.type, "line": t.line}
-        for t in tokens if t.type not in ("$",)
-    ]
+    # Mismo codigo y mismas opciones: se devuelve el JSON guardado, siempre que
+    # la imagen del arbol siga existiendo (o se este generando)
+    cache = current_app.extensions["result_cache"]
+    key = analysis_key(code, want_tokens, semantic, fmt)
+    hit = None if want_timings else cache.get(key, image_alive)
+    if hit is not None:
+        return Response(hit[0], mimetype="application/json")
 
-    parser = Parser(tokens)
-    tree, errors = parser.parse()
+    try:
+        with metrics.maybe_collect(want_timings) as rec:
+            lex, digest, sem, tree, errors = run_analysis(code, want_tokens, semantic)
+    except ValueError as e:
+        # "semantic" con una gramatica recargada que no es la de grammar.py
+        return jsonify({"error": str(e)}), 409
+
+    result = {"errors": errors}
+    if semantic:
+        result["semantic_errors"] = sem.errors
+    result.update(tree_job(tree, digest.hexdigest(), data))
+    if want_tokens:
+        result["tokens"] = token_rows(lex.tokens)
+    if rec is not None:
+        result["timings"] = rec.to_dict()
+    body = current_app.json.dumps(result).encode("utf-8") + b"\n"
+    if rec is None:
+        cache.put(key, body, result["tree_job"])
+    return Response(body, mimetype="application/json")
+
+# Muchos programas en una sola peticion. Cuerpo JSON ({"programs": [...]} o
+# una lista) o NDJSON (un programa por linea); cada programa es un texto o
+# {"id", "code"}. Opciones (en el JSON o en la URL): tree, timeout.
+# Respuesta: NDJSON con un resultado por programa, en el orden en que terminan.
+@bp2.route("/api/analyze/batch", methods=["POST"])
+def analyze_batch():
+    limit = current_app.config["BATCH_MAX_BYTES"]
+    raw = request.stream.read(limit + 1)
+    if len(raw) > limit:
+        return jsonify({"error": f"El lote supera el máximo de {limit} bytes."}), 413
+    try:
+        items, options = _batch_items(raw, request.mimetype)
+    except ValueError as e:
+        return jsonify({"error": f"Lote inválido: {e}"}), 400
+    if len(items) > current_app.config["BATCH_MAX_ITEMS"]:
+        return jsonify({"error": f"El lote supera el máximo de {current_app.config['BATCH_MAX_ITEMS']} programas."}), 413
+
+    options.update(request.args.to_dict())
+    tree = options.get("tree") if options.get("tree") in ("node", "flat", "ast") else None
+    max_timeout = current_app.config["BATCH_ITEM_TIMEOUT"]
+    try:
+        timeout = min(float(options.get("timeout") or max_timeout), max_timeout)
+    except (TypeError, ValueError):
+        return jsonify({"error": "timeout debe ser un número de segundos."}), 400
+    # "nan" no es <= 0 pero tampoco sirve (setitimer la rechaza)
+    if not timeout > 0:
+        return jsonify({"error": "timeout debe ser un número de segundos."}), 400
+    pool = current_app.extensions["analysis_pool"]
+    # Una tarea por proceso: las que se envian empiezan enseguida
+    window = current_app.config["ANALYSIS_WORKERS"]
+
+    def results():
+        # El proceso corta el analisis al llegar a timeout (SIGALRM). El plazo
+        # de run_unordered es solo un respaldo por si el proceso no responde:
+        # cuenta desde que el pool le pasa la tarea, que puede esperar ahi a
+        # otra (p.ej. de otra peticion), de ahi el doble y el margen
+        tasks = ((i, (code, name, tree, timeout)) for i, (name, code) in enumerate(items))
+        for i, result in run_unordered(pool, analyze_source, tasks, window, 2 * timeout + 5):
+            name = items[i][0]
+            if isinstance(result, TimeoutError):
+                result = {"file": name, "error": f"Tiempo agotado ({timeout:g} s)."}
+            elif isinstance(result, Exception):
+                result = {"file": name, "error": f"Error interno: {result}"}
+            result["id"] = result.pop("file", name)
+            result["index"] = i
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(results()), mimetype="application/x-ndjson")
+
+def _batch_items(raw, mimetype):
+    text = raw.decode("utf-8")
+    options = {}
+    if mimetype in ("application/x-ndjson", "application/jsonl"):
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            options = {k: v for k, v in data.items() if k != "programs"}
+            data = data.get("programs")
+        if not isinstance(data, list):
+            raise ValueError("se esperaba una lista de programas")
+        entries = data
+    items = []
+    for i, e in enumerate(entries):
+        if isinstance(e, str):
+            items.append((i, e))
+        elif isinstance(e, dict) and isinstance(e.get("code"), str):
+            items.append((e.get("id", i), e["code"]))
+        else:
+            raise ValueError(f"programa {i}: se esperaba un texto o {{\"id\", \"code\"}}")
+    return items, options
+
+# Tiempos por etapa y contadores del proceso, en el formato de texto de
+# Prometheus; con METRICS apagado solo hay ceros
+@bp2.route("/api/metrics", methods=["GET"])
+def metrics_text():
+    return Response(metrics.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
-    static_dir = os.path.join(current_app.root_path, "Front", "static")
-    os.makedirs(static_dir, exist_ok=True)
+@bp2.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(current_app.extensions["result_cache"].stats())
 
-    dot_path = os.path.join(static_dir, "arbol.dot")
-    png_path = os.path.join(static_dir, "Images", "arbol.png")
+# Gramatica en uso y ultimas recargas (con GRAMMAR_FILE)
+@bp2.route("/api/grammar", methods=["GET"])
+def grammar_status():
+    watcher = current_app.extensions.get("grammar_watcher")
+    if watcher is not None:
+        return jsonify(watcher.status())
+    compiled = get_compiled()
+    return jsonify({"path": None, "fingerprint": compiled.fingerprint, "start": compiled.start,
+                    "nonterms": len(compiled.nonterms), "terminals": len(compiled.terminals),
+                    "conflicts": len(compiled.conflicts), "error": None, "reloads": []})
 
-    export_dot(tree, dot_path)
+# La imagen se renderiza en segundo plano y se guarda por hash de los tokens:
+# la respuesta lleva el id del trabajo y, si la imagen ya existia, tambien su
+# URL. El estado se consulta en /api/render/<id>
+# Sesiones de edicion: el cliente manda el codigo una vez y despues solo los
+# cambios; si el cambio cae dentro de un miembro de la clase se vuelve a
+# analizar solo esa sentencia o ese miembro (ver Back/incremental.py)
+@bp2.route("/api/session", methods=["POST"])
+def session_create():
+    data = request.get_json()
+    try:
+        sid, doc = current_app.extensions["sessions"].create(data.get("code", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    with doc.lock:
+        return jsonify(_session_result(sid, doc, "full", data))
+
+# Cuerpo: {"start", "end", "text"} o {"edits": [...]}; start/end son indices
+# de caracter en el texto actual de la sesion
+@bp2.route("/api/session/<sid>/edit", methods=["POST"])
+def session_edit(sid):
+    data = request.get_json()
+    doc = current_app.extensions["sessions"].get(sid)
+    if doc is None:
+        return jsonify({"session": sid, "error": "Sesión no encontrada."}), 404
+    edits = data.get("edits") or [data]
+    modes = []
+    with doc.lock:
+        try:
+            for e in edits:
+                modes.append(doc.edit(int(e.get("start", 0)), int(e.get("end", 0)), e.get("text", "")))
+        except (TypeError, ValueError) as e:
+            return jsonify({"session": sid, "error": str(e)}), 400
+        mode = "incremental" if modes and all(m == "incremental" for m in modes) else "full"
+        return jsonify(_session_result(sid, doc, mode, data))
+
+def _session_result(sid, doc, mode, data):
+    result = {"session": sid, "mode": mode, "errors": list(doc.errors)}
+    if data.get("render"):
+        result.update(tree_job(doc.shared_tree(), _digest(doc.tokens), data))
+    if data.get("tokens"):
+        result["tokens"] = token_rows(doc.tokens)
+    return result
+
+def _digest(tokens):
+    digest = TokenDigest(tokens, render_salt(get_compiled().fingerprint))
+    for _ in digest:
+        pass
+    return digest.hexdigest()
+
+@bp2.route("/api/render/<job_id>", methods=["GET"])
+def render_status(job_id):
+    job = current_app.extensions["render_queue"].status(job_id)
+    if job is None:
+        return jsonify({"id": job_id, "status": "unknown"}), 404
+    return jsonify(job.to_dict())
+
+# Arbol dibujado en Python y enviado como SVG mientras se genera (sin Graphviz)
+@bp2.route("/api/tree.svg", methods=["POST"])
+def tree_svg():
+    data = request.get_json()
+    mode = "ast" if data.get("tree") == "ast" else "node"
     try:
-        render_dot_to_png(dot_path, png_path)
-        tree_image = f"static/Images/arbol.png"
-    except Exception as e:
-        tree_image = None
-        errors.append(f"Error al generar árbol: {e}")
-
-    return jsonify({
-        "tokens": token_list,
-        "errors": errors,
-        "tree_image": tree_image
-    })
+        tree, _ = Parser(Lexer(data.get("code", "")).stream()).parse(mode)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    collapse = bool(data.get("collapse", True))
+    return Response(stream_with_context(iter_svg(tree, collapse)), mimetype="image/svg+xml")